@@ -1,13 +1,21 @@
+import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from app.core.gemini_client import generate_text_with_gemini
+from app.core.gemini_client import gemini_model_router, gemini_scheduler, generate_text_with_gemini_async
+from app.core.gemini_model_router import GeminiUnavailableError
 
 from .api_router import api_router
 from .core.app_config import app_config
+from .core.compression_middleware import CompressionMiddleware
+from .feature.test.test_audio_metadata import precompute_audio_metadata
+from .feature.test.test_audio_util import audio_index, run_audio_index_refresh
+from .feature.test.test_content_version import content_version_store, run_content_version_refresh
+from .util.http_cache_util import GZIP_MINIMUM_SIZE
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,7 +24,33 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-app = FastAPI(title="TOEIC API", version="1.0.0", root_path="/fastapi")
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    audio_file_count = await asyncio.to_thread(audio_index.refresh)
+    logger.info(f"Indexed {audio_file_count} audio files in {audio_index.audio_directory}")
+    # Read audio headers in the background, startup does not wait for it
+    metadata_task = asyncio.create_task(asyncio.to_thread(precompute_audio_metadata))
+
+    try:
+        await asyncio.to_thread(content_version_store.refresh)
+    except Exception as e:
+        logger.warning(f"Content versions not readable, caches use version 0: {e}")
+
+    refresh_task_list = []
+    if app_config.AUDIO_INDEX_REFRESH_SECONDS > 0:
+        refresh_task_list.append(asyncio.create_task(run_audio_index_refresh(app_config.AUDIO_INDEX_REFRESH_SECONDS)))
+    if app_config.CONTENT_VERSION_CHECK_INTERVAL_SECONDS > 0:
+        refresh_task_list.append(asyncio.create_task(run_content_version_refresh(app_config.CONTENT_VERSION_CHECK_INTERVAL_SECONDS)))
+
+    yield
+
+    for refresh_task in refresh_task_list:
+        refresh_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await refresh_task
+
+
+app = FastAPI(title="TOEIC API", version="1.0.0", root_path="/fastapi", lifespan=lifespan)
 
 
 # CORS
@@ -26,8 +60,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-After-Test-Id"],
 )
 
+# Gzip for dynamic JSON responses; cached payloads send their pre-compressed variant
+app.add_middleware(CompressionMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
 # Include routers
 app.router.redirect_slashes = False
 app.include_router(api_router)
@@ -38,7 +76,22 @@ def read_root():
 
 
 @app.post("/gemini/health")
-def is_gemini_healthy():
+async def is_gemini_healthy():
     prompt = 'Hello. Is Gemini service available now ?'
-    response = generate_text_with_gemini(prompt)
-    return response
\ No newline at end of file
+    try:
+        response = await generate_text_with_gemini_async(prompt)
+    except GeminiUnavailableError as e:
+        raise e.to_http_exception()
+    return response
+
+
+@app.get("/gemini/models")
+def get_gemini_model_stats():
+    """Breaker state and rolling statistics of each Gemini model"""
+    return gemini_model_router.get_stats()
+
+
+@app.get("/gemini/scheduler")
+async def get_gemini_scheduler_stats():
+    """Quota bucket levels and queued calls by priority"""
+    return gemini_scheduler.get_stats()
\ No newline at end of file
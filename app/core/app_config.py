@@ -20,7 +20,62 @@ class AppConfig(BaseSettings):
     OTP_EXPIRES_MINUTES: int = 5
     
     MEDIA_DIRECTORY: str = r"C:\TOEIC_APP\DB\media"
+    # Interval of the background rescan of {MEDIA_DIRECTORY}/assets (0 disables it)
+    AUDIO_INDEX_REFRESH_SECONDS: float = 60.0
     GEMINI_API_KEY: str = ""
+    # Timeout of each Gemini call, fallback models get their own
+    GEMINI_TIMEOUT_SECONDS: float = 30.0
+    # Circuit breaker of each Gemini model: opened by consecutive model failures or
+    # by the error rate over the rolling window, probed again after the open period
+    GEMINI_BREAKER_FAILURE_THRESHOLD: int = 3
+    GEMINI_BREAKER_ERROR_RATE: float = 0.5
+    GEMINI_BREAKER_OPEN_SECONDS: float = 30.0
+    GEMINI_HEALTH_WINDOW_SECONDS: float = 60.0
+    # Models with a rolling p90 latency above this are tried after the others
+    GEMINI_SLOW_LATENCY_SECONDS: float = 10.0
+    # Gemini quota shared by every worker and the pre-generation command through
+    # toeicapp_gemini_quota (0 for no limit), and admission queue of each process:
+    # calls without a slot wait up to the deadline of their priority, else get a 503
+    GEMINI_REQUESTS_PER_MINUTE: int = 60
+    GEMINI_TOKENS_PER_MINUTE: int = 1000000
+    GEMINI_ESTIMATED_OUTPUT_TOKENS: int = 1024
+    GEMINI_QUEUE_SIZE: int = 100
+    GEMINI_INTERACTIVE_MAX_WAIT_SECONDS: float = 5.0
+    GEMINI_BACKGROUND_MAX_WAIT_SECONDS: float = 300.0
+    # Share of each bucket background calls (pre-generation) leave to interactive ones
+    GEMINI_BACKGROUND_RESERVE_RATIO: float = 0.2
+    # Calls a process reserves beyond the current one per round trip to
+    # toeicapp_gemini_quota (0 for a round trip per call), and age at which
+    # an unused reservation is given back
+    GEMINI_QUOTA_LEASE_CALL_COUNT: int = 4
+    GEMINI_QUOTA_LEASE_SECONDS: float = 5.0
+    # Shared directory of AI generation lock files, so only one worker generates
+    # an artifact (disabled when empty); locks not refreshed by their holder within
+    # the timeout are taken over, and waiters give up the lock after the timeout
+    AI_GENERATION_LOCK_DIRECTORY: str = ""
+    AI_GENERATION_LOCK_TIMEOUT_SECONDS: float = 90.0
+    # Questions per Gemini call of the batch translate / explain endpoints
+    AI_BATCH_QUESTION_COUNT: int = 10
+    
+    # Test content cache settings
+    CONTENT_VERSION: str = "1"
+    # Interval of the re-read of toeicapp_content_version (0 disables it)
+    CONTENT_VERSION_CHECK_INTERVAL_SECONDS: float = 5.0
+    TEST_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    TEST_CACHE_TTL_SECONDS: int = 600
+    TEST_CATALOGUE_TTL_SECONDS: int = 300
+    ANSWER_KEY_CACHE_SIZE: int = 64
+    PART_AUDIO_URL_CACHE_SIZE: int = 4096
+    AUDIO_METADATA_CACHE_SIZE: int = 4096
+    MSGPACK_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    
+    # Fraction (0.0 - 1.0) of passthrough JSON payloads validated against their
+    # response schema. Keep 0 in production, raise it for debugging.
+    RESPONSE_VALIDATION_SAMPLE_RATE: float = 0.0
+    
+    # Materialized test snapshots (disabled when empty)
+    SNAPSHOT_DIRECTORY: str = ""
+    SNAPSHOT_CHECK_INTERVAL_SECONDS: float = 5.0
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,52 @@
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+from app.util.http_cache_util import is_compressible_media_type, is_gzip_accepted
+
+
+class CompressionResponder(GZipResponder):
+    """GZipResponder that leaves binary, partial, not-modified and event-stream responses untouched."""
+
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            is_skipped = (
+                message["status"] in (206, 304)
+                or not is_compressible_media_type(content_type)
+                # Events must reach the client as soon as they are sent
+                or content_type.startswith("text/event-stream")
+            )
+            await super().send_with_gzip(message)
+            # Reuse the pass-through path of responses that already have a Content-Encoding
+            self.content_encoding_set = self.content_encoding_set or is_skipped
+            return
+
+        if message["type"] not in ("http.response.start", "http.response.body"):
+            # Extension messages (e.g. zero-copy send) only follow uncompressed starts
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        await super().send_with_gzip(message)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzip compression negotiated from Accept-Encoding.
+
+    Only text / JSON bodies are compressed: audio and images are already
+    compressed, and compressing them would break byte ranges. Cached payloads
+    that carry their own pre-compressed variant set Content-Encoding themselves
+    and are passed through as is.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and is_gzip_accepted(Headers(scope=scope).get("accept-encoding")):
+            responder = CompressionResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
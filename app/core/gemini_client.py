@@ -1,9 +1,15 @@
 # Document: https://ai.google.dev/gemini-api/docs/quickstart?lang=python
 # Migration from googol-genativeai to gemini-api: https://ai.google.dev/gemini-api/docs/migrate
-from typing import Optional
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple, TypeVar
 from google import genai
-from google.genai import types
+from google.genai import errors, types
+import httpx
 from .app_config import app_config
+from .gemini_model_router import GeminiModelRouter
+from .gemini_scheduler import GeminiScheduler, estimate_token_count
 
 import os, ssl, certifi
 
@@ -28,45 +34,262 @@ os.environ["SSL_CERT_FILE"] = tmp_path
 
 gemini_client = genai.Client(api_key=app_config.GEMINI_API_KEY)
 
-def generate_text_with_gemini(prompt: str):
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Primary model first, then the fallbacks tried on model failures
+GEMINI_MODEL_LIST = ('gemini-2.5-flash', 'gemini-2.0-flash', 'gemini-1.5-flash')
+
+def is_gemini_model_failure(error: Exception) -> bool:
+    """
+    Whether an error is the model's fault and worth retrying on a fallback model.
+
+    Server errors (5xx), rate limits (429), timeouts and transport errors count
+    against the model; other API errors (4xx) mean the request itself is wrong.
+    """
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, errors.APIError):
+        return isinstance(error, errors.ServerError) or error.code == 429
+    return False
+
+
+# Breakers and rolling statistics of GEMINI_MODEL_LIST, shared by every request of the process
+gemini_model_router = GeminiModelRouter(GEMINI_MODEL_LIST)
+# Priority queue of the process over the Gemini quota shared by every process
+gemini_scheduler = GeminiScheduler()
+
+
+async def _call_with_model_fallback(
+    call_model: Callable[[str], Awaitable[T]],
+    timeout_seconds: float,
+) -> Tuple[str, T]:
+    """
+    Run call_model on the models of gemini_model_router until one succeeds.
+
+    Each model gets its own timeout; on a model failure (see
+    is_gemini_model_failure) the next model is tried. Cancelling the caller (e.g. the client disconnected)
+    cancels the call in flight.
+
+    Returns:
+        (model, result of call_model)
+    """
+    health_list = gemini_model_router.acquire_model_list()
+    last_error: Optional[Exception] = None
     try:
-        response = gemini_client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt
-        )
-        
-        return response.text
-    except Exception as e:
-        error_message = f"Gemini API error: {type(e).__name__} - {str(e)}"
-        print(error_message)  # Log the error
-        
-        # Check if it's a 5xx server error (503, 500, etc.)
-        error_str = str(e)
-        if '503' in error_str or '500' in error_str or '502' in error_str or 'overloaded' in error_str.lower():
-            # Try gemini-2.0-flash first
-            print("Attempting fallback to gemini-2.0-flash due to server error...")
+        while health_list:
+            health = health_list.pop(0)
+            start_time = time.monotonic()
             try:
-                response = gemini_client.models.generate_content(
-                    model='gemini-2.0-flash',
-                    contents=prompt
-                )
-                print("Successfully used fallback model gemini-2.0-flash")
-                return response.text
-            except Exception as fallback_error_2_0:
-                print(f"gemini-2.0-flash failed: {str(fallback_error_2_0)}")
-                
-                # Try gemini-1.5-flash as final fallback
-                print("Attempting final fallback to gemini-1.5-flash...")
-                try:
-                    response = gemini_client.models.generate_content(
-                        model='gemini-1.5-flash',
-                        contents=prompt
-                    )
-                    print("Successfully used fallback model gemini-1.5-flash")
-                    return response.text
-                except Exception as fallback_error_1_5:
-                    fallback_message = f"All fallback models failed. Last error: {type(fallback_error_1_5).__name__} - {str(fallback_error_1_5)}"
-                    print(fallback_message)
-                    raise Exception(fallback_message) from fallback_error_1_5
-        
-        raise Exception(error_message) from e
+                result = await asyncio.wait_for(call_model(health.model), timeout=timeout_seconds)
+            except Exception as e:
+                latency = time.monotonic() - start_time
+                last_error = e
+                error_message = f"{type(e).__name__} - {str(e) or f'no answer within {timeout_seconds}s'}"
+                logger.warning(f"Gemini API error on {health.model}: {error_message}")
+                if not is_gemini_model_failure(e):
+                    # The model answered, the request itself is wrong
+                    health.record_success(latency)
+                    raise Exception(f"Gemini API error: {error_message}") from e
+                health.record_failure(latency)
+                continue
+            except BaseException:
+                # Cancelled: no verdict on the model
+                health.release()
+                raise
+
+            health.record_success(time.monotonic() - start_time)
+            if health.model != GEMINI_MODEL_LIST[0]:
+                logger.info(f"Successfully used fallback model {health.model}")
+            return health.model, result
+    finally:
+        # Models not tried give back their probe slot
+        for health in health_list:
+            health.release()
+
+    raise Exception(
+        f"All fallback models failed. Last error: {type(last_error).__name__} - {str(last_error)}"
+    ) from last_error
+
+
+async def _call_with_quota(
+    token_count: int,
+    call_model: Callable[[str], Awaitable[T]],
+    timeout_seconds: float,
+) -> Tuple[str, T]:
+    """
+    Take a slot of gemini_scheduler, then run _call_with_model_fallback.
+
+    The caller settles the tokens of a successful call. A failed or cancelled
+    call keeps its estimate, a call that never reached a model (every breaker
+    open, or cancelled before the first attempt) gives its slot back.
+    """
+    await gemini_scheduler.acquire(token_count)
+    has_reached_model = False
+
+    async def call_counted_model(model: str) -> T:
+        nonlocal has_reached_model
+        has_reached_model = True
+        return await call_model(model)
+
+    try:
+        return await _call_with_model_fallback(call_counted_model, timeout_seconds)
+    finally:
+        if not has_reached_model:
+            await gemini_scheduler.refund(token_count)
+
+
+def _build_generate_config(response_schema) -> Optional[types.GenerateContentConfig]:
+    if response_schema is None:
+        return None
+    # Constrained decoding: the answer is JSON matching the schema, without prose around it
+    return types.GenerateContentConfig(response_mime_type="application/json", response_schema=response_schema)
+
+
+def _get_total_token_count(response) -> Optional[int]:
+    usage_metadata = getattr(response, "usage_metadata", None)
+    return getattr(usage_metadata, "total_token_count", None)
+
+
+async def generate_text_with_gemini_async(
+    prompt: str,
+    timeout_seconds: Optional[float] = None,
+    response_schema=None,
+) -> str:
+    """
+    Generate text without blocking the event loop.
+
+    The call first waits for a slot of gemini_scheduler, with the priority of
+    current_gemini_priority, then goes to the healthiest model of
+    gemini_model_router (see _call_with_model_fallback).
+
+    Args:
+        prompt: Prompt text
+        timeout_seconds: Timeout of each model call (default: GEMINI_TIMEOUT_SECONDS)
+        response_schema: Pydantic model (or list of it) the answer must be the JSON of,
+            None for free text
+
+    Raises:
+        GeminiUnavailableError: Every model breaker is open, or no quota slot
+            before the deadline (GeminiOverloadedError)
+    """
+    timeout_seconds = timeout_seconds or app_config.GEMINI_TIMEOUT_SECONDS
+
+    token_count = estimate_token_count(prompt)
+    config = _build_generate_config(response_schema)
+    _, response = await _call_with_quota(
+        token_count,
+        lambda model: gemini_client.aio.models.generate_content(model=model, contents=prompt, config=config),
+        timeout_seconds,
+    )
+    await gemini_scheduler.settle(token_count, _get_total_token_count(response))
+    return response.text
+
+
+async def _close_stream(stream) -> None:
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+class GeminiTextStream:
+    """
+    Text chunks of a streamed answer.
+
+    Holds its quota slot until exhausted, failed or closed: callers that stop
+    early (e.g. client disconnected) must aclose it, even if never iterated.
+    """
+
+    def __init__(self, model: str, stream: AsyncIterator, first_chunk, token_count: int, timeout_seconds: float):
+        self._model = model
+        self._stream = stream
+        self._pending_chunk = first_chunk
+        self._last_chunk = first_chunk
+        self._token_count = token_count
+        self._timeout_seconds = timeout_seconds
+        self._is_closed = False
+        self._is_exhausted = first_chunk is None
+
+    def __aiter__(self) -> "GeminiTextStream":
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            while not self._is_closed and not self._is_exhausted:
+                if self._pending_chunk is not None:
+                    chunk, self._pending_chunk = self._pending_chunk, None
+                else:
+                    try:
+                        chunk = await asyncio.wait_for(self._stream.__anext__(), timeout=self._timeout_seconds)
+                    except StopAsyncIteration:
+                        self._is_exhausted = True
+                        break
+                    except asyncio.TimeoutError:
+                        raise Exception(f"Gemini stream of {self._model} stalled for {self._timeout_seconds}s") from None
+                    self._last_chunk = chunk
+                if chunk.text:
+                    return chunk.text
+        except BaseException:
+            await self.aclose()
+            raise
+
+        await self.aclose()
+        raise StopAsyncIteration
+
+    async def aclose(self) -> None:
+        if self._is_closed:
+            return
+        self._is_closed = True
+        try:
+            # Stopped early: release the connection to Gemini
+            await _close_stream(self._stream)
+        finally:
+            # The last chunk carries the usage of the whole answer
+            await gemini_scheduler.settle(self._token_count, _get_total_token_count(self._last_chunk))
+
+
+async def open_text_stream_with_gemini_async(
+    prompt: str,
+    timeout_seconds: Optional[float] = None,
+    response_schema=None,
+) -> GeminiTextStream:
+    """
+    Start generating text as a stream of chunks.
+
+    Returns once the first chunk arrived: until then, errors fall back to the
+    next model like generate_text_with_gemini_async, and are raised to the
+    caller before it commits to a streamed response.
+
+    Args:
+        prompt: Prompt text
+        timeout_seconds: Timeout of the first chunk of each model, then between chunks
+            (default: GEMINI_TIMEOUT_SECONDS)
+        response_schema: Pydantic model the answer must be the JSON of, None for free text
+
+    Raises:
+        GeminiUnavailableError: Every model breaker is open, or no quota slot
+            before the deadline (GeminiOverloadedError)
+
+    Returns:
+        Async iterator of text chunks, to aclose if not exhausted
+    """
+    timeout_seconds = timeout_seconds or app_config.GEMINI_TIMEOUT_SECONDS
+
+    token_count = estimate_token_count(prompt)
+    config = _build_generate_config(response_schema)
+
+    async def open_stream(model: str):
+        stream = await gemini_client.aio.models.generate_content_stream(model=model, contents=prompt, config=config)
+        try:
+            first_chunk = None
+            async for first_chunk in stream:
+                break
+            return stream, first_chunk
+        except BaseException:
+            # Failed or timed out before the first chunk: don't leave the stream open
+            await _close_stream(stream)
+            raise
+
+    model, (stream, first_chunk) = await _call_with_quota(token_count, open_stream, timeout_seconds)
+    return GeminiTextStream(model, stream, first_chunk, token_count, timeout_seconds)
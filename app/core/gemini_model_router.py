@@ -0,0 +1,197 @@
+"""
+Health-aware routing between Gemini models.
+
+Each model has a circuit breaker fed with the outcome of every call:
+    closed     -> the model takes requests
+    open       -> after GEMINI_BREAKER_FAILURE_THRESHOLD consecutive model failures
+                  or an error rate of GEMINI_BREAKER_ERROR_RATE over the rolling
+                  window, the model is skipped for GEMINI_BREAKER_OPEN_SECONDS
+    half-open  -> then a single probe request is let through: success closes the
+                  breaker, failure opens it again
+
+Requests try the available models in preference order, healthy ones first: a
+model whose rolling error rate or p90 latency is high goes after the others
+before its breaker even opens. During an outage requests go straight to a
+healthy model instead of waiting for the primary one to fail.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Deque, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+from .app_config import app_config
+
+
+# Fewer calls in the window are not enough to judge the error rate
+MIN_ERROR_RATE_SAMPLE_COUNT = 5
+
+
+class BREAKER_STATE(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class GeminiUnavailableError(Exception):
+    """Gemini can't take the call now (every model breaker is open)."""
+
+    def __init__(self, retry_after_seconds: float, message: Optional[str] = None):
+        super().__init__(message or f"All Gemini models are unavailable, retry in {math.ceil(retry_after_seconds)}s")
+        self.retry_after_seconds = retry_after_seconds
+
+    def to_http_exception(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(self),
+            headers={"Retry-After": str(max(math.ceil(self.retry_after_seconds), 1))},
+        )
+
+
+@dataclass(frozen=True)
+class _CallOutcome:
+    time: float
+    is_success: bool
+    latency: float
+
+
+class ModelHealth:
+    """Circuit breaker and rolling statistics of one model."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.state = BREAKER_STATE.CLOSED
+        self._outcomes: Deque[_CallOutcome] = deque()
+        self._consecutive_failure_count = 0
+        self._opened_at = 0.0
+        self._is_probing = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0].time > app_config.GEMINI_HEALTH_WINDOW_SECONDS:
+            self._outcomes.popleft()
+
+    def _get_error_rate(self) -> float:
+        if len(self._outcomes) < MIN_ERROR_RATE_SAMPLE_COUNT:
+            return 0.0
+        return sum(not outcome.is_success for outcome in self._outcomes) / len(self._outcomes)
+
+    def _get_latency_percentile(self, percentile: float) -> Optional[float]:
+        latency_list = sorted(outcome.latency for outcome in self._outcomes if outcome.is_success)
+        if not latency_list:
+            return None
+        return latency_list[min(int(len(latency_list) * percentile), len(latency_list) - 1)]
+
+    def _open(self, now: float) -> None:
+        self.state = BREAKER_STATE.OPEN
+        self._opened_at = now
+        self._is_probing = False
+
+    def get_retry_after(self, now: float) -> float:
+        with self._lock:
+            return max(self._opened_at + app_config.GEMINI_BREAKER_OPEN_SECONDS - now, 0.0)
+
+    def try_acquire(self, now: float) -> bool:
+        """Whether a request may be sent to the model; takes the probe slot of a half-open breaker."""
+        with self._lock:
+            if self.state == BREAKER_STATE.OPEN and now - self._opened_at >= app_config.GEMINI_BREAKER_OPEN_SECONDS:
+                self.state = BREAKER_STATE.HALF_OPEN
+            if self.state == BREAKER_STATE.HALF_OPEN:
+                if self._is_probing:
+                    return False
+                self._is_probing = True
+                return True
+            return self.state == BREAKER_STATE.CLOSED
+
+    def release(self) -> None:
+        """Give back the probe slot of a request that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            self._is_probing = False
+
+    def record_success(self, latency: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self.state == BREAKER_STATE.HALF_OPEN:
+                # Start over: the failures that opened the breaker are history
+                self._outcomes.clear()
+                self.state = BREAKER_STATE.CLOSED
+                self._is_probing = False
+            # A late success of a call sent before the breaker opened does not close it
+            if self.state == BREAKER_STATE.CLOSED:
+                self._consecutive_failure_count = 0
+            self._outcomes.append(_CallOutcome(now, True, latency))
+            self._trim(now)
+
+    def record_failure(self, latency: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._consecutive_failure_count += 1
+            self._outcomes.append(_CallOutcome(now, False, latency))
+            self._trim(now)
+            if self.state == BREAKER_STATE.HALF_OPEN or (
+                self.state == BREAKER_STATE.CLOSED and (
+                    self._consecutive_failure_count >= app_config.GEMINI_BREAKER_FAILURE_THRESHOLD
+                    or self._get_error_rate() >= app_config.GEMINI_BREAKER_ERROR_RATE
+                )
+            ):
+                self._open(now)
+
+    def is_degraded(self, now: float) -> bool:
+        """
+        Failing or slow, though not enough to open the breaker. Judged on the
+        rolling window only, so a model that gets no traffic recovers with time.
+        """
+        with self._lock:
+            self._trim(now)
+            p90_latency = self._get_latency_percentile(0.9)
+            return (
+                (bool(self._outcomes) and not self._outcomes[-1].is_success)
+                or self._get_error_rate() >= app_config.GEMINI_BREAKER_ERROR_RATE / 2
+                or (p90_latency is not None and p90_latency > app_config.GEMINI_SLOW_LATENCY_SECONDS)
+            )
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            p50_latency = self._get_latency_percentile(0.5)
+            p90_latency = self._get_latency_percentile(0.9)
+            return {
+                "model": self.model,
+                "state": self.state.value,
+                "request_count": len(self._outcomes),
+                "error_rate": round(self._get_error_rate(), 3),
+                "p50_latency": round(p50_latency, 3) if p50_latency is not None else None,
+                "p90_latency": round(p90_latency, 3) if p90_latency is not None else None,
+            }
+
+
+class GeminiModelRouter:
+    def __init__(self, model_list: Sequence[str]):
+        self.health_list = [ModelHealth(model) for model in model_list]
+
+    def acquire_model_list(self) -> List[ModelHealth]:
+        """
+        Models to try for a request, best first. Each returned model is acquired:
+        the caller must record an outcome or release it.
+
+        Raises:
+            GeminiUnavailableError: Every breaker is open
+        """
+        now = time.monotonic()
+        candidate_list = [health for health in self.health_list if health.try_acquire(now)]
+        if not candidate_list:
+            raise GeminiUnavailableError(min(health.get_retry_after(now) for health in self.health_list))
+
+        # Stable sort: preference order, degraded models last. A half-open model keeps
+        # its rank, its single probe request has to reach it to close the breaker.
+        candidate_list.sort(key=lambda health: health.state == BREAKER_STATE.CLOSED and health.is_degraded(now))
+        return candidate_list
+
+    def get_stats(self) -> List[dict]:
+        return [health.get_stats() for health in self.health_list]
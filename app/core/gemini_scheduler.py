@@ -0,0 +1,516 @@
+"""
+Admission control of outbound Gemini calls.
+
+Every call takes one request and its estimated tokens from two token buckets
+(GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE). The estimate is
+settled with the token count reported by Gemini once the call is done.
+
+The buckets are rows of toeicapp_gemini_quota, taken from under a row lock:
+every API worker and the pre-generation command share the same quota. To
+spare a round trip per call, a process taking a slot also leases up to
+GEMINI_QUOTA_LEASE_CALL_COUNT more of the same size and serves its next calls
+from the lease; token corrections and refunds go to the lease as well. What
+is left of the lease goes back to the table GEMINI_QUOTA_LEASE_SECONDS after
+it was taken (or on the next round trip), so an idle process holds nothing.
+
+Callers without a slot wait in a bounded queue served by priority:
+    interactive  -> user requests; waits at most GEMINI_INTERACTIVE_MAX_WAIT_SECONDS
+    background   -> pre-generation jobs; waits at most GEMINI_BACKGROUND_MAX_WAIT_SECONDS
+                    and leaves GEMINI_BACKGROUND_RESERVE_RATIO of each bucket
+                    to interactive calls
+
+A caller that would not get a slot before its deadline (or finds the queue
+full of calls of its priority) is rejected at once with GeminiOverloadedError,
+carrying the time after which a retry is expected to succeed.
+
+The queue lives in each process. Across processes the reserve keeps the
+priorities: once the buckets run low, interactive calls of any worker get the
+refilled quota before the background calls of the pre-generation command.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Iterator, List, Optional, Tuple
+
+from .app_config import app_config
+from .gemini_model_router import GeminiUnavailableError
+from .mysql_connection import get_db_cursor
+
+
+logger = logging.getLogger(__name__)
+
+
+# Rough size of a token for the estimate of a prompt
+CHARACTERS_PER_TOKEN = 4
+# Longest sleep of a queued call before reading the shared buckets again, so
+# quota given back by other processes is seen
+QUOTA_POLL_SECONDS = 1.0
+
+REQUEST_BUCKET = "request"
+TOKEN_BUCKET = "token"
+
+SELECT_GEMINI_QUOTA_LIST_FOR_UPDATE = """
+SELECT bucket, level, refill_at
+FROM toeicapp_gemini_quota
+WHERE bucket IN (%s, %s)
+FOR UPDATE
+"""
+
+SAVE_GEMINI_QUOTA = """
+INSERT INTO toeicapp_gemini_quota (bucket, level, refill_at)
+VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE level = VALUES(level), refill_at = VALUES(refill_at)
+"""
+
+ADD_GEMINI_QUOTA_LEVEL = """
+UPDATE toeicapp_gemini_quota
+SET level = level + %s
+WHERE bucket = %s
+"""
+
+
+class GEMINI_PRIORITY(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class GeminiOverloadedError(GeminiUnavailableError):
+    """The call would wait longer than its deadline for a slot."""
+
+    def __init__(self, retry_after_seconds: float):
+        super().__init__(
+            retry_after_seconds,
+            f"Gemini quota exhausted, retry in {math.ceil(retry_after_seconds)}s",
+        )
+
+
+# Priority of the Gemini calls made by the current task (inherited by the tasks it creates)
+current_gemini_priority: ContextVar[GEMINI_PRIORITY] = ContextVar(
+    "current_gemini_priority", default=GEMINI_PRIORITY.INTERACTIVE
+)
+
+
+@contextmanager
+def use_gemini_priority(priority: GEMINI_PRIORITY) -> Iterator[None]:
+    token = current_gemini_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_gemini_priority.reset(token)
+
+
+def estimate_token_count(prompt: str) -> int:
+    return len(prompt) // CHARACTERS_PER_TOKEN + app_config.GEMINI_ESTIMATED_OUTPUT_TOKENS
+
+
+class TokenBucket:
+    """Refills capacity_per_minute units per minute, up to capacity_per_minute (0 for no limit)."""
+
+    def __init__(self, capacity_per_minute: float, level: Optional[float] = None, updated_at: Optional[float] = None):
+        self.capacity = capacity_per_minute
+        self.level = capacity_per_minute if level is None else level
+        self.updated_at = updated_at
+
+    def refill(self, now: float) -> None:
+        if self.capacity and self.updated_at is not None:
+            # Clocks of the processes sharing the bucket may disagree a little
+            elapsed = max(now - self.updated_at, 0.0)
+            self.level = min(self.level + elapsed * self.capacity / 60.0, self.capacity)
+        self.updated_at = max(now, self.updated_at or now)
+
+    def get_wait(self, amount: float, reserve_ratio: float = 0.0, is_capped: bool = True) -> float:
+        """
+        Seconds until amount units can be taken, leaving reserve_ratio of the capacity.
+
+        Args:
+            is_capped: A call larger than the bucket only has to wait for a full
+                bucket; False to estimate the wait of several calls in a row
+        """
+        if not self.capacity:
+            return 0.0
+        required_level = amount + reserve_ratio * self.capacity
+        if is_capped:
+            required_level = min(required_level, self.capacity)
+        return max(required_level - self.level, 0.0) * 60.0 / self.capacity
+
+    def get_spare_count(self, amount: float, reserve_ratio: float = 0.0) -> float:
+        """Number of takes of amount units the bucket holds above reserve_ratio of the capacity."""
+        if not self.capacity or amount <= 0:
+            return math.inf
+        return math.floor(max(self.level - reserve_ratio * self.capacity, 0.0) / amount)
+
+    def take(self, amount: float) -> None:
+        if self.capacity:
+            # May go negative: the debt delays the next calls
+            self.level -= amount
+
+
+class GeminiQuotaStore:
+    """
+    Request and token buckets of toeicapp_gemini_quota, shared by every process
+    using the database. Times are epoch seconds, the same in every process.
+    """
+
+    def __init__(self):
+        # Last read state of the buckets, for the wait estimates and stats
+        self.request_bucket = TokenBucket(app_config.GEMINI_REQUESTS_PER_MINUTE)
+        self.token_bucket = TokenBucket(app_config.GEMINI_TOKENS_PER_MINUTE)
+
+    @staticmethod
+    def _load_bucket(row_map: dict, bucket: str, capacity_per_minute: float, now: float) -> TokenBucket:
+        row = row_map.get(bucket)
+        if row is None:
+            token_bucket = TokenBucket(capacity_per_minute)
+        else:
+            token_bucket = TokenBucket(capacity_per_minute, row["level"], row["refill_at"])
+        token_bucket.refill(now)
+        return token_bucket
+
+    def is_metered(self) -> bool:
+        return bool(self.request_bucket.capacity or self.token_bucket.capacity)
+
+    def try_take(
+        self,
+        token_count: int,
+        reserve_ratio: float,
+        lease_call_count: int = 0,
+        returned_request_count: float = 0.0,
+        returned_token_count: float = 0.0,
+    ) -> Tuple[float, float, float]:
+        """
+        Take one request and token_count tokens if the buckets allow it, and as
+        many as lease_call_count more of them as the buckets can spare.
+
+        Args:
+            returned_request_count / returned_token_count: Unused units given
+                back in the same transaction (e.g. the previous lease)
+
+        Returns:
+            (0 if taken, else the seconds until the buckets should allow it,
+            requests leased beyond the call, tokens leased beyond the call)
+        """
+        if not self.is_metered():
+            return 0.0, 0.0, 0.0
+
+        with get_db_cursor() as cursor:
+            cursor.execute(SELECT_GEMINI_QUOTA_LIST_FOR_UPDATE, (REQUEST_BUCKET, TOKEN_BUCKET))
+            row_map = {row["bucket"]: row for row in cursor.fetchall()}
+            now = time.time()
+            request_bucket = self._load_bucket(row_map, REQUEST_BUCKET, self.request_bucket.capacity, now)
+            token_bucket = self._load_bucket(row_map, TOKEN_BUCKET, self.token_bucket.capacity, now)
+            request_bucket.take(-returned_request_count)
+            token_bucket.take(-returned_token_count)
+
+            wait = max(
+                request_bucket.get_wait(1, reserve_ratio),
+                token_bucket.get_wait(token_count, reserve_ratio),
+            )
+            lease_count = 0
+            if wait <= 0:
+                lease_count = max(
+                    min(
+                        lease_call_count,
+                        request_bucket.get_spare_count(1, reserve_ratio) - 1,
+                        token_bucket.get_spare_count(token_count, reserve_ratio) - 1,
+                    ),
+                    0,
+                )
+                request_bucket.take(1 + lease_count)
+                token_bucket.take((1 + lease_count) * token_count)
+            if wait <= 0 or returned_request_count or returned_token_count:
+                cursor.execute(SAVE_GEMINI_QUOTA, (REQUEST_BUCKET, request_bucket.level, now))
+                cursor.execute(SAVE_GEMINI_QUOTA, (TOKEN_BUCKET, token_bucket.level, now))
+
+        self.request_bucket = request_bucket
+        self.token_bucket = token_bucket
+        return wait, float(lease_count), float(lease_count * token_count)
+
+    def give_back(self, request_count: float, token_count: float) -> None:
+        """Add units to the buckets (negative to take more, e.g. a call larger than its estimate)."""
+        with get_db_cursor() as cursor:
+            if request_count and self.request_bucket.capacity:
+                cursor.execute(ADD_GEMINI_QUOTA_LEVEL, (request_count, REQUEST_BUCKET))
+            if token_count and self.token_bucket.capacity:
+                cursor.execute(ADD_GEMINI_QUOTA_LEVEL, (token_count, TOKEN_BUCKET))
+        self.request_bucket.take(-request_count)
+        self.token_bucket.take(-token_count)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    token_count: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class GeminiScheduler:
+    def __init__(self):
+        self._quota_store = GeminiQuotaStore()
+        # Min-heap by (priority, arrival); served or abandoned waiters are removed lazily
+        self._waiter_heap: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self._dispatch_event = asyncio.Event()
+        # Units taken from the shared buckets and not used yet (may be negative:
+        # calls larger than their estimate), with the reserve ratio they respected
+        self._lease_request_count = 0.0
+        self._lease_token_count = 0.0
+        self._lease_reserve_ratio = 0.0
+        self._lease_taken_at = 0.0
+        self._lease_return_task: Optional[asyncio.Task] = None
+
+    def _get_reserve_ratio(self, priority: int) -> float:
+        return app_config.GEMINI_BACKGROUND_RESERVE_RATIO if priority > GEMINI_PRIORITY.INTERACTIVE else 0.0
+
+    def _pop_lease(self) -> Tuple[float, float]:
+        lease = (self._lease_request_count, self._lease_token_count)
+        self._lease_request_count = 0.0
+        self._lease_token_count = 0.0
+        return lease
+
+    def _add_to_lease(self, request_count: float, token_count: float) -> None:
+        self._lease_request_count += request_count
+        self._lease_token_count += token_count
+        if self._lease_request_count or self._lease_token_count:
+            if self._lease_return_task is None or self._lease_return_task.done():
+                self._lease_return_task = asyncio.create_task(self._return_lease())
+
+    async def _return_lease(self) -> None:
+        """Give the lease back to the shared buckets once it is GEMINI_QUOTA_LEASE_SECONDS old (background task)."""
+        while self._lease_request_count or self._lease_token_count:
+            delay = self._lease_taken_at + app_config.GEMINI_QUOTA_LEASE_SECONDS - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            request_count, token_count = self._pop_lease()
+            try:
+                await asyncio.to_thread(self._quota_store.give_back, request_count, token_count)
+            except Exception as e:
+                logger.warning(f"Failed to update the Gemini quota: {e}")
+
+    async def _take(self, priority: int, token_count: int) -> float:
+        reserve_ratio = self._get_reserve_ratio(priority)
+        if (
+            reserve_ratio <= self._lease_reserve_ratio
+            and self._lease_request_count >= 1
+            and self._lease_token_count >= token_count
+        ):
+            self._lease_request_count -= 1
+            self._lease_token_count -= token_count
+            return 0.0
+        if not self._quota_store.is_metered():
+            return 0.0
+
+        # The rest of the lease goes back in the same transaction
+        returned_request_count, returned_token_count = self._pop_lease()
+        try:
+            wait, lease_request_count, lease_token_count = await asyncio.to_thread(
+                self._quota_store.try_take,
+                token_count,
+                reserve_ratio,
+                app_config.GEMINI_QUOTA_LEASE_CALL_COUNT,
+                returned_request_count,
+                returned_token_count,
+            )
+        except Exception as e:
+            self._add_to_lease(returned_request_count, returned_token_count)
+            # Calls keep going unmetered rather than failing while the database is unreachable
+            logger.warning(f"Gemini quota unavailable, call not metered: {e}")
+            return 0.0
+
+        if lease_request_count:
+            # A lease serves the calls whose reserve it respected
+            is_lease_empty = not self._lease_request_count
+            self._lease_reserve_ratio = (
+                reserve_ratio if is_lease_empty else min(self._lease_reserve_ratio, reserve_ratio)
+            )
+            self._lease_taken_at = time.monotonic()
+            self._add_to_lease(lease_request_count, lease_token_count)
+        return wait
+
+    async def _try_take(self, priority: int, token_count: int) -> float:
+        """Take a slot from the lease or the shared buckets; 0 if taken, else the seconds to wait."""
+        take_task = asyncio.ensure_future(self._take(priority, token_count))
+        try:
+            return await asyncio.shield(take_task)
+        except asyncio.CancelledError:
+            def give_back_if_taken(done_task: asyncio.Task) -> None:
+                if not done_task.cancelled() and done_task.result() <= 0:
+                    self._give_back(1, token_count)
+
+            # The slot may still be taken once the round trip ends: nobody would use it
+            take_task.add_done_callback(give_back_if_taken)
+            raise
+
+    def _give_back(self, request_count: float, token_count: float) -> None:
+        # Through the lease: returned to the shared buckets with the next round trip
+        self._add_to_lease(request_count, token_count)
+        self._wake_dispatcher()
+
+    def _get_live_waiter_list(self) -> List[_Waiter]:
+        return [waiter for waiter in self._waiter_heap if not waiter.future.done()]
+
+    def _estimate_wait(self, priority: int, token_count: int) -> float:
+        """Wait of a new call behind the queued calls of the same or a higher priority."""
+        ahead_list = [waiter for waiter in self._get_live_waiter_list() if waiter.priority <= priority]
+        # The lease of this process is served first
+        request_count = len(ahead_list) + 1 - max(self._lease_request_count, 0.0)
+        total_token_count = (
+            sum(waiter.token_count for waiter in ahead_list) + token_count - max(self._lease_token_count, 0.0)
+        )
+        reserve_ratio = self._get_reserve_ratio(priority)
+        # Estimated from the last read state of the shared buckets
+        request_bucket = self._quota_store.request_bucket
+        token_bucket = self._quota_store.token_bucket
+        now = time.time()
+        request_bucket.refill(now)
+        token_bucket.refill(now)
+        return max(
+            request_bucket.get_wait(request_count, reserve_ratio, is_capped=False),
+            token_bucket.get_wait(total_token_count, reserve_ratio, is_capped=False),
+        )
+
+    def _get_max_wait(self, priority: int) -> float:
+        if priority == GEMINI_PRIORITY.INTERACTIVE:
+            return app_config.GEMINI_INTERACTIVE_MAX_WAIT_SECONDS
+        return app_config.GEMINI_BACKGROUND_MAX_WAIT_SECONDS
+
+    def _wake_dispatcher(self) -> None:
+        if self._dispatch_task is None or self._dispatch_task.done():
+            self._dispatch_task = asyncio.create_task(self._run_dispatch())
+        else:
+            self._dispatch_event.set()
+
+    async def _run_dispatch(self) -> None:
+        """Grant slots to the head of the queue while the buckets allow it (background task)."""
+        while True:
+            while self._waiter_heap and self._waiter_heap[0].future.done():
+                heapq.heappop(self._waiter_heap)
+            if not self._waiter_heap:
+                return
+
+            waiter = self._waiter_heap[0]
+            self._dispatch_event.clear()
+            wait = await self._try_take(waiter.priority, waiter.token_count)
+            if wait > 0:
+                # The head keeps its turn: lower priorities never overtake it. Other
+                # processes use the same buckets, so they are read again after the wait.
+                try:
+                    await asyncio.wait_for(self._dispatch_event.wait(), timeout=min(wait, QUOTA_POLL_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if waiter.future.done():
+                # Abandoned while its slot was being taken
+                self._give_back(1, waiter.token_count)
+                continue
+            # A call of a higher priority may have become the head in the meantime
+            self._waiter_heap.remove(waiter)
+            heapq.heapify(self._waiter_heap)
+            waiter.future.set_result(None)
+
+    def _make_room(self, priority: int) -> None:
+        """Free a place in a full queue by rejecting the newest call of a lower priority."""
+        live_waiter_list = self._get_live_waiter_list()
+        if len(live_waiter_list) < app_config.GEMINI_QUEUE_SIZE:
+            return
+
+        lower_waiter_list = [waiter for waiter in live_waiter_list if waiter.priority > priority]
+        if not lower_waiter_list:
+            raise GeminiOverloadedError(self._estimate_wait(priority, 0))
+        evicted_waiter = max(lower_waiter_list)
+        evicted_waiter.future.set_exception(
+            GeminiOverloadedError(self._estimate_wait(evicted_waiter.priority, evicted_waiter.token_count))
+        )
+
+    async def acquire(self, token_count: int, priority: Optional[GEMINI_PRIORITY] = None) -> None:
+        """
+        Wait for a slot for one call of about token_count tokens.
+
+        Args:
+            token_count: Estimated tokens of the call, prompt and answer
+            priority: Priority class (default: current_gemini_priority)
+
+        Raises:
+            GeminiOverloadedError: No slot before the deadline of the priority, or the queue is full
+        """
+        if priority is None:
+            priority = current_gemini_priority.get()
+
+        has_waiter_ahead = any(waiter.priority <= priority for waiter in self._get_live_waiter_list())
+        if not has_waiter_ahead and await self._try_take(priority, token_count) <= 0:
+            return
+
+        max_wait = self._get_max_wait(priority)
+        estimated_wait = self._estimate_wait(priority, token_count)
+        if estimated_wait > max_wait:
+            # Fail fast instead of hanging until the deadline
+            raise GeminiOverloadedError(estimated_wait)
+
+        self._make_room(priority)
+        waiter = _Waiter(priority, next(self._sequence), token_count, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiter_heap, waiter)
+        self._wake_dispatcher()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max_wait)
+        except BaseException as e:
+            if not waiter.future.done():
+                # Timed out or cancelled: give up the place in the queue
+                waiter.future.cancel()
+                self._wake_dispatcher()
+            elif not waiter.future.cancelled() and waiter.future.exception() is None:
+                if isinstance(e, asyncio.TimeoutError):
+                    # Granted as the deadline passed: the call goes ahead
+                    return
+                # Cancelled once granted: nobody will use the slot
+                self._give_back(1, token_count)
+            if isinstance(e, asyncio.TimeoutError):
+                raise GeminiOverloadedError(self._estimate_wait(priority, token_count)) from None
+            raise
+
+    async def settle(self, estimated_token_count: int, actual_token_count: Optional[int]) -> None:
+        """
+        Correct the token bucket with the token count reported by Gemini.
+
+        Args:
+            actual_token_count: Tokens of the call, None to keep the estimate
+                (failed call, or no usage reported)
+        """
+        if actual_token_count is not None and actual_token_count != estimated_token_count:
+            self._give_back(0, estimated_token_count - actual_token_count)
+
+    async def refund(self, estimated_token_count: int) -> None:
+        """Give back the slot of a call that never reached a model (or was cancelled before)."""
+        self._give_back(1, estimated_token_count)
+
+    def get_stats(self) -> dict:
+        now = time.time()
+        request_bucket = self._quota_store.request_bucket
+        token_bucket = self._quota_store.token_bucket
+        request_bucket.refill(now)
+        token_bucket.refill(now)
+        live_waiter_list = self._get_live_waiter_list()
+        return {
+            # Shared buckets as last read by this process
+            "request_level": round(request_bucket.level, 1),
+            "token_level": round(token_bucket.level),
+            # Taken from them by this process and not used yet
+            "lease_request_count": round(self._lease_request_count, 1),
+            "lease_token_count": round(self._lease_token_count),
+            "queue_size": {
+                priority.name.lower(): sum(waiter.priority == priority for waiter in live_waiter_list)
+                for priority in GEMINI_PRIORITY
+            },
+        }
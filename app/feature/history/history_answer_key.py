@@ -0,0 +1,200 @@
+"""In-memory answer key of a test, used to score histories without MySQL JSON parsing"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from cachetools import TTLCache
+
+from app.core.app_config import app_config
+from app.core.mysql_connection import get_db_cursor
+from app.feature.history.history_query import SELECT_ANSWER_KEY_BY_TEST
+from app.feature.test.test_cache import get_test_content_version
+
+
+# TOEIC questions 1-100 are Listening, 101-200 are Reading
+LAST_LISTENING_QUESTION_NUMBER = 100
+
+
+@dataclass(frozen=True)
+class QuestionAnswerKey:
+    question_id: int
+    question_number: int
+    part_id: int
+    part_order: str
+    is_listening: bool
+    correct_answer_id: Optional[int]
+
+
+@dataclass(frozen=True)
+class TestAnswerKey:
+    test_id: int
+    question_map: Dict[int, QuestionAnswerKey]
+    # answer_id -> question_id, is_correct of every answer of the test
+    answer_question_map: Dict[int, int]
+    answer_correct_map: Dict[int, bool]
+    part_order_map: Dict[int, str]
+    part_question_count: Dict[int, int]
+
+
+_answer_key_cache = TTLCache(
+    maxsize=app_config.ANSWER_KEY_CACHE_SIZE,
+    ttl=app_config.TEST_CACHE_TTL_SECONDS,
+)
+_answer_key_lock = threading.Lock()
+
+
+def _select_test_answer_key(test_id: int) -> TestAnswerKey:
+    with get_db_cursor() as cursor:
+        cursor.execute(SELECT_ANSWER_KEY_BY_TEST, (test_id,))
+        rows = cursor.fetchall()
+
+    question_map: Dict[int, QuestionAnswerKey] = {}
+    answer_question_map: Dict[int, int] = {}
+    answer_correct_map: Dict[int, bool] = {}
+    part_order_map: Dict[int, str] = {}
+
+    for row in rows:
+        question_id = row["question_id"]
+        answer_id = row["answer_id"]
+        is_correct = row["is_correct"] == 1
+
+        answer_question_map[answer_id] = question_id
+        answer_correct_map[answer_id] = is_correct
+        part_order_map[row["part_id"]] = row["part_order"]
+
+        question_key = question_map.get(question_id)
+        if question_key is None or (is_correct and question_key.correct_answer_id is None):
+            question_map[question_id] = QuestionAnswerKey(
+                question_id=question_id,
+                question_number=row["question_number"],
+                part_id=row["part_id"],
+                part_order=row["part_order"],
+                is_listening=row["question_number"] <= LAST_LISTENING_QUESTION_NUMBER,
+                correct_answer_id=answer_id if is_correct else None,
+            )
+
+    part_question_count: Dict[int, int] = {}
+    for question_key in question_map.values():
+        part_question_count[question_key.part_id] = part_question_count.get(question_key.part_id, 0) + 1
+
+    return TestAnswerKey(
+        test_id=test_id,
+        question_map=question_map,
+        answer_question_map=answer_question_map,
+        answer_correct_map=answer_correct_map,
+        part_order_map=part_order_map,
+        part_question_count=part_question_count,
+    )
+
+
+def get_test_answer_key(test_id: int) -> TestAnswerKey:
+    """
+    Get the answer key of a test, loading it with a single query on a miss.
+
+    Cached per test content version, so invalidate_test_content() also refreshes it.
+    """
+    cache_key = (test_id, get_test_content_version(test_id))
+
+    with _answer_key_lock:
+        answer_key = _answer_key_cache.get(cache_key)
+    if answer_key is not None:
+        return answer_key
+
+    answer_key = _select_test_answer_key(test_id)
+    with _answer_key_lock:
+        _answer_key_cache[cache_key] = answer_key
+
+    return answer_key
+
+
+def count_questions(answer_key: TestAnswerKey, part_id_list: Optional[Iterable] = None) -> int:
+    """
+    Count the questions of a test, or only of the given parts (practice mode).
+    """
+    if part_id_list is None:
+        return sum(answer_key.part_question_count.values())
+
+    return sum(answer_key.part_question_count.get(int(part_id), 0) for part_id in part_id_list)
+
+
+def get_part_order_list(answer_key: TestAnswerKey, part_id_list: Iterable) -> List[str]:
+    return [
+        answer_key.part_order_map[int(part_id)]
+        for part_id in part_id_list
+        if int(part_id) in answer_key.part_order_map
+    ]
+
+
+def _to_id(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def score_data_progress(answer_key: TestAnswerKey, data_progress: Dict[str, str]) -> dict:
+    """
+    Score user answers in a single in-memory pass.
+
+    Args:
+        answer_key: Answer key of the test
+        data_progress: User answers as {question_id: answer_id}
+
+    Returns:
+        dict with correct_count, incorrect_count, correct_listening, correct_reading
+        and result_by_part (parts that have at least one answered question, by part id)
+    """
+    correct_count = 0
+    incorrect_count = 0
+    correct_listening = 0
+    correct_reading = 0
+    part_result_map: Dict[int, dict] = {}
+
+    for question_id_value, answer_id_value in data_progress.items():
+        question_id = _to_id(question_id_value)
+        answer_id = _to_id(answer_id_value)
+
+        is_correct = answer_key.answer_correct_map.get(answer_id)
+        if is_correct is not None:
+            # Sections follow the question the chosen answer belongs to
+            answered_question = answer_key.question_map[answer_key.answer_question_map[answer_id]]
+            if is_correct:
+                correct_count += 1
+                if answered_question.is_listening:
+                    correct_listening += 1
+                else:
+                    correct_reading += 1
+            else:
+                incorrect_count += 1
+
+        question_key = answer_key.question_map.get(question_id)
+        if question_key is None:
+            continue
+
+        part_result = part_result_map.setdefault(question_key.part_id, {
+            "part_order": question_key.part_order,
+            "total_question": answer_key.part_question_count[question_key.part_id],
+            "correct_count": 0,
+            "incorrect_count": 0,
+        })
+        if is_correct is True:
+            part_result["correct_count"] += 1
+        elif is_correct is False:
+            part_result["incorrect_count"] += 1
+
+    result_by_part = []
+    for part_id in sorted(part_result_map):
+        part_result = part_result_map[part_id]
+        part_result["no_answer"] = (
+            part_result["total_question"] - (part_result["correct_count"] + part_result["incorrect_count"])
+        )
+        result_by_part.append(part_result)
+
+    return {
+        "correct_count": correct_count,
+        "incorrect_count": incorrect_count,
+        "correct_listening": correct_listening,
+        "correct_reading": correct_reading,
+        "result_by_part": result_by_part,
+    }
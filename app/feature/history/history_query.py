@@ -76,92 +76,17 @@ SELECT_HISTORY_BY_ID = """
 GET_TITLE_OF_TEST = "SELECT title FROM toeicapp_test WHERE id = %s"
 
 
-SELECT_CALCULATE_CORRECT_INCORRECT_FOR_TEST_BY_HISTORY_ID = """
-    SELECT
-        COALESCE(SUM(CASE WHEN a.is_correct = 1 THEN 1 ELSE 0 END), 0) AS correct_count,
-        COALESCE(SUM(CASE WHEN a.is_correct = 0 THEN 1 ELSE 0 END), 0) AS incorrect_count,
-        COALESCE(SUM(CASE WHEN a.is_correct = 1 AND q.question_number BETWEEN 1 AND 100
-                THEN 1 ELSE 0 END), 0) AS correct_listening,
-        COALESCE(SUM(CASE WHEN a.is_correct = 1 AND q.question_number >= 101
-                THEN 1 ELSE 0 END), 0) AS correct_reading
-    FROM toeicapp_history h
-    JOIN JSON_TABLE(
-        JSON_KEYS(h.dataprogress),
-        '$[*]' COLUMNS(question_id VARCHAR(64) PATH '$')
-    ) AS k
-    JOIN toeicapp_answer a 
-        ON a.id = JSON_UNQUOTE(
-                    JSON_EXTRACT(h.dataprogress, CONCAT('$."', k.question_id, '"'))
-                )
-    JOIN toeicapp_question q ON a.question_id = q.id
-    WHERE h.id = %s;
-"""
-
-
-SELECT_CALCULATE_CORRECT_ANSWER_BY_HISTORY_ID = """
-    SELECT
-        COALESCE(SUM(CASE WHEN a.is_correct = 1 THEN 1 ELSE 0 END), 0) AS correct_count
-    FROM toeicapp_history h
-    JOIN JSON_TABLE(
-        JSON_KEYS(h.dataprogress),
-        '$[*]' COLUMNS(question_id VARCHAR(64) PATH '$')
-    ) AS k
-    JOIN toeicapp_answer a 
-        ON a.id = JSON_UNQUOTE(
-                    JSON_EXTRACT(h.dataprogress, CONCAT('$."', k.question_id, '"'))
-                )
-    WHERE h.id = %s;
-"""
-
-
-SELECT_CALCULATE_CORRECT_INCORRECT_FOR_EACH_PART_BY_HISTORY_ID = """
+SELECT_ANSWER_KEY_BY_TEST = """
     SELECT
+        q.id AS question_id,
+        q.question_number,
         p.id AS part_id,
         p.part_order,
-        (SELECT COUNT(q.id) FROM toeicapp_question q WHERE q.part_id = p.id) AS total_question,
-        COALESCE(SUM(CASE WHEN a.is_correct = 1 THEN 1 ELSE 0 END), 0) AS correct_count,
-        COALESCE(SUM(CASE WHEN a.is_correct = 0 THEN 1 ELSE 0 END), 0) AS incorrect_count
-    FROM toeicapp_history h
-    JOIN JSON_TABLE(
-        JSON_KEYS(h.dataprogress),
-        '$[*]' COLUMNS(question_id VARCHAR(64) PATH '$')
-    ) AS k
-    JOIN toeicapp_question q ON q.id = CAST(k.question_id AS UNSIGNED)
-    JOIN toeicapp_part p ON q.part_id = p.id
-    LEFT JOIN toeicapp_answer a 
-        ON a.id = JSON_UNQUOTE(
-                    JSON_EXTRACT(h.dataprogress, CONCAT('$."', k.question_id, '"'))
-                )
-    WHERE h.id = %s
-    GROUP BY p.id, p.part_order
-    ORDER BY p.id;
-"""
-
-
-SELECT_COUNT_QUESTIONS_BY_TEST = """
-    SELECT count(q.id) AS question_by_test_count
+        a.id AS answer_id,
+        a.is_correct
     FROM toeicapp_testpart tp
-    JOIN toeicapp_question q ON tp.part_id = q.part_id
-    WHERE test_id = %s;
+    JOIN toeicapp_part p ON tp.part_id = p.id
+    JOIN toeicapp_question q ON q.part_id = p.id
+    JOIN toeicapp_answer a ON a.question_id = q.id
+    WHERE tp.test_id = %s;
 """
-
-
-def select_multiple_part_order_by_part_id(part_id_list):
-    placeholders = ", ".join(["%s"] * len(part_id_list))
-    return f"""
-        SELECT part_order 
-        FROM toeicapp_part 
-        WHERE id IN ({placeholders});
-    """
-
-
-def select_count_questions_by_multiple_part(part_id_list):
-    placeholders = ", ".join(["%s"] * len(part_id_list))
-    return f"""
-        SELECT COUNT(q.id) AS question_by_multiple_part_count
-        FROM toeicapp_testpart tp
-        JOIN toeicapp_part p ON tp.part_id = p.id
-        JOIN toeicapp_question q ON tp.part_id = q.part_id
-        WHERE test_id = %s
-        AND p.id IN ({placeholders});
-    """
\ No newline at end of file
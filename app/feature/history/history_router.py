@@ -1,5 +1,5 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import List, Optional
 
 
@@ -17,16 +17,18 @@ from app.feature.history.history_query import (
     UPDATE_HISTORY_BY_USER,
     SELECT_HISTORY_BY_ID, 
     SELECT_HISTORY_BY_STATUS,
-    SELECT_CALCULATE_CORRECT_INCORRECT_FOR_TEST_BY_HISTORY_ID,
-    SELECT_CALCULATE_CORRECT_ANSWER_BY_HISTORY_ID,
-    SELECT_CALCULATE_CORRECT_INCORRECT_FOR_EACH_PART_BY_HISTORY_ID,
     SELECT_SUBMIT_HISTORY_BY_USER,
     GET_TITLE_OF_TEST,
-    SELECT_COUNT_QUESTIONS_BY_TEST, 
-    select_count_questions_by_multiple_part,
-    select_multiple_part_order_by_part_id
+)
+from app.feature.history.history_answer_key import (
+    count_questions,
+    get_part_order_list,
+    get_test_answer_key,
+    score_data_progress,
 )
 from app.feature.test.test_const import TEST_TYPE
+from app.util.json_util import parse_json_column
+from app.util.response_encoding_util import build_negotiated_response
 
 
 router = APIRouter()
@@ -106,17 +108,15 @@ async def create_submit_history(
 
 
 @router.get("/save", response_model=Optional[HistoryResponse])
-async def get_save_progress_history(test_id: int, current_user: dict = Depends(get_current_user)):
+async def get_save_progress_history(request: Request, test_id: int, current_user: dict = Depends(get_current_user)):
     try:
         with get_db_cursor() as cursor:
             user_id = current_user.get("user_id")
             cursor.execute(SELECT_HISTORY_BY_STATUS, (user_id, test_id, 'save'))
             save_progress = cursor.fetchone()
-            
-            if not save_progress:
-                return None
 
-            return save_progress
+        # No saved progress: null, in the negotiated encoding as well
+        return build_negotiated_response(request, HistoryResponse, save_progress)
     
     except HTTPException:
         raise
@@ -131,80 +131,74 @@ async def get_save_progress_history(test_id: int, current_user: dict = Depends(g
 
 
 @router.get("/result/list", response_model=Optional[List[HistoryResultListResponse]])
-async def get_result_list(current_user: dict = Depends(get_current_user)):
+async def get_result_list(request: Request, current_user: dict = Depends(get_current_user)):
     try:
         user_id = current_user.get("user_id")
         with get_db_cursor() as cursor:
             cursor.execute(SELECT_SUBMIT_HISTORY_BY_USER, (user_id,))
             submit_history_list = cursor.fetchall()
             
-            if not submit_history_list:
-                return []
-            
-            results = []
+            # Get test info
+            test_name_map = {}
             for history in submit_history_list:
-
-                # Prepare data
-                history_id = history.get("id")
-                part_id_list = json.loads(history.get("part_id_list"))
                 test_id = history.get("test_id")
-                test_type = history.get("type")
-                create_at = history.get("create_at")
-                practice_duration = history.get("practice_duration") or 0
-                exam_duration = history.get("exam_duration") or 0
+                if test_id not in test_name_map:
+                    cursor.execute(GET_TITLE_OF_TEST, (test_id,))
+                    row = cursor.fetchone()
+                    test_name_map[test_id] = row.get("title")
 
-                # Get test info
-                cursor.execute(GET_TITLE_OF_TEST, (test_id,))
-                row = cursor.fetchone()
-                test_name = row.get("title")
+        results = []
+        for history in submit_history_list:
 
-                # Get part info. 
-                # If user selected PRACTICE MODE, get part orders by part_id_list
-                if part_id_list:
-                    part_order_query = select_multiple_part_order_by_part_id(part_id_list)
-                    cursor.execute(part_order_query, (*part_id_list,))
-                    part_order_rows = cursor.fetchall()
-                    part_order_list = [row.get("part_order") for row in part_order_rows]
-                
-                # If user selected EXAM MODE, return all parts
-                else:
-                    part_order_list = ["Part 1", "Part 2", "Part 3", "Part 4", "Part 5", "Part 6", "Part 7"]
+            # Prepare data
+            history_id = history.get("id")
+            part_id_list = json.loads(history.get("part_id_list"))
+            test_id = history.get("test_id")
+            test_type = history.get("type")
+            create_at = history.get("create_at")
+            practice_duration = history.get("practice_duration") or 0
+            exam_duration = history.get("exam_duration") or 0
+            data_progress = parse_json_column(history.get("data_progress")) or {}
 
-                # Handle question count
-                total_question = 0
-                # EXAM MODE: Counting all question by test_id
-                if test_type == TEST_TYPE.EXAM:
-                    cursor.execute(SELECT_COUNT_QUESTIONS_BY_TEST, (test_id,))
-                    row = cursor.fetchone()
-                    total_question = row.get("question_by_test_count")
+            answer_key = get_test_answer_key(test_id)
 
-                # PRACTICE MODE: Counting all question by part_orders
-                elif test_type == TEST_TYPE.PRACTICE:
-                    question_count_query = select_count_questions_by_multiple_part(part_id_list)
-                    cursor.execute(question_count_query, (test_id, *part_id_list))
-                    row = cursor.fetchone()
-                    total_question = row.get("question_by_multiple_part_count")
+            # Get part info. 
+            # If user selected PRACTICE MODE, get part orders by part_id_list
+            if part_id_list:
+                part_order_list = get_part_order_list(answer_key, part_id_list)
+            
+            # If user selected EXAM MODE, return all parts
+            else:
+                part_order_list = ["Part 1", "Part 2", "Part 3", "Part 4", "Part 5", "Part 6", "Part 7"]
+
+            # Handle question count
+            total_question = 0
+            # EXAM MODE: Counting all question by test_id
+            if test_type == TEST_TYPE.EXAM:
+                total_question = count_questions(answer_key)
 
-                # Handle calculating result
-                cursor.execute(SELECT_CALCULATE_CORRECT_ANSWER_BY_HISTORY_ID, (history_id,))
-                row = cursor.fetchone()
-                correct_count = row.get("correct_count")
-                score = f"{correct_count}/{total_question}" if total_question > 0 else "0/0"
+            # PRACTICE MODE: Counting all question by part_orders
+            elif test_type == TEST_TYPE.PRACTICE:
+                total_question = count_questions(answer_key, part_id_list)
 
-                results.append({
-                    "history_id": history_id,
-                    "test_id": test_id,
-                    "test_type": test_type,
-                    "create_at": create_at,
-                    "practice_duration": practice_duration,
-                    "exam_duration": exam_duration,
-                    "test_name": test_name,
-                    "score": score,
-                    "part_id_list": part_id_list,
-                    "part_order_list": part_order_list
-                })
+            # Handle calculating result
+            correct_count = score_data_progress(answer_key, data_progress)["correct_count"]
+            score = f"{correct_count}/{total_question}" if total_question > 0 else "0/0"
 
-        return results
+            results.append({
+                "history_id": history_id,
+                "test_id": test_id,
+                "test_type": test_type,
+                "create_at": create_at,
+                "practice_duration": practice_duration,
+                "exam_duration": exam_duration,
+                "test_name": test_name_map[test_id],
+                "score": score,
+                "part_id_list": part_id_list,
+                "part_order_list": part_order_list
+            })
+
+        return build_negotiated_response(request, List[HistoryResultListResponse], results)
     except HTTPException:
         raise
     except Exception as e:
@@ -218,7 +212,7 @@ async def get_result_list(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/result/detail", response_model=HistoryResultDetailResponse)
-async def get_result_detail(history_id: int, _: dict = Depends(get_current_user)):
+async def get_result_detail(request: Request, history_id: int, _: dict = Depends(get_current_user)):
     try:
         with get_db_cursor() as cursor:
             cursor.execute(SELECT_HISTORY_BY_ID, (history_id,))
@@ -229,62 +223,47 @@ async def get_result_detail(history_id: int, _: dict = Depends(get_current_user)
                     detail="User history not found"
                 )
             
-            # Prepare data
-            history_id = history.get("id")
-            part_id_list = json.loads(history.get("part_id_list"))
-            test_id = history.get("test_id")
-            test_type = history.get("type")
-            create_at = history.get("create_at")
-            practice_duration = history.get("practice_duration") or 0
-            exam_duration = history.get("exam_duration") or 0
-            data_progress = history.get("data_progress")
-            
-            cursor.execute(GET_TITLE_OF_TEST, (test_id,))
+            cursor.execute(GET_TITLE_OF_TEST, (history.get("test_id"),))
             row = cursor.fetchone()
             test_name = row.get("title")
-            
-            # Handle question count
-            total_question = 0
-            # EXAM MODE: Counting all question by test_id
-            if test_type == TEST_TYPE.EXAM:
-                cursor.execute(SELECT_COUNT_QUESTIONS_BY_TEST, (test_id,))
-                row = cursor.fetchone()
-                total_question = row.get("question_by_test_count")
-            
-            # PRACTICE MODE: Counting all question by part_orders
-            elif test_type == TEST_TYPE.PRACTICE:
-                question_count_query = select_count_questions_by_multiple_part(part_id_list)
-                cursor.execute(question_count_query, (test_id, *part_id_list))
-                row = cursor.fetchone()
-                total_question = row.get("question_by_multiple_part_count")
 
-            # Handle calculating result
-            cursor.execute(SELECT_CALCULATE_CORRECT_INCORRECT_FOR_TEST_BY_HISTORY_ID, (history_id,))
-            row = cursor.fetchone()
-            correct_count = row.get("correct_count")
-            incorrect_count = row.get("incorrect_count")
-            correct_listening = row.get("correct_listening")
-            correct_reading = row.get("correct_reading")
-            
-            total_answer = incorrect_count + correct_count
-            no_answer = total_question - total_answer
-            accuracy = (correct_count / total_question) * 100 if total_answer > 0 else 0
-            
-            # Calculate correct answer by part
-            cursor.execute(SELECT_CALCULATE_CORRECT_INCORRECT_FOR_EACH_PART_BY_HISTORY_ID, (history_id,))
-            part_results = cursor.fetchall()
-            result_by_part = [
-                {
-                    "part_order": row.get("part_order"),
-                    "total_question": row.get("total_question"),
-                    "correct_count": row.get("correct_count"),
-                    "incorrect_count": row.get("incorrect_count"),
-                    "no_answer": row.get("total_question") - (row.get("correct_count") + row.get("incorrect_count")),
-                }
-                for row in part_results
-            ]
+        # Prepare data
+        history_id = history.get("id")
+        part_id_list = json.loads(history.get("part_id_list"))
+        test_id = history.get("test_id")
+        test_type = history.get("type")
+        create_at = history.get("create_at")
+        practice_duration = history.get("practice_duration") or 0
+        exam_duration = history.get("exam_duration") or 0
+        data_progress = history.get("data_progress")
+
+        answer_key = get_test_answer_key(test_id)
         
-        return {
+        # Handle question count
+        total_question = 0
+        # EXAM MODE: Counting all question by test_id
+        if test_type == TEST_TYPE.EXAM:
+            total_question = count_questions(answer_key)
+        
+        # PRACTICE MODE: Counting all question by part_orders
+        elif test_type == TEST_TYPE.PRACTICE:
+            total_question = count_questions(answer_key, part_id_list)
+
+        # Handle calculating result (in memory, from the cached answer key)
+        history_score = score_data_progress(answer_key, parse_json_column(data_progress) or {})
+        correct_count = history_score["correct_count"]
+        incorrect_count = history_score["incorrect_count"]
+        correct_listening = history_score["correct_listening"]
+        correct_reading = history_score["correct_reading"]
+        
+        total_answer = incorrect_count + correct_count
+        no_answer = total_question - total_answer
+        accuracy = (correct_count / total_question) * 100 if total_answer > 0 else 0
+        
+        # Correct answer by part
+        result_by_part = history_score["result_by_part"]
+        
+        return build_negotiated_response(request, HistoryResultDetailResponse, {
             "history_id": history_id,
             "test_id": test_id,
             "test_type": test_type, 
@@ -302,7 +281,7 @@ async def get_result_detail(history_id: int, _: dict = Depends(get_current_user)
             "data_progress": data_progress,
             "part_id_list": part_id_list,
             "result_by_part": result_by_part,
-        }
+        })
 
     except HTTPException:
         raise
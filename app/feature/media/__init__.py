@@ -0,0 +1 @@
+# Media feature module
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""Decode base64 images stored in toeicapp_media.paragrap_main"""
+
+import base64
+import re
+from typing import Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+
+# An image is a value starting with one of these prefixes: the LIKE patterns of
+# SELECT_TEST_DETAIL_PROC, SELECT_TEST_PART_DETAIL_PROC and
+# SELECT_MEDIA_CONTENT_LIST_BY_ID_LIST, compared case-insensitively like the
+# utf8mb4_unicode_ci collation of the database. Keep both lists identical.
+DATA_URL_PREFIX = "data:image/"
+# Leading characters of base64-encoded image files, with the type they imply
+RAW_BASE64_IMAGE_PREFIX_MAP = {
+    "ivborw0kggo": "image/png",
+    "/9j/": "image/jpeg",
+    "r0lgod": "image/gif",
+    "uklgr": "image/webp",
+}
+
+NON_BASE64_CHARACTER_PATTERN = re.compile(r"[^A-Za-z0-9+/]")
+
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def detect_image_content_type(image_bytes: bytes) -> Optional[str]:
+    """
+    Detect the content type of an image from its leading bytes.
+
+    Returns:
+        MIME type like "image/png", or None if the bytes are not a supported image
+    """
+    for signature, content_type in IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return content_type
+
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+
+    return None
+
+
+def _get_raw_base64_image_content_type(value: str) -> Optional[str]:
+    lower_value = value[:max(map(len, RAW_BASE64_IMAGE_PREFIX_MAP))].lower()
+    for prefix, content_type in RAW_BASE64_IMAGE_PREFIX_MAP.items():
+        if lower_value.startswith(prefix):
+            return content_type
+    return None
+
+
+def is_base64_image(main_paragraph: Optional[str]) -> bool:
+    """
+    Check whether a paragrap_main value holds an image rather than a text passage,
+    with the same rule as the procedures (see DATA_URL_PREFIX).
+
+    An image is either a data URL ("data:image/png;base64,...") or raw base64 of a
+    PNG / JPEG / GIF / WEBP file.
+    """
+    if not main_paragraph:
+        return False
+
+    return (
+        main_paragraph[:len(DATA_URL_PREFIX)].lower() == DATA_URL_PREFIX
+        or _get_raw_base64_image_content_type(main_paragraph) is not None
+    )
+
+
+def _decode_base64_leniently(value: str) -> bytes:
+    # Stored values may hold line breaks, URL-safe characters or lose their padding
+    data = NON_BASE64_CHARACTER_PATTERN.sub("", value.replace("-", "+").replace("_", "/"))
+    if len(data) % 4 == 1:
+        # A lone trailing character carries no full byte
+        data = data[:-1]
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def decode_base64_image(main_paragraph: Optional[str]) -> Optional[Tuple[bytes, str]]:
+    """
+    Decode a paragrap_main value into binary image data.
+
+    Every value the procedures turn into an image URL decodes, leniently, so
+    GET /media/{id}/image never answers 404 for a media they link to.
+
+    Args:
+        main_paragraph: Data URL or raw base64 string from the database
+
+    Returns:
+        (image_bytes, content_type), or None if the value is not an image
+    """
+    if not is_base64_image(main_paragraph):
+        return None
+
+    if main_paragraph[:len(DATA_URL_PREFIX)].lower() == DATA_URL_PREFIX:
+        header, _, data = main_paragraph.partition(",")
+        media_type, *parameter_list = header[len("data:"):].split(";")
+        declared_content_type = media_type.strip().lower()
+        if "base64" in (parameter.strip().lower() for parameter in parameter_list):
+            image_bytes = _decode_base64_leniently(data)
+        else:
+            # Percent-encoded data URL, e.g. an SVG
+            image_bytes = unquote_to_bytes(data)
+    else:
+        declared_content_type = _get_raw_base64_image_content_type(main_paragraph)
+        image_bytes = _decode_base64_leniently(main_paragraph)
+
+    # Trust the file signature over the declared type; keep the declared type
+    # for formats without one (e.g. SVG)
+    return image_bytes, detect_image_content_type(image_bytes) or declared_content_type
@@ -0,0 +1,8 @@
+"""Media related queries"""
+
+
+SELECT_MEDIA_MAIN_PARAGRAPH_BY_ID = """
+    SELECT paragrap_main AS main_paragraph
+    FROM toeicapp_media
+    WHERE id = %s;
+"""
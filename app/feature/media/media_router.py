@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.core.mysql_connection import get_db_cursor
+from app.feature.media.media_image_util import decode_base64_image
+from app.feature.media.media_query import SELECT_MEDIA_MAIN_PARAGRAPH_BY_ID
+from app.feature.test.test_cache import get_or_load_media_payload
+from app.util.http_cache_util import build_cached_payload, build_cached_response
+
+
+# Images only change with a content import; clients revalidate with the ETag afterwards
+MEDIA_IMAGE_CACHE_CONTROL = "public, max-age=604800"
+
+
+router = APIRouter()
+
+
+def _select_media_image(media_id: int):
+    with get_db_cursor() as cursor:
+        cursor.execute(SELECT_MEDIA_MAIN_PARAGRAPH_BY_ID, (media_id,))
+        row = cursor.fetchone()
+
+    if not row:
+        return None
+
+    decoded_image = decode_base64_image(row.get("main_paragraph"))
+    if not decoded_image:
+        return None
+
+    image_bytes, content_type = decoded_image
+    return build_cached_payload(image_bytes, media_type=content_type)
+
+
+@router.get("/{media_id}/image", description="Returns the decoded image of a media as binary")
+async def get_media_image(media_id: int, request: Request):
+    try:
+        payload = get_or_load_media_payload("image", media_id, lambda: _select_media_image(media_id))
+
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Image not found for media id {media_id}"
+            )
+
+        return build_cached_response(request, payload, cache_control=MEDIA_IMAGE_CACHE_CONTROL)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "message": "Error in get media image controller",
+                "error": str(e),
+            },
+        )
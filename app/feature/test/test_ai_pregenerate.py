@@ -0,0 +1,245 @@
+"""
+Bulk pre-generation of question translations and explanations, so users get
+cache hits instead of waiting for Gemini.
+
+Run (e.g. at night, after each content import):
+    python -m app.feature.test.test_ai_pregenerate run --test-id 12
+    python -m app.feature.test.test_ai_pregenerate run --test-bank-id 3 --language vi --kind explain
+
+Questions are sent AI_BATCH_QUESTION_COUNT per Gemini call (see
+test_ai_service), with at most --concurrency calls in flight and at most
+--requests-per-minute calls started per minute. The calls have the background
+priority of gemini_scheduler: they take from the Gemini quota shared with the
+API workers, and leave GEMINI_BACKGROUND_RESERVE_RATIO of it to them.
+
+The checkpoint file records, per kind and language, the questions that have
+an artifact; an interrupted run started again with the same checkpoint skips
+them without reading the database.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.app_config import app_config
+from app.core.gemini_scheduler import GEMINI_PRIORITY, use_gemini_priority
+from app.core.mysql_connection import get_db_cursor
+from app.feature.test.test_ai_service import (
+    get_or_generate_question_artifact_list,
+    select_question_artifact_source_list,
+)
+from app.feature.test.test_const import AI_ARTIFACT_KIND
+from app.feature.test.test_query import (
+    SELECT_QUESTION_ID_LIST_BY_PART_ID,
+    SELECT_QUESTION_ID_LIST_BY_TEST_BANK_ID,
+    SELECT_QUESTION_ID_LIST_BY_TEST_ID,
+)
+from app.util.languge_util import LANGUAGE_MAP
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CHECKPOINT_PATH = "ai_pregenerate_checkpoint.json"
+# Questions per cache lookup of the scan
+SCAN_QUESTION_COUNT = 500
+
+
+class PregenerateCheckpoint:
+    """Question ids with an artifact, per "<kind>:<language>" job, persisted to a JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._done_map: Dict[str, Set[int]] = {}
+
+    @staticmethod
+    def get_job_key(kind: AI_ARTIFACT_KIND, language_id: str) -> str:
+        return f"{kind.value}:{language_id}"
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._done_map = {job_key: set(id_list) for job_key, id_list in json.load(f).items()}
+        except FileNotFoundError:
+            self._done_map = {}
+
+    def save(self) -> None:
+        # Write then rename, so an interruption never leaves a truncated checkpoint
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({job_key: sorted(id_set) for job_key, id_set in self._done_map.items()}, f)
+        os.replace(temporary_path, self.path)
+
+    def get_done_set(self, kind: AI_ARTIFACT_KIND, language_id: str) -> Set[int]:
+        return self._done_map.setdefault(self.get_job_key(kind, language_id), set())
+
+    def mark_done(self, kind: AI_ARTIFACT_KIND, language_id: str, question_id_list: Iterable[int]) -> None:
+        self.get_done_set(kind, language_id).update(question_id_list)
+
+
+class RateLimiter:
+    """Spread call starts evenly: at most requests_per_minute per minute."""
+
+    def __init__(self, requests_per_minute: float):
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._next_time > now:
+                await asyncio.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time) + self._interval
+
+
+def select_question_id_list_by_scope(
+    test_id: Optional[int],
+    part_id: Optional[int],
+    test_bank_id: Optional[int],
+) -> List[int]:
+    with get_db_cursor() as cursor:
+        if test_id is not None:
+            cursor.execute(SELECT_QUESTION_ID_LIST_BY_TEST_ID, (test_id,))
+        elif part_id is not None:
+            cursor.execute(SELECT_QUESTION_ID_LIST_BY_PART_ID, (part_id,))
+        else:
+            cursor.execute(SELECT_QUESTION_ID_LIST_BY_TEST_BANK_ID, (test_bank_id,))
+        # A part shared by several tests appears once
+        return list(dict.fromkeys(row["question_id"] for row in cursor.fetchall()))
+
+
+async def _select_missing_question_id_list(
+    kind: AI_ARTIFACT_KIND,
+    language_id: str,
+    question_id_list: List[int],
+    checkpoint: PregenerateCheckpoint,
+) -> List[int]:
+    """Questions of the job without an artifact; the others are checkpointed as done."""
+    done_set = checkpoint.get_done_set(kind, language_id)
+    pending_id_list = [question_id for question_id in question_id_list if question_id not in done_set]
+
+    missing_id_list = []
+    for i in range(0, len(pending_id_list), SCAN_QUESTION_COUNT):
+        scan_id_list = pending_id_list[i:i + SCAN_QUESTION_COUNT]
+        _, question_block_map = await run_in_threadpool(
+            select_question_artifact_source_list, kind, scan_id_list, language_id
+        )
+        missing_id_list.extend(question_id for question_id in scan_id_list if question_id in question_block_map)
+        # Cached, or no longer existing: nothing to generate
+        checkpoint.mark_done(kind, language_id, (
+            question_id for question_id in scan_id_list if question_id not in question_block_map
+        ))
+
+    checkpoint.save()
+    return missing_id_list
+
+
+async def pregenerate_question_artifacts(
+    question_id_list: List[int],
+    kind_list: List[AI_ARTIFACT_KIND],
+    language_id_list: List[str],
+    checkpoint: PregenerateCheckpoint,
+    concurrency: int,
+    requests_per_minute: float,
+) -> Tuple[int, int]:
+    """
+    Generate the missing artifacts of the questions for every kind and language.
+
+    Returns:
+        (number of generated artifacts, number of failed artifacts)
+    """
+    chunk_size = max(app_config.AI_BATCH_QUESTION_COUNT, 1)
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    rate_limiter = RateLimiter(requests_per_minute)
+    counter = {"generated": 0, "failed": 0}
+
+    async def generate_chunk(kind: AI_ARTIFACT_KIND, language_id: str, chunk_id_list: List[int]) -> None:
+        async with semaphore:
+            await rate_limiter.wait()
+            try:
+                artifact_list = await get_or_generate_question_artifact_list(kind, chunk_id_list, language_id)
+            except Exception as e:
+                # Not checkpointed: retried by the next run
+                logger.error(f"{kind.value}/{language_id} of questions {chunk_id_list} failed: {e}")
+                counter["failed"] += len(chunk_id_list)
+                return
+
+        checkpoint.mark_done(kind, language_id, chunk_id_list)
+        checkpoint.save()
+        counter["generated"] += len(artifact_list)
+        logger.info(f"{kind.value}/{language_id}: {len(artifact_list)} artifacts of questions {chunk_id_list[0]}..{chunk_id_list[-1]}")
+
+    task_list = []
+    for kind in kind_list:
+        for language_id in language_id_list:
+            missing_id_list = await _select_missing_question_id_list(kind, language_id, question_id_list, checkpoint)
+            logger.info(f"{kind.value}/{language_id}: {len(missing_id_list)} of {len(question_id_list)} questions to generate")
+            task_list.extend(
+                generate_chunk(kind, language_id, missing_id_list[i:i + chunk_size])
+                for i in range(0, len(missing_id_list), chunk_size)
+            )
+
+    await asyncio.gather(*task_list)
+    return counter["generated"], counter["failed"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate question translations and explanations with Gemini")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Generate the missing artifacts of a test, a part or a test bank")
+    scope_group = run_parser.add_mutually_exclusive_group(required=True)
+    scope_group.add_argument("--test-id", type=int, help="Questions of a test")
+    scope_group.add_argument("--part-id", type=int, help="Questions of a part")
+    scope_group.add_argument("--test-bank-id", type=int, help="Questions of the visible tests of a test bank")
+    run_parser.add_argument(
+        "--language", dest="language_id_list", action="append", choices=list(LANGUAGE_MAP),
+        help="Target language, repeatable (default: every language)",
+    )
+    run_parser.add_argument(
+        "--kind", dest="kind_list", action="append", choices=[kind.value for kind in AI_ARTIFACT_KIND],
+        help="Artifact kind, repeatable (default: every kind)",
+    )
+    run_parser.add_argument("--concurrency", type=int, default=4, help="Maximum Gemini calls in flight")
+    run_parser.add_argument("--requests-per-minute", type=float, default=60, help="Maximum Gemini calls started per minute (0 for no limit)")
+    run_parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="Checkpoint file, reused to resume an interrupted run")
+    run_parser.add_argument("--reset", action="store_true", help="Ignore the existing checkpoint")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "run":
+        checkpoint = PregenerateCheckpoint(args.checkpoint)
+        if not args.reset:
+            checkpoint.load()
+
+        question_id_list = select_question_id_list_by_scope(args.test_id, args.part_id, args.test_bank_id)
+        kind_list = [AI_ARTIFACT_KIND(kind) for kind in args.kind_list] if args.kind_list else list(AI_ARTIFACT_KIND)
+        language_id_list = args.language_id_list or list(LANGUAGE_MAP)
+
+        # The reserve of the shared Gemini quota is left to the requests of the API
+        with use_gemini_priority(GEMINI_PRIORITY.BACKGROUND):
+            generated_count, failed_count = asyncio.run(pregenerate_question_artifacts(
+                question_id_list,
+                kind_list,
+                language_id_list,
+                checkpoint,
+                args.concurrency,
+                args.requests_per_minute,
+            ))
+        print(f"{generated_count} artifacts generated, {failed_count} failed")
+        if failed_count:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
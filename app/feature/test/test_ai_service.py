@@ -0,0 +1,646 @@
+"""
+Question AI artifacts (translation / explanation) generated with Gemini.
+
+A request goes through three steps so the pooled MySQL connection is never
+held during the LLM call:
+    1. read      -> one short checkout: cached artifact, or the question block
+    2. generate  -> Gemini call, no connection held
+    3. write     -> one short checkout to persist the artifact
+
+Artifacts live in toeicapp_question_artifact, one row per (question, language,
+kind). The single-language columns of toeicapp_question are only read as a
+fallback for artifacts generated before the table existed.
+
+Concurrent requests for the same (kind, question, language) share one
+generation; with AI_GENERATION_LOCK_DIRECTORY set, workers also coordinate
+through lock files so only one of them calls Gemini.
+
+Batches (a media group, a part, a list of questions) go through the same steps
+with one Gemini call per AI_BATCH_QUESTION_COUNT missing questions, so the
+prompt instructions are sent once per chunk instead of once per question. Each
+question of a chunk takes the same single-flight key and lock file as a single
+request, so overlapping batch and single requests share the generation.
+
+Streams send the artifact as Server-Sent Events while Gemini writes it:
+    event: field  -> {"name": <field>, "value": <value>}, once per completed top-level field
+    event: done   -> the whole artifact, once saved
+    event: error  -> {"detail": <message>}, the stream ends without a done event
+"""
+
+import asyncio
+import json
+import logging
+import os
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.app_config import app_config
+from app.core.gemini_client import (
+    GeminiTextStream,
+    generate_text_with_gemini_async,
+    open_text_stream_with_gemini_async,
+)
+from app.core.mysql_connection import get_db_cursor
+from app.feature.test.test_const import AI_ARTIFACT_KIND
+from app.feature.test.test_schema import GeminiExplainQuestionOutput, GeminiTranslateQuestionResponse
+from app.feature.test.test_prompt_helper import (
+    build_question_explain_prompt,
+    build_question_list_explain_prompt,
+    build_question_list_translation_prompt,
+    build_question_translation_prompt,
+    normalize_explain_artifact,
+    parse_gemini_json_response,
+)
+from app.feature.test.test_query import (
+    SELECT_QUESTION_ARTIFACT_JSON,
+    SELECT_QUESTION_ARTIFACT_JSON_LIST,
+    SELECT_QUESTION_BLOCK_JSON_BY_ID,
+    SELECT_QUESTION_BLOCK_JSON_LIST_BY_ID_LIST,
+    SELECT_QUESTION_EXPLAIN_BLOCK_JSON_BY_ID,
+    SELECT_QUESTION_EXPLAIN_BLOCK_JSON_LIST_BY_ID_LIST,
+    SELECT_QUESTION_EXPLAIN_JSON,
+    SELECT_QUESTION_EXPLAIN_JSON_LIST,
+    SELECT_QUESTION_ID_LIST_BY_MEDIA_GROUP_ID,
+    SELECT_QUESTION_ID_LIST_BY_PART_ID,
+    SELECT_QUESTION_TRANSLATE_JSON,
+    SELECT_QUESTION_TRANSLATE_JSON_LIST,
+    UPSERT_QUESTION_ARTIFACT_JSON,
+)
+from app.util.incremental_json_util import IncrementalJsonObjectParser
+from app.util.json_util import parse_json_column
+from app.util.query_util import format_id_list_query
+from app.util.single_flight_util import SingleFlight, acquire_file_lock
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class _ArtifactSpec:
+    # Legacy single-language column of toeicapp_question
+    select_legacy_artifact_query: str
+    select_legacy_artifact_list_query: str
+    legacy_artifact_column: str
+    select_block_query: str
+    select_block_list_query: str
+    block_column: str
+    build_prompt: Callable[[str, str], str]
+    build_list_prompt: Callable[[str, str], str]
+    # Structured output requested from Gemini, and its conversion to the stored artifact
+    response_schema: type
+    normalize_artifact: Callable[[dict], dict]
+    label: str
+
+
+_ARTIFACT_SPEC_MAP = {
+    AI_ARTIFACT_KIND.TRANSLATE: _ArtifactSpec(
+        select_legacy_artifact_query=SELECT_QUESTION_TRANSLATE_JSON,
+        select_legacy_artifact_list_query=SELECT_QUESTION_TRANSLATE_JSON_LIST,
+        legacy_artifact_column="question_translate_json",
+        select_block_query=SELECT_QUESTION_BLOCK_JSON_BY_ID,
+        select_block_list_query=SELECT_QUESTION_BLOCK_JSON_LIST_BY_ID_LIST,
+        block_column="question_block_json",
+        build_prompt=build_question_translation_prompt,
+        build_list_prompt=build_question_list_translation_prompt,
+        response_schema=GeminiTranslateQuestionResponse,
+        normalize_artifact=lambda artifact: artifact,
+        label="translation",
+    ),
+    AI_ARTIFACT_KIND.EXPLAIN: _ArtifactSpec(
+        select_legacy_artifact_query=SELECT_QUESTION_EXPLAIN_JSON,
+        select_legacy_artifact_list_query=SELECT_QUESTION_EXPLAIN_JSON_LIST,
+        legacy_artifact_column="question_explain_json",
+        select_block_query=SELECT_QUESTION_EXPLAIN_BLOCK_JSON_BY_ID,
+        select_block_list_query=SELECT_QUESTION_EXPLAIN_BLOCK_JSON_LIST_BY_ID_LIST,
+        block_column="question_explain_block_json",
+        build_prompt=build_question_explain_prompt,
+        build_list_prompt=build_question_list_explain_prompt,
+        response_schema=GeminiExplainQuestionOutput,
+        normalize_artifact=normalize_explain_artifact,
+        label="explanation",
+    ),
+}
+
+
+def select_question_artifact_source(
+    kind: AI_ARTIFACT_KIND,
+    question_id: int,
+    language_id: str,
+) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Read step: the cached artifact, or the question block to generate it from.
+
+    Returns:
+        (cached artifact, None) on a cache hit, (None, question block JSON) on a
+        miss, (None, None) if the question does not exist
+    """
+    spec = _ARTIFACT_SPEC_MAP[kind]
+
+    with get_db_cursor() as cursor:
+        cursor.execute(SELECT_QUESTION_ARTIFACT_JSON, (question_id, language_id, kind.value))
+        artifact_row = cursor.fetchone()
+        if artifact_row:
+            return parse_json_column(artifact_row["artifact_json"]), None
+
+        cursor.execute(spec.select_legacy_artifact_query, (question_id,))
+        legacy_row = cursor.fetchone()
+        legacy_artifact = parse_json_column(legacy_row.get(spec.legacy_artifact_column)) if legacy_row else None
+        # The legacy column holds a single language
+        if legacy_artifact and legacy_artifact.get("language_id") == language_id:
+            # Move it to the artifact table, where other languages can't overwrite it
+            cursor.execute(
+                UPSERT_QUESTION_ARTIFACT_JSON,
+                (question_id, language_id, kind.value, json.dumps(legacy_artifact)),
+            )
+            return legacy_artifact, None
+
+        cursor.execute(spec.select_block_query, (question_id,))
+        row = cursor.fetchone()
+
+    return None, (row.get(spec.block_column) if row else None)
+
+
+def save_question_artifact(kind: AI_ARTIFACT_KIND, question_id: int, language_id: str, artifact: dict) -> None:
+    """Write step: persist a generated artifact next to the other languages."""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            UPSERT_QUESTION_ARTIFACT_JSON,
+            (question_id, language_id, kind.value, json.dumps(artifact)),
+        )
+
+
+def _check_question_artifact(kind: AI_ARTIFACT_KIND, artifact, question_id: int, language_id: str) -> dict:
+    """
+    Normalize Gemini's artifact of one question, like the batch path does.
+
+    Raises:
+        ValueError: The answer is not a JSON object, or is for another question
+    """
+    spec = _ARTIFACT_SPEC_MAP[kind]
+    if not isinstance(artifact, dict):
+        raise ValueError(f"Gemini {spec.label} is not a JSON object")
+    if artifact.get("question_id") != question_id:
+        raise ValueError(f"Gemini {spec.label} is for question {artifact.get('question_id')}, not {question_id}")
+    # Saved and served under the requested language, whatever Gemini wrote
+    artifact["language_id"] = language_id
+    return spec.normalize_artifact(artifact)
+
+
+async def generate_question_artifact(
+    kind: AI_ARTIFACT_KIND,
+    question_id: int,
+    question_block_json: str,
+    language_id: str,
+) -> dict:
+    """Generate step: build the prompt and parse Gemini's JSON answer."""
+    spec = _ARTIFACT_SPEC_MAP[kind]
+
+    prompt = spec.build_prompt(question_block_json, language_id)
+    gemini_response = await generate_text_with_gemini_async(prompt, response_schema=spec.response_schema)
+    if not gemini_response:
+        raise Exception(f"Failed to get {spec.label} from Gemini")
+
+    artifact = parse_gemini_json_response(gemini_response, spec.label)
+    return _check_question_artifact(kind, artifact, question_id, language_id)
+
+
+_generation_single_flight = SingleFlight()
+
+
+def _get_generation_lock_path(kind: AI_ARTIFACT_KIND, question_id: int, language_id: str) -> Optional[str]:
+    if not app_config.AI_GENERATION_LOCK_DIRECTORY:
+        return None
+    os.makedirs(app_config.AI_GENERATION_LOCK_DIRECTORY, exist_ok=True)
+    return os.path.join(app_config.AI_GENERATION_LOCK_DIRECTORY, f"{kind.value}_{question_id}_{language_id}.lock")
+
+
+async def _generate_and_save_question_artifact(
+    kind: AI_ARTIFACT_KIND,
+    question_id: int,
+    language_id: str,
+    question_block_json: str,
+) -> dict:
+    lock_path = _get_generation_lock_path(kind, question_id, language_id)
+    async with acquire_file_lock(lock_path, app_config.AI_GENERATION_LOCK_TIMEOUT_SECONDS) as is_locked:
+        if is_locked:
+            # Another worker may have generated it while this one waited for the lock
+            cached_artifact, _ = await run_in_threadpool(
+                select_question_artifact_source, kind, question_id, language_id
+            )
+            if cached_artifact is not None:
+                return cached_artifact
+
+        artifact = await generate_question_artifact(kind, question_id, question_block_json, language_id)
+
+        await run_in_threadpool(save_question_artifact, kind, question_id, language_id, artifact)
+        return artifact
+
+
+def _generate_question_artifact_once(
+    kind: AI_ARTIFACT_KIND,
+    question_id: int,
+    language_id: str,
+    question_block_json: str,
+) -> Awaitable[dict]:
+    return _generation_single_flight.run(
+        (kind, question_id, language_id),
+        lambda: _generate_and_save_question_artifact(kind, question_id, language_id, question_block_json),
+    )
+
+
+async def get_or_generate_question_artifact(
+    kind: AI_ARTIFACT_KIND,
+    question_id: int,
+    language_id: str,
+) -> Optional[dict]:
+    """
+    Get the translation / explanation of a question, generating it on a miss.
+
+    Returns:
+        The artifact, or None if the question does not exist
+    """
+    cached_artifact, question_block_json = await run_in_threadpool(
+        select_question_artifact_source, kind, question_id, language_id
+    )
+    if cached_artifact is not None:
+        return cached_artifact
+    if not question_block_json:
+        return None
+
+    return await _generate_question_artifact_once(kind, question_id, language_id, question_block_json)
+
+
+def select_question_id_list(media_group_id: Optional[int], part_id: Optional[int]) -> List[int]:
+    """Question ids of a media group or a part, in question number order."""
+    with get_db_cursor() as cursor:
+        if media_group_id is not None:
+            cursor.execute(SELECT_QUESTION_ID_LIST_BY_MEDIA_GROUP_ID, (media_group_id,))
+        else:
+            cursor.execute(SELECT_QUESTION_ID_LIST_BY_PART_ID, (part_id,))
+        return [row["question_id"] for row in cursor.fetchall()]
+
+
+def select_question_artifact_source_list(
+    kind: AI_ARTIFACT_KIND,
+    question_id_list: List[int],
+    language_id: str,
+) -> Tuple[Dict[int, dict], Dict[int, str]]:
+    """
+    Batch read step: select_question_artifact_source for several questions in one checkout.
+
+    Returns:
+        ({question id: cached artifact}, {question id: question block JSON} of
+        the misses); questions that do not exist are in neither
+    """
+    spec = _ARTIFACT_SPEC_MAP[kind]
+    artifact_map: Dict[int, dict] = {}
+
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            format_id_list_query(SELECT_QUESTION_ARTIFACT_JSON_LIST, question_id_list),
+            (language_id, kind.value, *question_id_list),
+        )
+        for row in cursor.fetchall():
+            artifact_map[row["question_id"]] = parse_json_column(row["artifact_json"])
+
+        missing_id_list = [question_id for question_id in question_id_list if question_id not in artifact_map]
+        if not missing_id_list:
+            return artifact_map, {}
+
+        cursor.execute(format_id_list_query(spec.select_legacy_artifact_list_query, missing_id_list), missing_id_list)
+        legacy_artifact_map = {}
+        for row in cursor.fetchall():
+            legacy_artifact = parse_json_column(row.get(spec.legacy_artifact_column))
+            # The legacy column holds a single language
+            if legacy_artifact and legacy_artifact.get("language_id") == language_id:
+                legacy_artifact_map[row["question_id"]] = legacy_artifact
+        if legacy_artifact_map:
+            # Move them to the artifact table, where other languages can't overwrite them
+            cursor.executemany(
+                UPSERT_QUESTION_ARTIFACT_JSON,
+                [
+                    (question_id, language_id, kind.value, json.dumps(legacy_artifact))
+                    for question_id, legacy_artifact in legacy_artifact_map.items()
+                ],
+            )
+            artifact_map.update(legacy_artifact_map)
+            missing_id_list = [question_id for question_id in missing_id_list if question_id not in artifact_map]
+            if not missing_id_list:
+                return artifact_map, {}
+
+        cursor.execute(format_id_list_query(spec.select_block_list_query, missing_id_list), missing_id_list)
+        block_map = {row["question_id"]: row.get(spec.block_column) for row in cursor.fetchall()}
+
+    return artifact_map, block_map
+
+
+def save_question_artifact_list(kind: AI_ARTIFACT_KIND, language_id: str, artifact_map: Dict[int, dict]) -> None:
+    """Batch write step: persist generated artifacts in one checkout."""
+    with get_db_cursor() as cursor:
+        cursor.executemany(
+            UPSERT_QUESTION_ARTIFACT_JSON,
+            [
+                (question_id, language_id, kind.value, json.dumps(artifact))
+                for question_id, artifact in artifact_map.items()
+            ],
+        )
+
+
+async def generate_question_artifact_list(
+    kind: AI_ARTIFACT_KIND,
+    question_block_map: Dict[int, str],
+    language_id: str,
+) -> Dict[int, dict]:
+    """
+    Batch generate step: one Gemini call for several question blocks.
+
+    Returns:
+        {question id: artifact} of the questions found in Gemini's answer
+
+    Raises:
+        ValueError: The answer is not a JSON array
+    """
+    spec = _ARTIFACT_SPEC_MAP[kind]
+
+    # The blocks are JSON already
+    question_block_list_json = "[" + ", ".join(question_block_map.values()) + "]"
+    prompt = spec.build_list_prompt(question_block_list_json, language_id)
+    gemini_response = await generate_text_with_gemini_async(prompt, response_schema=list[spec.response_schema])
+    if not gemini_response:
+        raise Exception(f"Failed to get {spec.label} list from Gemini")
+
+    artifact_list = parse_gemini_json_response(gemini_response, f"{spec.label} list")
+    if not isinstance(artifact_list, list):
+        raise ValueError(f"Gemini {spec.label} list is not a JSON array")
+
+    artifact_map = {}
+    for artifact in artifact_list:
+        question_id = artifact.get("question_id") if isinstance(artifact, dict) else None
+        # Ignore questions Gemini made up or answered twice
+        if question_id in question_block_map and question_id not in artifact_map:
+            artifact["language_id"] = language_id
+            artifact_map[question_id] = spec.normalize_artifact(artifact)
+    return artifact_map
+
+
+async def _generate_and_save_question_artifact_chunk(
+    kind: AI_ARTIFACT_KIND,
+    question_block_map: Dict[int, str],
+    language_id: str,
+) -> Dict[int, dict]:
+    async with AsyncExitStack() as lock_stack:
+        is_locked = False
+        # Same lock files as the single question path, taken in id order so
+        # workers with overlapping chunks never wait on each other in a cycle
+        for question_id in sorted(question_block_map):
+            lock_path = _get_generation_lock_path(kind, question_id, language_id)
+            is_locked |= await lock_stack.enter_async_context(
+                acquire_file_lock(lock_path, app_config.AI_GENERATION_LOCK_TIMEOUT_SECONDS)
+            )
+
+        cached_artifact_map: Dict[int, dict] = {}
+        if is_locked:
+            # Other workers may have generated some while this one waited for the locks
+            cached_artifact_map, _ = await run_in_threadpool(
+                select_question_artifact_source_list, kind, list(question_block_map), language_id
+            )
+            question_block_map = {
+                question_id: question_block_json
+                for question_id, question_block_json in question_block_map.items()
+                if question_id not in cached_artifact_map
+            }
+        if not question_block_map:
+            return cached_artifact_map
+
+        try:
+            artifact_map = await generate_question_artifact_list(kind, question_block_map, language_id)
+        except ValueError as e:
+            # Malformed answer: retry question by question
+            logger.warning(f"Invalid {kind.value} batch answer for questions {list(question_block_map)}: {e}")
+            artifact_map = {}
+
+        # Questions missing from the answer are generated one by one, under the locks held
+        missing_id_list = [question_id for question_id in question_block_map if question_id not in artifact_map]
+        missing_result_list = await asyncio.gather(
+            *(
+                generate_question_artifact(kind, question_id, question_block_map[question_id], language_id)
+                for question_id in missing_id_list
+            ),
+            return_exceptions=True,
+        )
+        failed_id_list = []
+        for question_id, result in zip(missing_id_list, missing_result_list):
+            if isinstance(result, BaseException):
+                failed_id_list.append(question_id)
+            else:
+                artifact_map[question_id] = result
+
+        # Keep what was generated, even if some questions failed
+        if artifact_map:
+            await run_in_threadpool(save_question_artifact_list, kind, language_id, artifact_map)
+        if failed_id_list:
+            first_error = missing_result_list[missing_id_list.index(failed_id_list[0])]
+            raise Exception(f"Failed to get {kind.value} of questions {failed_id_list}: {first_error}") from first_error
+
+    artifact_map.update(cached_artifact_map)
+    return artifact_map
+
+
+async def _generate_and_save_question_artifact_key_chunk(
+    kind: AI_ARTIFACT_KIND,
+    language_id: str,
+    question_block_map: Dict[int, str],
+    key_list: List[Tuple[AI_ARTIFACT_KIND, int, str]],
+) -> Dict[Tuple[AI_ARTIFACT_KIND, int, str], dict]:
+    artifact_map = await _generate_and_save_question_artifact_chunk(
+        kind,
+        {question_id: question_block_map[question_id] for _, question_id, _ in key_list},
+        language_id,
+    )
+    return {(kind, question_id, language_id): artifact for question_id, artifact in artifact_map.items()}
+
+
+async def get_or_generate_question_artifact_list(
+    kind: AI_ARTIFACT_KIND,
+    question_id_list: List[int],
+    language_id: str,
+) -> List[dict]:
+    """
+    Get the translations / explanations of several questions, generating the
+    missing ones AI_BATCH_QUESTION_COUNT questions per Gemini call.
+
+    Returns:
+        The artifacts in question_id_list order; questions that do not exist are skipped
+    """
+    # Keep the first occurrence of duplicated ids
+    question_id_list = list(dict.fromkeys(question_id_list))
+    if not question_id_list:
+        return []
+
+    artifact_map, question_block_map = await run_in_threadpool(
+        select_question_artifact_source_list, kind, question_id_list, language_id
+    )
+
+    missing_id_list = [question_id for question_id in question_id_list if question_block_map.get(question_id)]
+    chunk_size = max(app_config.AI_BATCH_QUESTION_COUNT, 1)
+    # Questions already being generated (single or batch request) join that
+    # generation, the others are generated chunk by chunk
+    pending_artifact_map: Dict[int, Awaitable[dict]] = {}
+    for i in range(0, len(missing_id_list), chunk_size):
+        pending_by_key = _generation_single_flight.run_many(
+            [(kind, question_id, language_id) for question_id in missing_id_list[i:i + chunk_size]],
+            lambda key_list: _generate_and_save_question_artifact_key_chunk(
+                kind, language_id, question_block_map, key_list
+            ),
+        )
+        pending_artifact_map.update((question_id, pending) for (_, question_id, _), pending in pending_by_key.items())
+
+    # Every chunk runs to the end and keeps its artifacts, even if another one failed
+    result_list = await asyncio.gather(*pending_artifact_map.values(), return_exceptions=True)
+    failed_id_list = []
+    first_error = None
+    for question_id, result in zip(pending_artifact_map, result_list):
+        if isinstance(result, BaseException):
+            failed_id_list.append(question_id)
+            first_error = first_error or result
+        else:
+            artifact_map[question_id] = result
+    if failed_id_list:
+        logger.warning(f"{kind.value}/{language_id} of questions {failed_id_list} failed: {first_error}")
+        raise first_error
+
+    return [artifact_map[question_id] for question_id in question_id_list if question_id in artifact_map]
+
+
+def _format_sse_event(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+async def _iterate_cached_artifact_events(artifact: dict) -> AsyncIterator[bytes]:
+    for name, value in artifact.items():
+        yield _format_sse_event("field", {"name": name, "value": value})
+    yield _format_sse_event("done", artifact)
+
+
+async def _iterate_generated_artifact_events(
+    kind: AI_ARTIFACT_KIND,
+    question_id: int,
+    language_id: str,
+    text_stream: GeminiTextStream,
+    completion: asyncio.Future,
+) -> AsyncIterator[bytes]:
+    spec = _ARTIFACT_SPEC_MAP[kind]
+    parser = IncrementalJsonObjectParser()
+    text_chunk_list = []
+    try:
+        try:
+            async for text in text_stream:
+                text_chunk_list.append(text)
+                for name, value in parser.feed(text):
+                    if name == "question_id" and value != question_id:
+                        raise ValueError(f"Gemini {spec.label} is for question {value}, not {question_id}")
+                    if name == "language_id":
+                        value = language_id
+                    # Fields are sent in their stored form (e.g. incorrect_answer_reason)
+                    for field_name, field_value in spec.normalize_artifact({name: value}).items():
+                        yield _format_sse_event("field", {"name": field_name, "value": field_value})
+
+            artifact = parse_gemini_json_response("".join(text_chunk_list), spec.label)
+            artifact = _check_question_artifact(kind, artifact, question_id, language_id)
+            await run_in_threadpool(save_question_artifact, kind, question_id, language_id, artifact)
+        except Exception as e:
+            completion.set_exception(e)
+            logger.warning(f"Streamed {kind.value} of question {question_id} failed: {e}")
+            yield _format_sse_event("error", {"detail": f"Failed to get {spec.label} from Gemini: {e}"})
+            return
+
+        completion.set_result(artifact)
+        yield _format_sse_event("done", artifact)
+    finally:
+        await _end_artifact_stream(kind, text_stream, completion)
+
+
+async def _end_artifact_stream(
+    kind: AI_ARTIFACT_KIND,
+    text_stream: GeminiTextStream,
+    completion: asyncio.Future,
+) -> None:
+    # Stopped early (e.g. client disconnected): end the Gemini stream now, which settles its quota slot
+    await text_stream.aclose()
+    if not completion.done():
+        completion.set_exception(Exception(f"Streamed {_ARTIFACT_SPEC_MAP[kind].label} stopped before completion"))
+
+
+class _GeneratedArtifactEvents:
+    """Events of a streamed artifact; aclose ends the generation even if the events were never iterated."""
+
+    def __init__(
+        self,
+        kind: AI_ARTIFACT_KIND,
+        question_id: int,
+        language_id: str,
+        text_stream: GeminiTextStream,
+        completion: asyncio.Future,
+    ):
+        self._kind = kind
+        self._text_stream = text_stream
+        self._completion = completion
+        self._events = _iterate_generated_artifact_events(kind, question_id, language_id, text_stream, completion)
+
+    def __aiter__(self) -> "_GeneratedArtifactEvents":
+        return self
+
+    def __anext__(self) -> Awaitable[bytes]:
+        return self._events.__anext__()
+
+    async def aclose(self) -> None:
+        try:
+            await self._events.aclose()
+        finally:
+            await _end_artifact_stream(self._kind, self._text_stream, self._completion)
+
+
+async def open_question_artifact_stream(
+    kind: AI_ARTIFACT_KIND,
+    question_id: int,
+    language_id: str,
+) -> Optional[AsyncIterator[bytes]]:
+    """
+    Get the translation / explanation of a question as Server-Sent Events,
+    streamed from Gemini on a miss and saved once complete.
+
+    Returns once Gemini started answering, so failures until then can still be
+    answered with an error status. Concurrent requests of the same artifact in
+    this process join the generation in flight (streamed or not) and get its
+    result as cached events; the stream stops (unsaved) if its client disconnects.
+
+    Returns:
+        The events, to aclose once the response ended, or None if the question does not exist
+    """
+    cached_artifact, question_block_json = await run_in_threadpool(
+        select_question_artifact_source, kind, question_id, language_id
+    )
+    if cached_artifact is not None:
+        return _iterate_cached_artifact_events(cached_artifact)
+    if not question_block_json:
+        return None
+
+    if _generation_single_flight.is_running((kind, question_id, language_id)):
+        artifact = await _generate_question_artifact_once(kind, question_id, language_id, question_block_json)
+        return _iterate_cached_artifact_events(artifact)
+
+    # Registered before Gemini is called, so concurrent requests join this stream
+    completion = asyncio.get_running_loop().create_future()
+    _generation_single_flight.start((kind, question_id, language_id), lambda: completion)
+
+    spec = _ARTIFACT_SPEC_MAP[kind]
+    prompt = spec.build_prompt(question_block_json, language_id)
+    try:
+        text_stream = await open_text_stream_with_gemini_async(prompt, response_schema=spec.response_schema)
+    except BaseException as e:
+        completion.set_exception(e if isinstance(e, Exception) else Exception(f"Streamed {spec.label} cancelled"))
+        raise
+    return _GeneratedArtifactEvents(kind, question_id, language_id, text_stream, completion)
@@ -0,0 +1,370 @@
+"""
+MP3 frame index of part audio files, used to serve a time window of a part.
+
+Build (run after adding or replacing audio files):
+    python -m app.feature.test.test_audio_frame_index build
+
+Each audio file gets a sidecar "<file>.frames" next to it:
+    header   -> magic, version, sample rate, samples per frame, frame count,
+                size and mtime of the audio file it was built from
+    offsets  -> byte offset of every audio frame, plus the end offset of the
+                last one (the Xing / Info / VBRI header frame is left out)
+
+MP3 frames all carry the same number of samples, so frame i starts at
+i * samples_per_frame / sample_rate seconds and a time window maps to a
+contiguous run of whole frames. Layer III frames may take part of their
+audio data from the previous frames (bit reservoir), so a segment starts a
+few frames early: the first of them may decode to silence, the requested
+window decodes cleanly.
+
+A file without an up-to-date sidecar gets one built in the background; until
+then its segments are estimated byte ranges from the average bitrate. The
+built index is kept in memory even if the sidecar can't be written, and a
+file whose index failed is not scanned again until it changes.
+"""
+
+import argparse
+import logging
+import math
+import os
+import struct
+import sys
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from cachetools import LRUCache
+
+from app.feature.test.test_audio_util import AudioFile, audio_index
+from app.util.mp3_util import FRAME_HEADER_SIZE, is_vbr_header_frame, iterate_frames
+
+
+logger = logging.getLogger(__name__)
+
+
+FRAME_INDEX_SUFFIX = ".frames"
+FRAME_INDEX_MAGIC = b"MP3F"
+# 2: the VBR header frame is not indexed
+FRAME_INDEX_VERSION = 2
+# magic, version, sample rate, samples per frame, frame count, audio size, audio mtime (ns)
+_FRAME_INDEX_HEADER = struct.Struct("<4sHIIIQQ")
+
+FRAME_INDEX_CACHE_SIZE = 64
+FAILED_FRAME_INDEX_CACHE_SIZE = 1024
+
+# Layer III frames may start their audio data up to 511 (MPEG 1) / 255 (MPEG 2, 2.5)
+# bytes back in the previous frames, by samples per frame (Layer I has no reservoir)
+_MAX_RESERVOIR_SIZE = {1152: 511, 576: 255}
+# Bytes of a frame without audio data, at most: header, CRC, MPEG 1 stereo side information
+_MAX_FRAME_OVERHEAD_SIZE = FRAME_HEADER_SIZE + 2 + 32
+
+
+@dataclass(frozen=True)
+class FrameIndex:
+    sample_rate: int
+    samples_per_frame: int
+    # frame_count + 1 byte offsets: frame i spans [offsets[i], offsets[i + 1])
+    offsets: array
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def frame_duration(self) -> float:
+        return self.samples_per_frame / self.sample_rate
+
+    @property
+    def duration(self) -> float:
+        return self.frame_count * self.frame_duration
+
+
+def build_frame_index(audio_path: str) -> Optional[FrameIndex]:
+    """
+    Scan an MP3 file and index its frames.
+
+    Returns:
+        FrameIndex, or None if the file has no MPEG audio frame
+    """
+    with open(audio_path, "rb") as f:
+        data = f.read()
+
+    offsets = array("Q")
+    sample_rate = samples_per_frame = None
+    end_offset = 0
+    for offset, frame_header in iterate_frames(data):
+        if not offsets and is_vbr_header_frame(data[offset:offset + frame_header.frame_length], frame_header):
+            # Sent as the first frame of a segment, it would give players the duration of the whole file
+            continue
+        if sample_rate is None:
+            sample_rate, samples_per_frame = frame_header.sample_rate, frame_header.samples_per_frame
+        elif (frame_header.sample_rate, frame_header.samples_per_frame) != (sample_rate, samples_per_frame):
+            # A different stream format: the file is corrupted from here on
+            break
+        offsets.append(offset)
+        end_offset = offset + frame_header.frame_length
+
+    if not offsets:
+        return None
+
+    offsets.append(end_offset)
+    return FrameIndex(sample_rate=sample_rate, samples_per_frame=samples_per_frame, offsets=offsets)
+
+
+def get_frame_index_path(audio_file: AudioFile) -> str:
+    return audio_file.path + FRAME_INDEX_SUFFIX
+
+
+def write_frame_index(audio_file: AudioFile, frame_index: FrameIndex) -> None:
+    header = _FRAME_INDEX_HEADER.pack(
+        FRAME_INDEX_MAGIC,
+        FRAME_INDEX_VERSION,
+        frame_index.sample_rate,
+        frame_index.samples_per_frame,
+        frame_index.frame_count,
+        audio_file.size,
+        audio_file.stat_result.st_mtime_ns,
+    )
+    offsets = array("Q", frame_index.offsets)
+    # Sidecars are little-endian like the header
+    if sys.byteorder == "big":
+        offsets.byteswap()
+
+    # Write then rename, so a request never reads a half-written sidecar
+    frame_index_path = get_frame_index_path(audio_file)
+    temporary_path = frame_index_path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(header)
+        offsets.tofile(f)
+    os.replace(temporary_path, frame_index_path)
+
+
+def read_frame_index(audio_file: AudioFile) -> Optional[FrameIndex]:
+    """
+    Read the sidecar index of an audio file.
+
+    Returns:
+        FrameIndex, or None if there is no sidecar or it was built from another
+        version of the file
+    """
+    try:
+        with open(get_frame_index_path(audio_file), "rb") as f:
+            header = f.read(_FRAME_INDEX_HEADER.size)
+            if len(header) != _FRAME_INDEX_HEADER.size:
+                return None
+            magic, version, sample_rate, samples_per_frame, frame_count, audio_size, audio_mtime_ns = (
+                _FRAME_INDEX_HEADER.unpack(header)
+            )
+            if (
+                magic != FRAME_INDEX_MAGIC
+                or version != FRAME_INDEX_VERSION
+                or audio_size != audio_file.size
+                or audio_mtime_ns != audio_file.stat_result.st_mtime_ns
+            ):
+                return None
+
+            offsets = array("Q")
+            offsets.fromfile(f, frame_count + 1)
+    except (OSError, EOFError):
+        return None
+
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    return FrameIndex(sample_rate=sample_rate, samples_per_frame=samples_per_frame, offsets=offsets)
+
+
+# (path, ETag) -> FrameIndex, so a replaced file never reuses a stale index
+_frame_index_cache = LRUCache(maxsize=FRAME_INDEX_CACHE_SIZE)
+_frame_index_lock = threading.Lock()
+
+# One file scanned at a time, off the request path
+_frame_index_build_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame_index")
+_building_cache_keys = set()
+# (path, ETag) of the files whose index could not be built or written: not
+# scanned again until the file changes (or the sidecar is built by the CLI)
+_failed_cache_keys = LRUCache(maxsize=FAILED_FRAME_INDEX_CACHE_SIZE)
+
+
+def _build_and_write_frame_index(audio_file: AudioFile, cache_key: tuple) -> None:
+    is_failed = True
+    try:
+        frame_index = build_frame_index(audio_file.path)
+        if frame_index is None:
+            logger.warning(f"No MPEG audio frame in {audio_file.path}, no frame index written")
+            return
+        # Served from memory even if the sidecar can't be written
+        with _frame_index_lock:
+            _frame_index_cache[cache_key] = frame_index
+        write_frame_index(audio_file, frame_index)
+        is_failed = False
+        logger.info(f"Indexed {frame_index.frame_count} frames of {audio_file.path}")
+    except Exception as e:
+        logger.warning(f"Frame index of {audio_file.path} not built or not written: {e}")
+    finally:
+        with _frame_index_lock:
+            _building_cache_keys.discard(cache_key)
+            if is_failed:
+                _failed_cache_keys[cache_key] = True
+
+
+def get_frame_index(audio_file: AudioFile) -> Optional[FrameIndex]:
+    """
+    Get the frame index of an audio file from memory or from its sidecar file.
+
+    Returns:
+        FrameIndex, or None when the sidecar is missing or stale: it is then
+        built in the background and the caller falls back to estimate_segment
+    """
+    cache_key = (audio_file.path, audio_file.etag)
+    with _frame_index_lock:
+        frame_index = _frame_index_cache.get(cache_key)
+    if frame_index is not None:
+        return frame_index
+
+    frame_index = read_frame_index(audio_file)
+    if frame_index is None:
+        with _frame_index_lock:
+            if cache_key in _building_cache_keys or cache_key in _failed_cache_keys:
+                return None
+            _building_cache_keys.add(cache_key)
+        logger.warning(f"No up-to-date frame index for {audio_file.path}, building it in the background")
+        _frame_index_build_executor.submit(_build_and_write_frame_index, audio_file, cache_key)
+        return None
+
+    with _frame_index_lock:
+        _frame_index_cache[cache_key] = frame_index
+    return frame_index
+
+
+def _get_lead_in_frame(frame_index: FrameIndex, first_frame: int) -> int:
+    """First frame to send so that the bit reservoir of first_frame is complete."""
+    reservoir_size = _MAX_RESERVOIR_SIZE.get(frame_index.samples_per_frame, 0)
+    frame = first_frame
+    while reservoir_size > 0 and frame > 0:
+        frame -= 1
+        reservoir_size -= frame_index.offsets[frame + 1] - frame_index.offsets[frame] - _MAX_FRAME_OVERHEAD_SIZE
+    return frame
+
+
+def find_segment(frame_index: FrameIndex, start_time: float, end_time: Optional[float]) -> Optional[Tuple[int, int, float, float]]:
+    """
+    Map a time window to whole frames.
+
+    Args:
+        frame_index: Frame index of the audio file
+        start_time: Window start in seconds
+        end_time: Window end in seconds, None for the end of the file
+
+    Returns:
+        (byte start, byte end (exclusive), actual start time, actual end time),
+        or None if the window is outside of the audio. The actual start time
+        includes the lead-in frames of the bit reservoir.
+    """
+    first_frame = max(int(start_time / frame_index.frame_duration), 0)
+    if end_time is None:
+        last_frame = frame_index.frame_count
+    else:
+        last_frame = min(math.ceil(end_time / frame_index.frame_duration), frame_index.frame_count)
+
+    if first_frame >= last_frame:
+        return None
+
+    first_frame = _get_lead_in_frame(frame_index, first_frame)
+
+    return (
+        frame_index.offsets[first_frame],
+        frame_index.offsets[last_frame],
+        first_frame * frame_index.frame_duration,
+        last_frame * frame_index.frame_duration,
+    )
+
+
+def estimate_segment(
+    file_size: int,
+    bitrate: int,
+    duration: float,
+    start_time: float,
+    end_time: Optional[float],
+) -> Optional[Tuple[int, int, float, float]]:
+    """
+    Map a time window to a byte range from the average bitrate, for files
+    without a frame index yet. The range is not cut on frame boundaries:
+    decoders skip to the first whole frame.
+
+    Args:
+        file_size: Size of the audio file in bytes
+        bitrate: Average bitrate of the audio data, bits per second
+        duration: Duration of the audio in seconds
+
+    Returns:
+        Same as find_segment
+    """
+    if duration <= 0 or bitrate <= 0 or start_time >= duration:
+        return None
+
+    end_time = duration if end_time is None else min(end_time, duration)
+    byte_rate = bitrate / 8
+    # Tags and the VBR header frame come before the audio data
+    audio_start = max(file_size - round(duration * byte_rate), 0)
+    return (
+        audio_start + int(start_time * byte_rate),
+        min(audio_start + math.ceil(end_time * byte_rate), file_size),
+        start_time,
+        end_time,
+    )
+
+
+def read_segment(audio_file: AudioFile, byte_start: int, byte_end: int) -> bytes:
+    """Read the frames of a segment: concatenated MP3 frames are a playable MP3 stream."""
+    with open(audio_file.path, "rb") as f:
+        f.seek(byte_start)
+        return f.read(byte_end - byte_start)
+
+
+def build_all_frame_indexes(is_forced: bool) -> Tuple[int, int]:
+    """
+    Write the sidecar index of every indexed audio file.
+
+    Returns:
+        (number of written indexes, number of files without MPEG audio frames)
+    """
+    audio_index.refresh()
+
+    written_count = 0
+    skipped_count = 0
+    for audio_file in audio_index.list_audio_files():
+        if not is_forced and read_frame_index(audio_file) is not None:
+            continue
+
+        frame_index = build_frame_index(audio_file.path)
+        if frame_index is None:
+            logger.warning(f"No MPEG audio frame in {audio_file.path}, skipped")
+            skipped_count += 1
+            continue
+
+        write_frame_index(audio_file, frame_index)
+        written_count += 1
+        logger.info(f"Indexed {frame_index.frame_count} frames ({frame_index.duration:.1f}s) of {audio_file.path}")
+
+    return written_count, skipped_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage MP3 frame indexes of part audio files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Write the frame index of every audio file in MEDIA_DIRECTORY/assets")
+    build_parser.add_argument("--force", action="store_true", help="Rebuild indexes that are already up to date")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "build":
+        written_count, skipped_count = build_all_frame_indexes(args.force)
+        print(f"{written_count} frame indexes written, {skipped_count} files skipped")
+
+
+if __name__ == "__main__":
+    main()
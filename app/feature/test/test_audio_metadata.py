@@ -0,0 +1,115 @@
+"""Duration / bitrate of part audio files, parsed once from their MP3 headers"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from cachetools import LRUCache
+
+from app.core.app_config import app_config
+from app.feature.test.test_audio_frame_index import read_frame_index
+from app.feature.test.test_audio_util import AudioFile, audio_index
+from app.util.mp3_util import ID3V2_HEADER_SIZE, get_id3v2_size, iterate_frames, read_vbr_frame_count
+
+
+logger = logging.getLogger(__name__)
+
+
+# Enough for the first frames after the ID3v2 tag
+METADATA_READ_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class AudioMetadata:
+    duration: float  # seconds
+    bitrate: int  # average, bits per second
+    size: int  # bytes
+    etag: str
+
+    def to_dict(self) -> dict:
+        return {
+            "duration": self.duration,
+            "bitrate": self.bitrate,
+            "size": self.size,
+            "etag": self.etag,
+        }
+
+
+def _build_metadata(audio_file: AudioFile, duration: float, audio_size: int) -> AudioMetadata:
+    return AudioMetadata(
+        duration=round(duration, 3),
+        bitrate=round(audio_size * 8 / duration) if duration > 0 else 0,
+        size=audio_file.size,
+        etag=audio_file.etag,
+    )
+
+
+def read_audio_metadata(audio_file: AudioFile) -> Optional[AudioMetadata]:
+    """
+    Compute the metadata of an audio file.
+
+    Exact from the frame index when one is up to date; otherwise from the first
+    frame: the Xing / Info / VBRI frame count of VBR files, or the file size and
+    bitrate of CBR files.
+
+    Returns:
+        AudioMetadata, or None if the file has no MPEG audio frame
+    """
+    frame_index = read_frame_index(audio_file)
+    if frame_index is not None:
+        return _build_metadata(audio_file, frame_index.duration, frame_index.offsets[-1] - frame_index.offsets[0])
+
+    with open(audio_file.path, "rb") as f:
+        id3_size = get_id3v2_size(f.read(ID3V2_HEADER_SIZE))
+        f.seek(id3_size)
+        data = f.read(METADATA_READ_SIZE)
+
+    first_frame = next(iterate_frames(data), None)
+    if first_frame is None:
+        return None
+
+    offset, frame_header = first_frame
+    audio_size = audio_file.size - id3_size - offset
+
+    frame_count = read_vbr_frame_count(data[offset:offset + frame_header.frame_length], frame_header)
+    if frame_count:
+        duration = frame_count * frame_header.samples_per_frame / frame_header.sample_rate
+        audio_size -= frame_header.frame_length
+    else:
+        duration = audio_size * 8 / frame_header.bitrate
+
+    return _build_metadata(audio_file, duration, audio_size)
+
+
+# (path, ETag) -> AudioMetadata (None for files that are not MPEG audio)
+_audio_metadata_cache = LRUCache(maxsize=app_config.AUDIO_METADATA_CACHE_SIZE)
+_audio_metadata_lock = threading.Lock()
+
+
+def get_audio_metadata(audio_file: AudioFile) -> Optional[AudioMetadata]:
+    """Get the metadata of an audio file, reading its headers on the first call only."""
+    cache_key = (audio_file.path, audio_file.etag)
+    with _audio_metadata_lock:
+        if cache_key in _audio_metadata_cache:
+            return _audio_metadata_cache[cache_key]
+
+    try:
+        audio_metadata = read_audio_metadata(audio_file)
+    except OSError as e:
+        logger.warning(f"Audio metadata of {audio_file.path} is not readable: {e}")
+        return None
+
+    with _audio_metadata_lock:
+        _audio_metadata_cache[cache_key] = audio_metadata
+    return audio_metadata
+
+
+def precompute_audio_metadata() -> int:
+    """
+    Read the metadata of every indexed audio file (startup pass).
+
+    Returns:
+        Number of files with metadata
+    """
+    return sum(1 for audio_file in audio_index.list_audio_files() if get_audio_metadata(audio_file) is not None)
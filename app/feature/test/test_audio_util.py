@@ -1,56 +1,203 @@
 """Audio file utilities for handling TOEIC test audio files"""
 
+import asyncio
+import logging
 import os
+import stat
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate
 from pathlib import Path
-from typing import Optional
+from typing import Dict, FrozenSet, List, Optional
+
+from app.core.app_config import app_config
+
+
+logger = logging.getLogger(__name__)
+
+
+AUDIO_URL_PREFIX = "assets/"
+AUDIO_FILE_EXTENSIONS = (".mp3", ".m4a", ".wav", ".ogg")
+
+
+@dataclass(frozen=True)
+class AudioFile:
+    """Audio file of the index, with everything a response needs from its stat."""
+    path: str
+    size: int
+    mtime: float
+    etag: str
+    last_modified: str
+    stat_result: os.stat_result
 
 
 def get_audio_base_path() -> Path:
     """
     Get the base path for audio files.
-    Expected structure: C:\\TOEIC_NEW\\DB\\media\\assets
-    Creates the folders if they don't exist.
+    Expected structure: {MEDIA_DIRECTORY}/assets
+    """
+    return Path(app_config.MEDIA_DIRECTORY) / "assets"
+
+
+def _to_relative_path(relative_audio_url: str) -> Optional[str]:
+    # Remove 'assets/' prefix if present
+    if relative_audio_url.startswith(AUDIO_URL_PREFIX):
+        relative_audio_url = relative_audio_url[len(AUDIO_URL_PREFIX):]
+
+    relative_path = os.path.normpath(relative_audio_url.replace("\\", "/")).replace("\\", "/")
+    # Never resolve outside of the audio directory
+    if relative_path.startswith("../") or relative_path == ".." or os.path.isabs(relative_path):
+        return None
+    return relative_path
+
+
+def _build_audio_file(path: str, stat_result: os.stat_result) -> AudioFile:
+    # Strong validator: the file is only replaced through a new mtime or size
+    etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+    return AudioFile(
+        path=path,
+        size=stat_result.st_size,
+        mtime=stat_result.st_mtime,
+        etag=etag,
+        last_modified=formatdate(stat_result.st_mtime, usegmt=True),
+        stat_result=stat_result,
+    )
+
+
+class AudioIndex:
     """
-    # Be explicit about the path
-    audio_base_path = Path("C:/TOEIC_NEW/DB/media/assets")
-    
-    # Check if path already exists
-    if audio_base_path.exists():
-        print(f"Path already exists: {audio_base_path}")
-    else:
-        print(f"Creating new path: {audio_base_path}")
-        # Create directories if they don't exist
-        audio_base_path.mkdir(parents=True, exist_ok=True)
-        print(f"Path created successfully")
-    
-    return audio_base_path
-
-
-def resolve_audio_file_path(relative_audio_url: str) -> Optional[str]:  # Change to str
+    Index of the audio directory: relative URL -> AudioFile.
+
+    Built once at startup and refreshed in the background, so resolving the
+    audio of a request costs a single stat, which also catches files replaced
+    since the last refresh.
     """
-    Convert relative audio URL to absolute file system path.
-    
+
+    def __init__(self, audio_directory: Path):
+        self.audio_directory = audio_directory
+        self._lock = threading.Lock()
+        self._audio_file_map: Dict[str, AudioFile] = {}
+
+    def _scan(
+        self,
+        directory: str,
+        relative_directory: str,
+        audio_file_map: Dict[str, AudioFile],
+        ancestor_directory_set: FrozenSet[str],
+    ) -> None:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative_path = f"{relative_directory}{entry.name}"
+                if entry.is_dir(follow_symlinks=True):
+                    # A symlink back to a directory being scanned would recurse forever
+                    real_directory = os.path.realpath(entry.path)
+                    if real_directory in ancestor_directory_set:
+                        continue
+                    self._scan(
+                        entry.path,
+                        relative_path + "/",
+                        audio_file_map,
+                        ancestor_directory_set | {real_directory},
+                    )
+                elif entry.name.lower().endswith(AUDIO_FILE_EXTENSIONS):
+                    stat_result = entry.stat(follow_symlinks=True)
+                    if not stat.S_ISREG(stat_result.st_mode):
+                        continue
+                    # Keep the entry of unchanged files
+                    audio_file = self._audio_file_map.get(relative_path)
+                    if (
+                        audio_file is None
+                        or audio_file.size != stat_result.st_size
+                        or audio_file.mtime != stat_result.st_mtime
+                    ):
+                        audio_file = _build_audio_file(entry.path, stat_result)
+                    audio_file_map[relative_path] = audio_file
+
+    def refresh(self) -> int:
+        """
+        Rescan the audio directory and swap in the new index.
+
+        Returns:
+            Number of indexed audio files
+        """
+        audio_file_map: Dict[str, AudioFile] = {}
+        if self.audio_directory.is_dir():
+            self._scan(
+                str(self.audio_directory),
+                "",
+                audio_file_map,
+                frozenset([os.path.realpath(self.audio_directory)]),
+            )
+        else:
+            logger.warning(f"Audio directory not found: {self.audio_directory}")
+
+        with self._lock:
+            self._audio_file_map = audio_file_map
+        return len(audio_file_map)
+
+    def list_audio_files(self) -> List[AudioFile]:
+        return list(self._audio_file_map.values())
+
+    def get(self, relative_audio_url: str) -> Optional[AudioFile]:
+        relative_path = _to_relative_path(relative_audio_url)
+        if relative_path is None:
+            return None
+
+        audio_file = self._audio_file_map.get(relative_path)
+        full_path = audio_file.path if audio_file is not None else str(self.audio_directory / relative_path)
+        try:
+            stat_result = os.stat(full_path)
+        except OSError:
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            # Removed since the last refresh
+            if audio_file is not None:
+                with self._lock:
+                    self._audio_file_map = {
+                        path: indexed_file
+                        for path, indexed_file in self._audio_file_map.items()
+                        if path != relative_path
+                    }
+            return None
+
+        if (
+            audio_file is not None
+            and audio_file.size == stat_result.st_size
+            and audio_file.stat_result.st_mtime_ns == stat_result.st_mtime_ns
+        ):
+            return audio_file
+
+        # Added or replaced since the last refresh
+        audio_file = _build_audio_file(full_path, stat_result)
+        with self._lock:
+            self._audio_file_map = {**self._audio_file_map, relative_path: audio_file}
+        return audio_file
+
+
+audio_index = AudioIndex(get_audio_base_path())
+
+
+async def run_audio_index_refresh(interval_seconds: float) -> None:
+    """Refresh the audio index forever, every interval_seconds (background task)."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(audio_index.refresh)
+        except Exception as e:
+            logger.warning(f"Audio index refresh failed: {e}")
+
+
+def resolve_audio_file(relative_audio_url: str) -> Optional[AudioFile]:
+    """
+    Resolve a relative audio URL through the audio index.
+
     Args:
         relative_audio_url: URL like "assets/Full_trial_test_-_Batch_1_2025/JIM_s_TOEIC_LC_TEST_05-_Part_1.mp3"
-    
+
     Returns:
-        Absolute path string to the audio file if it exists, None otherwise
+        AudioFile if the file exists, None otherwise
     """
     if not relative_audio_url:
         return None
-    
-    # Remove 'assets/' prefix if present
-    if relative_audio_url.startswith('assets/'):
-        relative_path = relative_audio_url[7:]
-    else:
-        relative_path = relative_audio_url
-    
-    # Get base path and construct full path
-    base_path = get_audio_base_path()
-    full_path = base_path / relative_path
-    
-    # Check if file exists
-    if full_path.exists() and full_path.is_file():
-        return str(full_path)
-    
-    return None
+    return audio_index.get(relative_audio_url)
+
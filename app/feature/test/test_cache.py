@@ -0,0 +1,274 @@
+"""
+In-process cache for serialized test content (test detail, summaries, ...)
+
+Entries are keyed by the content versions of test_content_version, shared by
+every worker. After editing or importing content, invalidate it with:
+    python -m app.feature.test.test_cache invalidate
+    python -m app.feature.test.test_cache invalidate --test-id 12
+"""
+
+import argparse
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from cachetools import TTLCache
+
+from app.core.app_config import app_config
+from app.feature.test.test_content_version import content_version_store
+from app.util.http_cache_util import CachedPayload, build_cached_payload
+
+
+logger = logging.getLogger(__name__)
+
+
+# Bounded by the total size of cached bodies (bytes), not by entry count;
+# holds CachedPayload and TestCataloguePage entries
+_test_content_cache = TTLCache(
+    maxsize=app_config.TEST_CACHE_MAX_BYTES,
+    ttl=app_config.TEST_CACHE_TTL_SECONDS,
+    getsizeof=lambda payload: payload.size,
+)
+_cache_lock = threading.Lock()
+
+# The catalogue is small and read by every home screen: keep exactly one
+_test_catalogue_cache = TTLCache(maxsize=1, ttl=app_config.TEST_CATALOGUE_TTL_SECONDS)
+
+# (test_id, part_id, version) -> audio URL of the part, NO_PART_AUDIO_URL when the
+# part has no audio (Parts 5-7, unknown parts) so misses don't reach MySQL either
+_part_audio_url_cache = TTLCache(
+    maxsize=app_config.PART_AUDIO_URL_CACHE_SIZE,
+    ttl=app_config.TEST_CACHE_TTL_SECONDS,
+)
+NO_PART_AUDIO_URL = ""
+
+def get_global_content_version() -> str:
+    """Content version of every test: the deployed CONTENT_VERSION and the shared global version."""
+    return f"{app_config.CONTENT_VERSION}.{content_version_store.get_global_version()}"
+
+
+def get_test_content_version(test_id: int) -> str:
+    """
+    Get the current content version of a test.
+
+    The version combines the deployed CONTENT_VERSION with the shared versions
+    of every test and of this test, bumped by invalidate_test_content().
+    """
+    return f"{get_global_content_version()}.{content_version_store.get_test_version(test_id)}"
+
+
+def _get_or_load_payload(
+    cache_key: tuple,
+    loader: Callable[[], Optional[CachedPayload]],
+) -> Optional[CachedPayload]:
+    with _cache_lock:
+        payload = _test_content_cache.get(cache_key)
+    if payload is not None:
+        return payload
+
+    payload = loader()
+    if payload is None:
+        return None
+
+    with _cache_lock:
+        try:
+            _test_content_cache[cache_key] = payload
+        except ValueError:
+            # Larger than the whole cache budget: serve it, but don't cache it
+            logger.warning(f"Payload {cache_key} too large to cache ({payload.size} bytes)")
+
+    return payload
+
+
+def get_or_load_test_payload(
+    kind: str,
+    test_id: int,
+    loader: Callable[[], Optional[bytes]],
+    part_id: Optional[int] = None,
+) -> Optional[CachedPayload]:
+    """
+    Get a serialized test payload from cache, loading it on a miss.
+
+    Args:
+        kind: Payload kind, e.g. "detail"
+        test_id: Test ID
+        loader: Returns the JSON bytes of the payload, or None if not found
+        part_id: Optional part ID for per-part payloads
+
+    Returns:
+        CachedPayload, or None if the loader found nothing (not cached)
+    """
+    def load_payload() -> Optional[CachedPayload]:
+        body = loader()
+        return build_cached_payload(body) if body is not None else None
+
+    cache_key = (kind, test_id, part_id, get_test_content_version(test_id))
+    return _get_or_load_payload(cache_key, load_payload)
+
+
+def get_or_load_media_payload(
+    kind: str,
+    media_id: int,
+    loader: Callable[[], Optional[CachedPayload]],
+) -> Optional[CachedPayload]:
+    """
+    Get a media payload (e.g. a decoded image) from cache, loading it on a miss.
+
+    Media payloads share the test content budget and are invalidated together
+    with the content of every test.
+
+    Args:
+        kind: Payload kind, e.g. "image"
+        media_id: Media ID
+        loader: Returns the payload, or None if not found
+
+    Returns:
+        CachedPayload, or None if the loader found nothing (not cached)
+    """
+    cache_key = ("media_" + kind, media_id, None, get_global_content_version())
+    return _get_or_load_payload(cache_key, loader)
+
+
+def get_or_load_part_audio_url(
+    test_id: int,
+    part_id: int,
+    loader: Callable[[], Optional[str]],
+) -> Optional[str]:
+    """
+    Get the audio URL of a test part from cache, loading it on a miss.
+
+    Parts without audio are cached too.
+
+    Args:
+        test_id: Test ID
+        part_id: Part ID
+        loader: Returns the relative audio URL of the part, or None if it has none
+
+    Returns:
+        Relative audio URL, or None if the part has no audio
+    """
+    cache_key = (test_id, part_id, get_test_content_version(test_id))
+
+    with _cache_lock:
+        audio_url = _part_audio_url_cache.get(cache_key)
+    if audio_url is None:
+        audio_url = loader() or NO_PART_AUDIO_URL
+        with _cache_lock:
+            _part_audio_url_cache[cache_key] = audio_url
+
+    return audio_url or None
+
+
+@dataclass(frozen=True)
+class TestCatalogue:
+    """Test summary list, both as sent by the procedure and parsed for filtering."""
+    payload: CachedPayload
+    test_list: List[dict]
+    # Identifies the catalogue content, for the caches derived from it
+    cache_key: tuple
+
+
+@dataclass(frozen=True)
+class TestCataloguePage:
+    """Filtered / paged slice of the catalogue and the keyset cursor of the next page."""
+    payload: CachedPayload
+    next_after_test_id: Optional[int]
+
+    @property
+    def size(self) -> int:
+        return self.payload.size
+
+
+def get_or_load_test_catalogue(
+    source_key: Optional[str],
+    loader: Callable[[], Optional[CachedPayload]],
+) -> Optional[TestCatalogue]:
+    """
+    Get the test catalogue from cache, loading it on a miss.
+
+    Args:
+        source_key: Identifies the loader source (e.g. the ETag of a snapshot),
+            so switching source reloads the catalogue
+        loader: Returns the payload of the test summary list (sent as is), or None
+
+    Returns:
+        TestCatalogue ordered by test_id, or None if there is no test (not cached)
+    """
+    cache_key = (source_key, get_global_content_version(), content_version_store.get_visible_test_fingerprint())
+
+    with _cache_lock:
+        test_catalogue = _test_catalogue_cache.get(cache_key)
+    if test_catalogue is not None:
+        return test_catalogue
+
+    payload = loader()
+    if payload is None:
+        return None
+
+    # Decoded straight from the body, which may be a memory-mapped snapshot
+    test_list = sorted(json.loads(str(payload.body, "utf-8")), key=lambda test: test["test_id"])
+    test_catalogue = TestCatalogue(payload=payload, test_list=test_list, cache_key=cache_key)
+
+    with _cache_lock:
+        _test_catalogue_cache[cache_key] = test_catalogue
+
+    return test_catalogue
+
+
+def get_or_load_test_catalogue_page(
+    test_catalogue: TestCatalogue,
+    page_key: tuple,
+    loader: Callable[[], TestCataloguePage],
+) -> TestCataloguePage:
+    """
+    Get a page of the catalogue from cache, building it on a miss.
+
+    Pages share the test content budget, so the popular ones are serialized
+    and compressed once per catalogue version instead of once per request.
+
+    Args:
+        test_catalogue: Catalogue the page is taken from
+        page_key: Paging and filter parameters of the page
+        loader: Filters the catalogue and serializes the page
+    """
+    cache_key = ("catalogue_page", test_catalogue.cache_key, page_key)
+    return _get_or_load_payload(cache_key, loader)
+
+
+def invalidate_test_content(test_id: Optional[int] = None) -> None:
+    """
+    Invalidate cached content of one test, or of every test when test_id is None.
+
+    Bumps the shared content version: every worker stops reading the stale
+    entries within CONTENT_VERSION_CHECK_INTERVAL_SECONDS.
+    """
+    content_version_store.bump(test_id)
+
+    if test_id is None:
+        # Free the memory of this worker at once, the others drop them by TTL
+        with _cache_lock:
+            _test_content_cache.clear()
+            _test_catalogue_cache.clear()
+            _part_audio_url_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the test content caches of the API workers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    invalidate_parser = subparsers.add_parser("invalidate", help="Invalidate cached test content after an edit or import")
+    invalidate_parser.add_argument("--test-id", type=int, help="Only this test (default: every test, the catalogue and media)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "invalidate":
+        invalidate_test_content(args.test_id)
+        target = f"test {args.test_id}" if args.test_id is not None else "every test"
+        print(f"Content of {target} invalidated")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,8 @@ from enum import Enum
 
 class TEST_TYPE(str, Enum):
     PRACTICE = "practice"
-    EXAM = "exam"
\ No newline at end of file
+    EXAM = "exam"
+
+class AI_ARTIFACT_KIND(str, Enum):
+    TRANSLATE = "translate"
+    EXPLAIN = "explain"
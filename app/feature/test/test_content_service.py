@@ -0,0 +1,266 @@
+"""Load test content as raw JSON bytes produced by the stored procedures"""
+
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.mysql_connection import get_db_cursor
+from app.feature.test.test_audio_metadata import AudioMetadata, get_audio_metadata
+from app.feature.test.test_audio_util import resolve_audio_file
+from app.feature.test.test_cache import get_or_load_part_audio_url
+from app.feature.test.test_query import (
+    SELECT_MEDIA_CONTENT_LIST_BY_ID_LIST,
+    SELECT_MEDIA_ID_LIST_BY_TEST,
+    SELECT_PART_AUDIO_URL,
+    SELECT_QUESTION_ANSWER_LIST_BY_TEST,
+)
+from app.feature.test.test_schema import (
+    PartDetailResponse,
+    TestDetailResponse,
+    TestSkeletonResponse,
+    TestSummaryResponse,
+)
+from app.util.query_util import format_id_list_query
+from app.util.response_validation_util import validate_response_sample
+
+
+# SELECT_TEST_DETAIL_PROC / SELECT_TEST_SKELETON_PROC aggregate over an empty
+# row set for unknown tests
+EMPTY_TEST_DETAIL_JSON = b'{"part_list": null}'
+
+# Media content rows read per database checkout while streaming a test detail
+STREAM_MEDIA_CHUNK_SIZE = 20
+
+
+def procedure_json_to_bytes(procedure_result) -> Optional[bytes]:
+    """
+    Convert a JSON OUT parameter of a stored procedure to bytes without parsing it.
+
+    Returns:
+        UTF-8 JSON bytes, or None if the procedure returned NULL
+    """
+    if procedure_result is None:
+        return None
+    if isinstance(procedure_result, str):
+        return procedure_result.encode("utf-8")
+    return bytes(procedure_result)
+
+
+def select_all_test_json() -> Optional[bytes]:
+    """Get the JSON list of visible test summaries, or None if there is no test."""
+    with get_db_cursor(dictionary=False) as cursor:
+        result_args = cursor.callproc("SELECT_ALL_TEST_PROC", [0])
+
+    test_list_json = procedure_json_to_bytes(result_args[0])
+    if not test_list_json or test_list_json == b"[]":
+        return None
+
+    validate_response_sample(List[TestSummaryResponse], test_list_json, "test summary list")
+    return test_list_json
+
+
+def select_test_detail_json(test_id: int) -> Optional[bytes]:
+    """Get the JSON detail of a test, or None if the test has no content."""
+    with get_db_cursor(dictionary=False) as cursor:
+        result_args = cursor.callproc("SELECT_TEST_DETAIL_PROC", [test_id, 0])
+
+    test_detail_json = procedure_json_to_bytes(result_args[1])
+    if not test_detail_json or test_detail_json == EMPTY_TEST_DETAIL_JSON:
+        return None
+
+    validate_response_sample(TestDetailResponse, test_detail_json, f"test detail {test_id}")
+    return test_detail_json
+
+
+def select_test_skeleton_json(test_id: int) -> Optional[bytes]:
+    """Get the JSON skeleton (parts, media ids, question ids) of a test, or None."""
+    with get_db_cursor(dictionary=False) as cursor:
+        result_args = cursor.callproc("SELECT_TEST_SKELETON_PROC", [test_id, 0])
+
+    test_skeleton_json = procedure_json_to_bytes(result_args[1])
+    if not test_skeleton_json or test_skeleton_json == EMPTY_TEST_DETAIL_JSON:
+        return None
+
+    validate_response_sample(TestSkeletonResponse, test_skeleton_json, f"test skeleton {test_id}")
+    return test_skeleton_json
+
+
+def select_test_part_detail_json(test_id: int, part_id: int) -> Optional[bytes]:
+    """Get the JSON content of one part of a test, or None if the part is not in the test."""
+    with get_db_cursor(dictionary=False) as cursor:
+        result_args = cursor.callproc("SELECT_TEST_PART_DETAIL_PROC", [test_id, part_id, 0])
+
+    part_detail_json = procedure_json_to_bytes(result_args[2])
+    if not part_detail_json:
+        return None
+
+    validate_response_sample(PartDetailResponse, part_detail_json, f"test {test_id} part {part_id}")
+    return part_detail_json
+
+
+def select_part_audio_url(test_id: int, part_id: int) -> Optional[str]:
+    """Get the relative audio URL of a listening part, or None."""
+    with get_db_cursor() as cursor:
+        cursor.execute(SELECT_PART_AUDIO_URL, (test_id, part_id))
+        row = cursor.fetchone()
+
+    return row.get("audio_url") if row else None
+
+
+def get_part_audio_url(test_id: int, part_id: int) -> Optional[str]:
+    """
+    Get the relative audio URL of a part through the cache.
+
+    Shared by the audio URL and audio stream endpoints, so only the first
+    request of a part reaches MySQL.
+    """
+    return get_or_load_part_audio_url(test_id, part_id, lambda: select_part_audio_url(test_id, part_id))
+
+
+def get_part_audio_metadata(test_id: int, part_id: int) -> Optional[AudioMetadata]:
+    """Get the duration / bitrate / size / ETag of the audio of a part, or None."""
+    part_audio_url = get_part_audio_url(test_id, part_id)
+    audio_file = resolve_audio_file(part_audio_url) if part_audio_url else None
+    return get_audio_metadata(audio_file) if audio_file else None
+
+
+def select_test_part_detail_with_audio_json(test_id: int, part_id: int) -> Optional[bytes]:
+    """Get the JSON content of one part, with the metadata of its audio when it has one."""
+    part_detail_json = select_test_part_detail_json(test_id, part_id)
+    if not part_detail_json:
+        return None
+
+    audio_metadata = get_part_audio_metadata(test_id, part_id)
+    if audio_metadata is None:
+        return part_detail_json
+
+    # Append the field to the procedure output instead of re-serializing it
+    audio_metadata_json = json.dumps(audio_metadata.to_dict()).encode("utf-8")
+    return part_detail_json.rstrip()[:-1] + b', "part_audio_metadata": ' + audio_metadata_json + b"}"
+
+
+def filter_test_list(
+    test_list: List[dict],
+    after_test_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    test_type: Optional[str] = None,
+    test_bank_id: Optional[int] = None,
+) -> Tuple[List[dict], Optional[int]]:
+    """
+    Filter and page a test summary list ordered by test_id (keyset pagination).
+
+    Args:
+        test_list: Test summaries ordered by test_id
+        after_test_id: Return only tests with a greater test_id
+        limit: Maximum number of tests returned
+        test_type: Keep only tests of this type
+        test_bank_id: Keep only tests of this bank
+
+    Returns:
+        (page, next_after_test_id) where next_after_test_id is None on the last page
+    """
+    page = []
+    for test in test_list:
+        if after_test_id is not None and test["test_id"] <= after_test_id:
+            continue
+        if test_type is not None and test.get("test_type") != test_type:
+            continue
+        if test_bank_id is not None and test.get("test_bank_id") != test_bank_id:
+            continue
+
+        if limit is not None and len(page) == limit:
+            return page, page[-1]["test_id"]
+        page.append(test)
+
+    return page, None
+
+
+def _group_question_list_by_media(rows: List[dict]) -> Dict[int, List[dict]]:
+    question_list_by_media: Dict[int, List[dict]] = {}
+    question_by_id: Dict[int, dict] = {}
+
+    for row in rows:
+        question = question_by_id.get(row["question_id"])
+        if question is None:
+            question = {
+                "question_id": row["question_id"],
+                "question_number": row["question_number"],
+                "question_content": row["question_content"],
+                "answer_list": [],
+            }
+            question_by_id[row["question_id"]] = question
+            question_list_by_media.setdefault(row["media_group_id"], []).append(question)
+
+        question["answer_list"].append({
+            "answer_id": row["answer_id"],
+            "is_correct": row["is_correct"] == 1,
+            "content": row["answer_content"],
+        })
+
+    return question_list_by_media
+
+
+def _select_media_content_map(media_id_list: List[int]) -> Dict[int, dict]:
+    with get_db_cursor() as cursor:
+        cursor.execute(format_id_list_query(SELECT_MEDIA_CONTENT_LIST_BY_ID_LIST, media_id_list), tuple(media_id_list))
+        return {row["media_id"]: row for row in cursor.fetchall()}
+
+
+def iterate_test_detail_json(test_id: int) -> Iterator[bytes]:
+    """
+    Encode the detail of a test as JSON chunks, part by part and media by media.
+
+    The question/answer list and the media id list of the test (small) are read
+    first, then the media content STREAM_MEDIA_CHUNK_SIZE rows at a time. Each
+    read checks a connection out and back in before anything is yielded, so no
+    pool connection is held while a slow client downloads. The output has the
+    same structure as SELECT_TEST_DETAIL_PROC.
+
+    Yields:
+        JSON chunks; nothing if the test has no question
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(SELECT_QUESTION_ANSWER_LIST_BY_TEST, (test_id,))
+        question_list_by_media = _group_question_list_by_media(cursor.fetchall())
+        cursor.execute(SELECT_MEDIA_ID_LIST_BY_TEST, (test_id,))
+        media_row_list = cursor.fetchall()
+
+    if not question_list_by_media:
+        return
+
+    yield b'{"part_list": ['
+    current_part_id = None
+    for i in range(0, len(media_row_list), STREAM_MEDIA_CHUNK_SIZE):
+        chunk_row_list = media_row_list[i:i + STREAM_MEDIA_CHUNK_SIZE]
+        media_content_map = _select_media_content_map(list(dict.fromkeys(row["media_id"] for row in chunk_row_list)))
+
+        for row in chunk_row_list:
+            media_content = media_content_map.get(row["media_id"])
+            if media_content is None:
+                # Deleted since the media id list was read
+                continue
+
+            if row["part_id"] != current_part_id:
+                part = {
+                    "part_id": row["part_id"],
+                    "part_order": row["part_order"],
+                    "part_title": row["part_title"],
+                    "part_audio_url": row["part_audio_url"],
+                }
+                # Close the previous part, then open this one without its closing "]}"
+                part_prefix = b"" if current_part_id is None else b"]}, "
+                yield part_prefix + json.dumps(part).encode()[:-1] + b', "media_question_list": ['
+                current_part_id = row["part_id"]
+            else:
+                yield b", "
+
+            media_question = {
+                "media_question_id": row["media_id"],
+                "media_question_name": media_content["media_name"],
+                "media_question_main_paragraph": media_content["main_paragraph"],
+                "media_question_image_url": media_content["image_url"],
+                "media_question_audio_script": media_content["audio_script"],
+                "question_list": question_list_by_media.get(row["media_id"], []),
+            }
+            yield json.dumps(media_question).encode()
+
+    yield b"]}]}" if current_part_id is not None else b"]}"
@@ -0,0 +1,82 @@
+"""
+Content versions of the tests, shared by every worker through toeicapp_content_version.
+
+Row test_id = 0 holds the version of every test, other rows the version of
+one test. Each worker reads the table at startup and then every
+CONTENT_VERSION_CHECK_INTERVAL_SECONDS, so a version bumped by any process
+(invalidate_test_content, the snapshot export) changes the cache keys of
+test_cache in every worker.
+
+The catalogue is also keyed by a fingerprint of the visible tests, so a test
+added or hidden without an invalidation still shows within the interval.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+from app.core.mysql_connection import get_db_cursor
+from app.feature.test.test_query import (
+    BUMP_CONTENT_VERSION,
+    SELECT_CONTENT_VERSION_LIST,
+    SELECT_VISIBLE_TEST_FINGERPRINT,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+GLOBAL_CONTENT_VERSION_TEST_ID = 0
+
+
+class ContentVersionStore:
+    """Last read copy of toeicapp_content_version."""
+
+    def __init__(self):
+        self._version_map: Dict[int, int] = {}
+        self._visible_test_fingerprint = ""
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        with get_db_cursor() as cursor:
+            cursor.execute(SELECT_CONTENT_VERSION_LIST)
+            version_map = {row["test_id"]: row["version"] for row in cursor.fetchall()}
+            cursor.execute(SELECT_VISIBLE_TEST_FINGERPRINT)
+            row = cursor.fetchone()
+            visible_test_fingerprint = f"{row['test_count']}-{row['test_id_sum']}"
+
+        with self._lock:
+            if version_map != self._version_map:
+                logger.info(f"Test content versions changed: {version_map}")
+            self._version_map = version_map
+            self._visible_test_fingerprint = visible_test_fingerprint
+
+    def get_global_version(self) -> int:
+        return self._version_map.get(GLOBAL_CONTENT_VERSION_TEST_ID, 0)
+
+    def get_test_version(self, test_id: int) -> int:
+        return self._version_map.get(test_id, 0)
+
+    def get_visible_test_fingerprint(self) -> str:
+        return self._visible_test_fingerprint
+
+    def bump(self, test_id: Optional[int] = None) -> None:
+        """Bump the version of one test, or of every test when test_id is None."""
+        with get_db_cursor() as cursor:
+            cursor.execute(BUMP_CONTENT_VERSION, (GLOBAL_CONTENT_VERSION_TEST_ID if test_id is None else test_id,))
+        # This worker sees its own bump at once, the others at their next refresh
+        self.refresh()
+
+
+content_version_store = ContentVersionStore()
+
+
+async def run_content_version_refresh(interval_seconds: float) -> None:
+    """Read the content versions forever, every interval_seconds (background task)."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(content_version_store.refresh)
+        except Exception as e:
+            logger.warning(f"Content version refresh failed: {e}")
@@ -1,3 +1,5 @@
+import json
+
 from ...util.languge_util import getLanguageById
 
 
@@ -89,10 +91,10 @@ def build_question_explain_prompt(question_explain_block_json, language_id):
     "question_need": "<translated explanation of what the question needs>",
     "question_ask": "<translated explanation of what the question asks>",
     "correct_answer_reason": "<translated explanation why the correct answer is correct>",
-    "incorrect_answer_reason": {{
-        "<answer_label>": "<translated reason why this option is incorrect>",
+    "incorrect_answer_reason_list": [
+        {{ "answer_label": "<answer_label>", "reason": "<translated reason why this option is incorrect>" }},
         ...
-    }}
+    ]
     }}
 
     CRITICAL REQUIREMENTS:
@@ -109,6 +111,95 @@ def build_question_explain_prompt(question_explain_block_json, language_id):
     return prompt
 
 
+def build_question_list_translation_prompt(question_block_list_json: str, language_id: str):
+    """
+    Build one translation prompt for several question blocks.
+
+    INPUTS
+    -------
+    question_block_list_json: JSON array of question blocks (see build_question_translation_prompt)
+    language_id : str
+
+    OUTPUT
+    -------
+    The LLM must respond with a JSON array holding one translated object per input
+    block, each with the structure returned by build_question_translation_prompt.
+    """
+    target_language = getLanguageById(language_id)
+
+    prompt = f"""
+    You are a JSON translator.
+    Given a JSON array of objects, translate all string values of every object into {target_language} while keeping the JSON structure, keys, and formatting exactly the same.
+    Do not add or remove anything from the structure of the objects, and keep every "question_id" unchanged.
+    After translating, add a new field named "language_id" with the value of "{language_id}" to the top level of every object.
+    Return a JSON array with exactly one translated object per input object, in the same order.
+
+    CRITICAL: Your response must be ONLY a raw JSON array.
+    - DO NOT wrap it in markdown code blocks (no ```json or ```)
+    - DO NOT add any explanatory text before or after the JSON
+    - Start your response with [ and end with ]
+    - No comments, no explanations, just pure JSON
+
+    Input: {question_block_list_json}
+    """
+    return prompt
+
+
+def build_question_list_explain_prompt(question_explain_block_list_json: str, language_id: str):
+    target_language = getLanguageById(language_id)
+
+    prompt = f"""
+    You are an educational reasoning generator.
+    You are given a JSON array of questions, each with the following structure:
+    {{
+    "question_id": <number>,
+    "question_content": "<string>",
+    "answer_list": [
+        {{ "is_correct": <0 or 1>, "answer_content": "<string>" }},
+        ...
+    ]
+    }}
+
+    YOUR TASKS:
+    For every question of the JSON input below, analyze the question (“question_content”) and provide concise explanations for:
+    - What the question is asking for.
+    - What the question means or focuses on.
+    - Why the correct answer(s) is/are correct.
+    - Why the incorrect answer(s) are wrong.
+
+    Then, translate all explanations into {target_language}.
+
+    Return a JSON array with exactly one object per input question, in the same order, in the following format:
+
+    [
+    {{
+    "language_id": "{language_id}",
+    "question_id": <same question_id>,
+    "question_need": "<translated explanation of what the question needs>",
+    "question_ask": "<translated explanation of what the question asks>",
+    "correct_answer_reason": "<translated explanation why the correct answer is correct>",
+    "incorrect_answer_reason_list": [
+        {{ "answer_label": "<answer_label>", "reason": "<translated reason why this option is incorrect>" }},
+        ...
+    ]
+    }},
+    ...
+    ]
+
+    CRITICAL REQUIREMENTS:
+    - **STRICTLY AND ONLY return a single, valid, raw JSON array.**
+    - **DO NOT wrap in markdown code blocks (no ```json or ```)**
+    - **DO NOT include any explanatory text before or after the JSON**
+    - **Start your response with [ and end with ]**
+    - Keep the original answer labels exactly as they appear in the input (e.g., "A. John Trizz.").
+    - Do not mention missing data or make meta observations.
+    - Your entire response should be parseable by JSON.parse()
+
+    Input: {question_explain_block_list_json}
+    """
+    return prompt
+
+
 def clean_gemini_response(gemini_resp: str) -> str:
     """
     Clean Gemini API response by removing markdown code block formatting.
@@ -136,3 +227,82 @@ def clean_gemini_response(gemini_resp: str) -> str:
         cleaned_resp = '\n'.join(lines).strip()
     
     return cleaned_resp
+
+
+def _remove_trailing_commas(json_text: str) -> str:
+    """Drop the commas right before a closing bracket (outside of strings), which JSON forbids."""
+    character_list = []
+    is_in_string = False
+    is_escaped = False
+    for index, character in enumerate(json_text):
+        if is_in_string:
+            if is_escaped:
+                is_escaped = False
+            elif character == "\\":
+                is_escaped = True
+            elif character == '"':
+                is_in_string = False
+        elif character == '"':
+            is_in_string = True
+        elif character == "," and json_text[index + 1:].lstrip()[:1] in ("}", "]"):
+            continue
+        character_list.append(character)
+    return "".join(character_list)
+
+
+def parse_gemini_json_response(gemini_resp: str, label: str = "answer"):
+    """
+    Parse the JSON answer of Gemini, repairing the usual defects of free-form answers.
+
+    Structured output (see test_ai_service) makes them rare; the repairs cover the
+    answers that still have them instead of failing the whole generation:
+        - markdown code block around the JSON
+        - explanatory text before / after the JSON, even with brackets in it
+        - trailing commas before a closing bracket
+
+    Args:
+        gemini_resp: Raw response string from Gemini API
+        label: Name of the expected artifact, for the error message
+
+    Returns:
+        The parsed JSON value
+
+    Raises:
+        ValueError: The answer holds no repairable JSON
+    """
+    cleaned_resp = clean_gemini_response(gemini_resp)
+    try:
+        return json.loads(cleaned_resp)
+    except json.JSONDecodeError as e:
+        strict_error = e
+
+    decoder = json.JSONDecoder()
+    # The text before the JSON may hold brackets too: try every start in order
+    for start_index, character in enumerate(cleaned_resp):
+        if character not in "{[":
+            continue
+        json_resp = cleaned_resp[start_index:]
+        for candidate_resp in (json_resp, _remove_trailing_commas(json_resp)):
+            try:
+                # raw_decode ignores the text after the JSON value
+                value, _ = decoder.raw_decode(candidate_resp)
+                return value
+            except json.JSONDecodeError:
+                continue
+
+    raise ValueError(f"Gemini {label} holds no valid JSON: {strict_error}") from strict_error
+
+
+def normalize_explain_artifact(artifact: dict) -> dict:
+    """
+    Turn the incorrect_answer_reason_list of a structured explanation into the
+    incorrect_answer_reason dict ({answer label: reason}) served and stored.
+    """
+    reason_list = artifact.pop("incorrect_answer_reason_list", None)
+    if isinstance(reason_list, list):
+        artifact["incorrect_answer_reason"] = {
+            reason["answer_label"]: reason.get("reason", "")
+            for reason in reason_list
+            if isinstance(reason, dict) and "answer_label" in reason
+        }
+    return artifact
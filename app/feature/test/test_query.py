@@ -30,6 +30,68 @@ SELECT_QUESTION_EXPLAIN_BLOCK_JSON_BY_ID = """
     GROUP BY q.id, q.content;
 """
 
+# Batch variants: {placeholders} is filled with one %s per question id
+SELECT_QUESTION_BLOCK_JSON_LIST_BY_ID_LIST = """
+    SELECT q.id AS question_id, JSON_OBJECT(
+        'question_id', q.id,
+        'question_content', q.content,
+        'answer_list', JSON_ARRAYAGG(a.content)
+    ) AS question_block_json
+    FROM toeicapp_question q
+    JOIN toeicapp_answer a ON a.question_id = q.id
+    WHERE q.id IN ({placeholders})
+    GROUP BY q.id, q.content;
+"""
+
+SELECT_QUESTION_EXPLAIN_BLOCK_JSON_LIST_BY_ID_LIST = """
+    SELECT q.id AS question_id, JSON_OBJECT(
+        'question_id', q.id,
+        'question_content', q.content,
+        'answer_list', JSON_ARRAYAGG(
+            JSON_OBJECT(
+                'answer_content', a.content,
+                'is_correct', a.is_correct
+            )
+        )
+    ) AS question_explain_block_json
+    FROM toeicapp_question q
+    JOIN toeicapp_answer a ON a.question_id = q.id
+    WHERE q.id IN ({placeholders})
+    GROUP BY q.id, q.content;
+"""
+
+SELECT_QUESTION_ID_LIST_BY_MEDIA_GROUP_ID = """
+    SELECT id AS question_id
+    FROM toeicapp_question
+    WHERE media_group_id = %s
+    ORDER BY question_number;
+"""
+
+SELECT_QUESTION_ID_LIST_BY_PART_ID = """
+    SELECT id AS question_id
+    FROM toeicapp_question
+    WHERE part_id = %s
+    ORDER BY question_number;
+"""
+
+SELECT_QUESTION_ID_LIST_BY_TEST_ID = """
+    SELECT q.id AS question_id
+    FROM toeicapp_question q
+    JOIN toeicapp_testpart tp ON tp.part_id = q.part_id
+    WHERE tp.test_id = %s
+    ORDER BY q.part_id, q.question_number;
+"""
+
+SELECT_QUESTION_ID_LIST_BY_TEST_BANK_ID = """
+    SELECT DISTINCT q.id AS question_id
+    FROM toeicapp_question q
+    JOIN toeicapp_testpart tp ON tp.part_id = q.part_id
+    JOIN toeicapp_test t ON t.id = tp.test_id
+    WHERE t.test_bank_id = %s
+    AND t.visible = 1
+    ORDER BY q.id;
+"""
+
 SELECT_QUESTION_TRANSLATE_JSON = """
     SELECT question_translate_json
     FROM toeicapp_question
@@ -42,16 +104,38 @@ SELECT_QUESTION_EXPLAIN_JSON = """
     WHERE id = %s;
 """
 
-UPDATE_QUESTION_TRANSLATE_JSON_SCRIPT = """
-    UPDATE toeicapp_question
-    SET question_translate_json = %s
-    WHERE id = %s;
+SELECT_QUESTION_ARTIFACT_JSON = """
+    SELECT artifact_json
+    FROM toeicapp_question_artifact
+    WHERE question_id = %s
+    AND language_id = %s
+    AND artifact_kind = %s;
 """
 
-UPDATE_QUESTION_EXPLAIN_JSON_SCRIPT = """
-    UPDATE toeicapp_question
-    SET question_explain_json = %s
-    WHERE id = %s;
+SELECT_QUESTION_ARTIFACT_JSON_LIST = """
+    SELECT question_id, artifact_json
+    FROM toeicapp_question_artifact
+    WHERE language_id = %s
+    AND artifact_kind = %s
+    AND question_id IN ({placeholders});
+"""
+
+SELECT_QUESTION_TRANSLATE_JSON_LIST = """
+    SELECT id AS question_id, question_translate_json
+    FROM toeicapp_question
+    WHERE id IN ({placeholders});
+"""
+
+SELECT_QUESTION_EXPLAIN_JSON_LIST = """
+    SELECT id AS question_id, question_explain_json
+    FROM toeicapp_question
+    WHERE id IN ({placeholders});
+"""
+
+UPSERT_QUESTION_ARTIFACT_JSON = """
+    INSERT INTO toeicapp_question_artifact (question_id, language_id, artifact_kind, artifact_json)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE artifact_json = VALUES(artifact_json);
 """
 
 SELECT_PART_AUDIO_URL = """
@@ -73,3 +157,82 @@ SELECT_AUDIO_SCRIPT_BY_MEDIA_ID = """
 SELECT audio_script FROM toeicapp_media WHERE id = %s
 """
 
+
+
+SELECT_QUESTION_ANSWER_LIST_BY_TEST = """
+    SELECT
+        q.id AS question_id,
+        q.question_number,
+        q.content AS question_content,
+        q.media_group_id,
+        a.id AS answer_id,
+        a.is_correct,
+        a.content AS answer_content
+    FROM toeicapp_testpart tp
+    JOIN toeicapp_question q ON q.part_id = tp.part_id
+    JOIN toeicapp_answer a ON a.question_id = q.id
+    WHERE tp.test_id = %s
+    ORDER BY q.media_group_id, q.question_number, a.id;
+"""
+
+
+# Parts and media ids of a test in streaming order, without the media content
+SELECT_MEDIA_ID_LIST_BY_TEST = """
+    SELECT DISTINCT
+        p.id AS part_id,
+        p.part_order,
+        p.title AS part_title,
+        p.audio_url AS part_audio_url,
+        m.id AS media_id
+    FROM toeicapp_testpart tp
+    JOIN toeicapp_part p ON p.id = tp.part_id
+    JOIN toeicapp_question q ON q.part_id = p.id
+    JOIN toeicapp_media m ON m.id = q.media_group_id
+    WHERE tp.test_id = %s
+    ORDER BY part_id, media_id;
+"""
+
+
+# Image media are served by GET /media/{id}/image: their base64 never leaves MySQL.
+# The image prefixes are the ones of media_image_util.is_base64_image.
+# {placeholders} is filled with one %s per media id
+SELECT_MEDIA_CONTENT_LIST_BY_ID_LIST = """
+    SELECT
+        media_id,
+        media_name,
+        IF(is_image, '', main_paragraph) AS main_paragraph,
+        IF(is_image, CONCAT('media/', media_id, '/image'), NULL) AS image_url,
+        audio_script
+    FROM (
+        SELECT
+            m.id AS media_id,
+            m.media_name,
+            m.paragrap_main AS main_paragraph,
+            (m.paragrap_main LIKE 'data:image/%%'
+                OR m.paragrap_main LIKE 'iVBORw0KGgo%%'
+                OR m.paragrap_main LIKE '/9j/%%'
+                OR m.paragrap_main LIKE 'R0lGOD%%'
+                OR m.paragrap_main LIKE 'UklGR%%') AS is_image,
+            m.audio_script
+        FROM toeicapp_media m
+        WHERE m.id IN ({placeholders})
+    ) media;
+"""
+
+
+SELECT_CONTENT_VERSION_LIST = """
+    SELECT test_id, version FROM toeicapp_content_version;
+"""
+
+# Changes when a test is added, removed, hidden or shown again
+SELECT_VISIBLE_TEST_FINGERPRINT = """
+    SELECT COUNT(*) AS test_count, COALESCE(SUM(id), 0) AS test_id_sum
+    FROM toeicapp_test
+    WHERE visible = 1;
+"""
+
+BUMP_CONTENT_VERSION = """
+    INSERT INTO toeicapp_content_version (test_id, version)
+    VALUES (%s, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+"""
@@ -1,57 +1,143 @@
 import json
 import os
-from typing import List
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import FileResponse
+from itertools import chain
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.core.gemini_client import generate_text_with_gemini
+from app.core.gemini_model_router import GeminiUnavailableError
 from app.core.mysql_connection import get_db_cursor
 from app.feature.test.test_query import (
     SELECT_AUDIO_SCRIPT_BY_MEDIA_ID,
     SELECT_BASE64_IMAGE_BY_MEDIA_ID,
-    SELECT_QUESTION_BLOCK_JSON_BY_ID,
-    SELECT_PART_AUDIO_URL,
-    SELECT_QUESTION_EXPLAIN_BLOCK_JSON_BY_ID,
-    SELECT_QUESTION_TRANSLATE_JSON,
-    SELECT_QUESTION_EXPLAIN_JSON,
-    UPDATE_QUESTION_TRANSLATE_JSON_SCRIPT,
-    UPDATE_QUESTION_EXPLAIN_JSON_SCRIPT,
 )
 from app.feature.test.test_schema import (
     GeminiExplainQuestionRequest,
+    GeminiQuestionBatchRequest,
     GeminiExplainQuestionResponse,
     GeminiTranslateAudioScriptRequest,
     GeminiTranslateImageRequest, 
     GeminiTranslateQuestionRequest, 
     GeminiTranslateQuestionResponse,
+    PartDetailResponse,
     TestDetailResponse,
+    TestSkeletonResponse,
     TestSummaryResponse)
-from app.feature.test.test_prompt_helper import  (
-    build_question_explain_prompt, 
-    build_question_translation_prompt, 
-    clean_gemini_response
+from app.feature.test.test_ai_service import (
+    get_or_generate_question_artifact,
+    get_or_generate_question_artifact_list,
+    open_question_artifact_stream,
+    select_question_id_list,
 )
-from app.feature.test.test_audio_util import resolve_audio_file_path
+from app.feature.test.test_const import AI_ARTIFACT_KIND
+from app.feature.test.test_audio_frame_index import estimate_segment, find_segment, get_frame_index, read_segment
+from app.feature.test.test_audio_metadata import get_audio_metadata
+from app.feature.test.test_audio_util import AudioFile, resolve_audio_file
+from app.feature.test.test_cache import (
+    TestCatalogue,
+    TestCataloguePage,
+    get_global_content_version,
+    get_or_load_media_payload,
+    get_or_load_test_catalogue,
+    get_or_load_test_catalogue_page,
+    get_or_load_test_payload,
+    get_test_content_version,
+)
+from app.feature.test.test_content_service import (
+    filter_test_list,
+    get_part_audio_metadata,
+    get_part_audio_url,
+    iterate_test_detail_json,
+    select_all_test_json,
+    select_test_detail_json,
+    select_test_part_detail_with_audio_json,
+    select_test_skeleton_json,
+)
+from app.feature.test.test_snapshot import get_test_detail_snapshot, get_test_summary_snapshot
+from app.util.file_response_util import RangeFileResponse
+from app.util.http_cache_util import CachedPayload, build_cached_payload, build_cached_response, is_etag_matched
 
 
 router = APIRouter()
 
 
+AUDIO_CACHE_CONTROL = "public, max-age=3600"
+
+# Response header carrying the keyset cursor of the next catalogue page
+NEXT_AFTER_TEST_ID_HEADER = "X-Next-After-Test-Id"
+
+
+def _load_test_catalogue_payload() -> Optional[CachedPayload]:
+    test_list_json = select_all_test_json()
+    return build_cached_payload(test_list_json) if test_list_json is not None else None
+
+
+def _get_test_catalogue() -> Optional[TestCatalogue]:
+    snapshot_payload = get_test_summary_snapshot(get_global_content_version())
+    if snapshot_payload:
+        return get_or_load_test_catalogue(snapshot_payload.etag, lambda: snapshot_payload)
+    return get_or_load_test_catalogue(None, _load_test_catalogue_payload)
+
+
+def _get_test_detail_payload(test_id: int) -> Optional[CachedPayload]:
+    return (
+        get_test_detail_snapshot(test_id, get_test_content_version(test_id)) 
+        or get_or_load_test_payload("detail", test_id, lambda: select_test_detail_json(test_id))
+    )
+
+
+def _resolve_part_audio_file(test_id: int, part_id: int) -> Tuple[Optional[str], Optional[AudioFile]]:
+    # Cached per part: the Range requests of a player never reach MySQL
+    part_audio_url = get_part_audio_url(test_id, part_id)
+    return part_audio_url, (resolve_audio_file(part_audio_url) if part_audio_url else None)
+
+
 @router.get("", response_model=List[TestSummaryResponse], description="Get all test summaries")
-async def get_all_test():
+async def get_all_test(
+    request: Request,
+    after_test_id: Optional[int] = Query(None, description="Return tests after this test id (keyset pagination)"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Maximum number of tests returned"),
+    test_type: Optional[str] = Query(None, description="Filter by test type"),
+    test_bank_id: Optional[int] = Query(None, description="Filter by test bank"),
+):
     try:
-        with get_db_cursor(dictionary=False) as cursor:
-            result_args = cursor.callproc("SELECT_ALL_TEST_PROC", [0])
+        # Cache misses read MySQL or the snapshot files: keep them off the event loop
+        test_catalogue = await run_in_threadpool(_get_test_catalogue)
 
-            test_json = json.loads(result_args[0])
-            
-            if not test_json:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND, 
-                    detail="List tests not found"
-                )
-            
-            return test_json
+        if not test_catalogue:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail="List tests not found"
+            )
+
+        # No paging or filtering: send the whole catalogue as produced by the procedure
+        if after_test_id is None and limit is None and test_type is None and test_bank_id is None:
+            return build_cached_response(request, test_catalogue.payload)
+
+        def load_test_catalogue_page() -> TestCataloguePage:
+            test_page, next_after_test_id = filter_test_list(
+                test_catalogue.test_list, 
+                after_test_id=after_test_id, 
+                limit=limit, 
+                test_type=test_type, 
+                test_bank_id=test_bank_id,
+            )
+            return TestCataloguePage(
+                payload=build_cached_payload(json.dumps(test_page).encode()),
+                next_after_test_id=next_after_test_id,
+            )
+
+        test_catalogue_page = get_or_load_test_catalogue_page(
+            test_catalogue,
+            (after_test_id, limit, test_type, test_bank_id),
+            load_test_catalogue_page,
+        )
+        response = build_cached_response(request, test_catalogue_page.payload)
+        if test_catalogue_page.next_after_test_id is not None:
+            response.headers[NEXT_AFTER_TEST_ID_HEADER] = str(test_catalogue_page.next_after_test_id)
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -65,20 +151,17 @@ async def get_all_test():
 
 
 @router.get("/{id}" , response_model=TestDetailResponse, description="Returns detailed information for a TOEIC test")
-async def get_test_detail(id: int):
-    try:        
-        with get_db_cursor(dictionary=False) as cursor:
-            result_args = cursor.callproc("SELECT_TEST_DETAIL_PROC", [id, 0])
-            
-            test_json = json.loads(result_args[1])
-            
-            if not test_json:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND, 
-                    detail=f"Test detail not found for id {id}"
-                )
-                
-            return test_json
+async def get_test_detail(id: int, request: Request):
+    try:
+        payload = await run_in_threadpool(_get_test_detail_payload, id)
+
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail=f"Test detail not found for id {id}"
+            )
+
+        return build_cached_response(request, payload)
     except HTTPException:
         raise
     except Exception as e:
@@ -91,20 +174,102 @@ async def get_test_detail(id: int):
         )
 
 
+@router.get("/{id}/stream", response_model=TestDetailResponse, description="Streams the detail of a TOEIC test part by part and media by media")
+async def stream_test_detail(id: int):
+    try:
+        test_detail_chunks = iterate_test_detail_json(id)
+
+        # Read the first chunk before answering, so an unknown test is still a 404
+        first_chunk = await run_in_threadpool(next, test_detail_chunks, None)
+        if first_chunk is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail=f"Test detail not found for id {id}"
+            )
+
+        return StreamingResponse(chain([first_chunk], test_detail_chunks), media_type="application/json")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "message": "Error in stream test detail controller",
+                "error": str(e),
+            },
+        )
+
+
+@router.get("/{id}/skeleton", response_model=TestSkeletonResponse, description="Returns the parts, media ids and question ids of a TOEIC test without content")
+async def get_test_skeleton(id: int, request: Request):
+    try:
+        payload = await run_in_threadpool(
+            get_or_load_test_payload, "skeleton", id, lambda: select_test_skeleton_json(id)
+        )
+
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail=f"Test skeleton not found for id {id}"
+            )
+
+        return build_cached_response(request, payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "message": "Error in get test skeleton controller",
+                "error": str(e),
+            },
+        )
+
+
+@router.get("/{test_id}/part/{part_id}", response_model=PartDetailResponse, description="Returns the content of one part of a TOEIC test")
+async def get_test_part_detail(test_id: int, part_id: int, request: Request):
+    try:
+        payload = await run_in_threadpool(
+            get_or_load_test_payload,
+            "part_detail", 
+            test_id, 
+            lambda: select_test_part_detail_with_audio_json(test_id, part_id), 
+            part_id=part_id,
+        )
+
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail=f"Part {part_id} not found for test id {test_id}"
+            )
+
+        return build_cached_response(request, payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "message": "Error in get test part detail controller",
+                "error": str(e),
+            },
+        )
+
+
 @router.get("/{test_id}/part/{part_id}/audio/url")
 async def get_audio_url(test_id: int, part_id: int):
-    """Get the stream URL for audio. Returns null for Parts 5, 6, 7."""
+    """Get the stream URL and metadata (duration, bitrate, size, ETag) for audio. Returns null for Parts 5, 6, 7."""
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(SELECT_PART_AUDIO_URL, (test_id, part_id))
-            row = cursor.fetchone()
-            
-            if not row or not row.get('audio_url'):
-                return {"audio_stream_url": None}
-            
-            # Return the stream URL that points to the stream endpoint
-            stream_url = f"tests/{test_id}/part/{part_id}/audio/stream"
-            return {"audio_stream_url": stream_url}
+        if not await run_in_threadpool(get_part_audio_url, test_id, part_id):
+            return {"audio_stream_url": None, "audio_metadata": None}
+        
+        # Return the stream URL that points to the stream endpoint
+        stream_url = f"tests/{test_id}/part/{part_id}/audio/stream"
+        audio_metadata = await run_in_threadpool(get_part_audio_metadata, test_id, part_id)
+        return {
+            "audio_stream_url": stream_url,
+            "audio_metadata": audio_metadata.to_dict() if audio_metadata else None,
+        }
     except HTTPException:
         raise        
     except Exception as e:
@@ -117,38 +282,121 @@ async def get_audio_url(test_id: int, part_id: int):
 @router.get("/{test_id}/part/{part_id}/audio/stream")
 async def stream_part_audio(test_id: int, part_id: int):
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(SELECT_PART_AUDIO_URL, (test_id, part_id))
-            row = cursor.fetchone()
-            
-            if not row or not row.get('audio_url'):
-                return None
-            
-            part_audio_url = row['audio_url']
-            audio_file_path = resolve_audio_file_path(part_audio_url)
+        part_audio_url, audio_file = await run_in_threadpool(_resolve_part_audio_file, test_id, part_id)
+        if not part_audio_url:
+            return None
+        
+        if not audio_file:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Audio file not found: {part_audio_url}"
+            )
+        
+        # Validators come from the audio index: no stat call per Range request
+        return RangeFileResponse(
+            path=audio_file.path,
+            size=audio_file.size,
+            mtime=audio_file.mtime,
+            etag=audio_file.etag,
+            last_modified=audio_file.last_modified,
+            media_type="audio/mpeg",
+            filename=os.path.basename(audio_file.path),
+            headers={
+                "Cache-Control": AUDIO_CACHE_CONTROL
+            }
+        )
             
-            if not audio_file_path or not os.path.exists(audio_file_path):
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in get part audio controller: {str(e)}"
+        )
+
+
+@router.get("/{test_id}/part/{part_id}/audio/segment")
+async def get_part_audio_segment(
+    request: Request,
+    test_id: int,
+    part_id: int,
+    start: float = Query(0, ge=0, description="Window start, in seconds"),
+    end: Optional[float] = Query(None, gt=0, description="Window end, in seconds (default: end of the audio)"),
+    mode: Literal["audio", "range"] = Query("audio", description="audio: the segment as MP3, range: its byte range in the stream"),
+):
+    """
+    Get a time window of a part audio, cut on MP3 frame boundaries.
+
+    mode=audio returns a self-contained MP3 segment; mode=range returns the
+    byte range to request from the stream endpoint instead. The segment starts
+    a few frames before start (bit reservoir); until the frame index of the
+    file is built, the range is estimated and not cut on frames.
+    """
+    try:
+        if end is not None and end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end must be greater than start"
+            )
+
+        part_audio_url, audio_file = await run_in_threadpool(_resolve_part_audio_file, test_id, part_id)
+        if not audio_file:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Audio not found"
+            )
+
+        frame_index = await run_in_threadpool(get_frame_index, audio_file)
+        if frame_index is not None:
+            duration = frame_index.duration
+            segment = find_segment(frame_index, start, end)
+        else:
+            # Index being built in the background: estimated range from the average bitrate
+            audio_metadata = await run_in_threadpool(get_audio_metadata, audio_file)
+            if audio_metadata is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Audio file not found: {part_audio_url}"
+                    detail=f"Audio file is not MPEG audio: {part_audio_url}"
                 )
-            
-            return FileResponse(
-                path=audio_file_path,
-                media_type="audio/mpeg",
-                filename=os.path.basename(audio_file_path),
-                headers={
-                    "Accept-Ranges": "bytes",
-                    "Cache-Control": "public, max-age=3600"
-                }
+            duration = audio_metadata.duration
+            segment = estimate_segment(audio_file.size, audio_metadata.bitrate, duration, start, end)
+
+        if segment is None:
+            raise HTTPException(
+                status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+                detail=f"Time window is outside of the audio ({duration:.3f}s)"
             )
-            
+        byte_start, byte_end, segment_start, segment_end = segment
+
+        if mode == "range":
+            return {
+                "audio_stream_url": f"tests/{test_id}/part/{part_id}/audio/stream",
+                "etag": audio_file.etag,
+                "byte_start": byte_start,
+                "byte_end": byte_end - 1,
+                "start_time": round(segment_start, 3),
+                "end_time": round(segment_end, 3),
+                "is_frame_aligned": frame_index is not None,
+            }
+
+        # Derived from the file ETag: a segment changes only when its file does
+        etag = f'{audio_file.etag[:-1]}-{byte_start:x}-{byte_end:x}"'
+        if is_etag_matched(request.headers.get("if-none-match"), etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag, "Cache-Control": AUDIO_CACHE_CONTROL},
+            )
+
+        segment_body = await run_in_threadpool(read_segment, audio_file, byte_start, byte_end)
+        payload = CachedPayload(body=segment_body, etag=etag, media_type="audio/mpeg")
+        return build_cached_response(request, payload, cache_control=AUDIO_CACHE_CONTROL)
+
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error in get part audio controller: {str(e)}"
+            detail=f"Error in get part audio segment controller: {str(e)}"
         )
 
 
@@ -159,52 +407,22 @@ async def stream_part_audio(test_id: int, part_id: int):
 )
 async def translate_question(request: GeminiTranslateQuestionRequest):
     try:
-        with get_db_cursor() as cursor:
-            # Check if translation already exists in database
-            cursor.execute(SELECT_QUESTION_TRANSLATE_JSON, (request.question_id,))
-            cached_row = cursor.fetchone()
-            
-            if cached_row and cached_row.get('question_translate_json'):
-                cached_data = cached_row['question_translate_json']
-                # Parse if it's a string, otherwise use as-is
-                if isinstance(cached_data, str):
-                    cached_data = json.loads(cached_data)
-                # Check if the cached data matches the requested language
-                if cached_data.get('language_id') == request.language_id:
-                    return cached_data
-            
-            # If no cached data, proceed with translation
-            cursor.execute(SELECT_QUESTION_BLOCK_JSON_BY_ID, (request.question_id,))
-            row = cursor.fetchone()
-            if not row or not row.get('question_block_json'):
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Question not found"
-                )
-            question_block_json = row['question_block_json']
-
-            prompt = build_question_translation_prompt(question_block_json, request.language_id)
-            gemini_response = generate_text_with_gemini(prompt)
-            if not gemini_response:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to get translation from Gemini"
-                )
-            
-            # Clean the response: remove markdown code blocks if present
-            cleaned_response = clean_gemini_response(gemini_response)
-            
-            response = json.loads(cleaned_response)
-            
-            # Update the translation in the database
-            cursor.execute(
-                UPDATE_QUESTION_TRANSLATE_JSON_SCRIPT,
-                (json.dumps(response), request.question_id)
+        response = await get_or_generate_question_artifact(
+            AI_ARTIFACT_KIND.TRANSLATE,
+            request.question_id,
+            request.language_id,
+        )
+        if response is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Question not found"
             )
 
         return response
     except HTTPException:
         raise
+    except GeminiUnavailableError as e:
+        raise e.to_http_exception()
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -219,72 +437,127 @@ async def translate_question(request: GeminiTranslateQuestionRequest):
 )
 async def explain_question(request: GeminiExplainQuestionRequest):
     try:
-        with get_db_cursor() as cursor:
-            # Check if explanation already exists in database
-            cursor.execute(SELECT_QUESTION_EXPLAIN_JSON, (request.question_id,))
-            cached_row = cursor.fetchone()
-            
-            if cached_row and cached_row.get('question_explain_json'):
-                cached_data = cached_row['question_explain_json']
-                # Parse if it's a string, otherwise use as-is
-                if isinstance(cached_data, str):
-                    cached_data = json.loads(cached_data)
-                # Check if the cached data matches the requested language
-                if cached_data.get('language_id') == request.language_id:
-                    return cached_data
-            
-            # If no cached data, proceed with explanation generation
-            cursor.execute(SELECT_QUESTION_EXPLAIN_BLOCK_JSON_BY_ID, (request.question_id,))
-            row = cursor.fetchone()
-            if not row or not row.get('question_explain_block_json'):
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Question not found"
-                )
-            question_explain_block_json = row['question_explain_block_json']
-
-            prompt = build_question_explain_prompt(question_explain_block_json, request.language_id)
-            gemini_response = generate_text_with_gemini(prompt)
-            if not gemini_response:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to get explanation from Gemini"
-                )
-            
-            # Clean the response: remove markdown code blocks if present
-            cleaned_response = clean_gemini_response(gemini_response)
-            
-            response = json.loads(cleaned_response)
-            
-            # Update the explanation in the database
-            cursor.execute(
-                UPDATE_QUESTION_EXPLAIN_JSON_SCRIPT,
-                (json.dumps(response), request.question_id)
+        response = await get_or_generate_question_artifact(
+            AI_ARTIFACT_KIND.EXPLAIN,
+            request.question_id,
+            request.language_id,
+        )
+        if response is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Question not found"
             )
 
         return response
     except HTTPException:
         raise
+    except GeminiUnavailableError as e:
+        raise e.to_http_exception()
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error in translate question controller: {str(e)}"
+            detail=f"Error in explain question controller: {str(e)}"
+        )
+
+@router.post(
+    "/gemini/explain/question/stream",
+    description="Explain a TOEIC question to the target language using Gemini AI, streamed as Server-Sent Events field by field."
+)
+async def stream_explain_question(request: GeminiExplainQuestionRequest):
+    try:
+        events = await open_question_artifact_stream(
+            AI_ARTIFACT_KIND.EXPLAIN,
+            request.question_id,
+            request.language_id,
+        )
+        if events is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Question not found"
+            )
+
+        return StreamingResponse(
+            events,
+            media_type="text/event-stream",
+            # Proxies must forward each event as soon as it is written
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            # Also runs when the client disconnects: stops Gemini and frees the quota slot
+            background=BackgroundTask(events.aclose),
+        )
+    except HTTPException:
+        raise
+    except GeminiUnavailableError as e:
+        raise e.to_http_exception()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in stream explain question controller: {str(e)}"
+        )
+
+
+async def _get_or_generate_question_artifact_batch(kind: AI_ARTIFACT_KIND, request: GeminiQuestionBatchRequest) -> List[dict]:
+    question_id_list = request.question_id_list
+    if question_id_list is None:
+        question_id_list = await run_in_threadpool(select_question_id_list, request.media_group_id, request.part_id)
+    return await get_or_generate_question_artifact_list(kind, question_id_list, request.language_id)
+
+
+@router.post(
+    "/gemini/translate/question/batch",
+    response_model=List[GeminiTranslateQuestionResponse],
+    description="Translate the questions of a media group, of a part or of a list of question ids in as few Gemini calls as possible."
+)
+async def translate_question_batch(request: GeminiQuestionBatchRequest):
+    try:
+        return await _get_or_generate_question_artifact_batch(AI_ARTIFACT_KIND.TRANSLATE, request)
+    except HTTPException:
+        raise
+    except GeminiUnavailableError as e:
+        raise e.to_http_exception()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in translate question batch controller: {str(e)}"
+        )
+
+
+@router.post(
+    "/gemini/explain/question/batch",
+    response_model=List[GeminiExplainQuestionResponse],
+    description="Explain the questions of a media group, of a part or of a list of question ids in as few Gemini calls as possible."
+)
+async def explain_question_batch(request: GeminiQuestionBatchRequest):
+    try:
+        return await _get_or_generate_question_artifact_batch(AI_ARTIFACT_KIND.EXPLAIN, request)
+    except HTTPException:
+        raise
+    except GeminiUnavailableError as e:
+        raise e.to_http_exception()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in explain question batch controller: {str(e)}"
         )
 
+
+def _select_base64_image(media_id: int):
+    with get_db_cursor() as cursor:
+        cursor.execute(SELECT_BASE64_IMAGE_BY_MEDIA_ID, (media_id,))
+        return cursor.fetchone()
+
+
 @router.post("/gemini/translate/image", response_model=dict)
 async def translate_image(request: GeminiTranslateImageRequest):
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(SELECT_BASE64_IMAGE_BY_MEDIA_ID, (request.media_id,))
-            row = cursor.fetchone()
-            if not row or not row.get('paragrap_main'):
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Image not found"
-                )
-            img = row['paragrap_main']
+        row = await run_in_threadpool(_select_base64_image, request.media_id)
+        if not row or not row.get('paragrap_main'):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Image not found"
+            )
+        img = row['paragrap_main']
 
-            return  {"img": img}
+        return  {"img": img}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -292,22 +565,37 @@ async def translate_image(request: GeminiTranslateImageRequest):
         )
 
 
+def _select_audio_script(media_id: int):
+    with get_db_cursor() as cursor:
+        cursor.execute(SELECT_AUDIO_SCRIPT_BY_MEDIA_ID, (media_id,))
+        row = cursor.fetchone()
+
+    if not row or not row.get('audio_script'):
+        return None
+
+    return build_cached_payload(json.dumps({"script": row['audio_script']}).encode())
+
+
 @router.post("/gemini/translate/audio-script", response_model=dict)
-async def translate_audio_script(request: GeminiTranslateAudioScriptRequest):
+async def translate_audio_script(request: GeminiTranslateAudioScriptRequest, http_request: Request):
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(SELECT_AUDIO_SCRIPT_BY_MEDIA_ID, (request.media_id,))
-            row = cursor.fetchone()
-            if not row or not row.get('audio_script'):
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Audio script not found"
-                )
-            script = row['audio_script']
+        payload = await run_in_threadpool(
+            get_or_load_media_payload,
+            "audio_script", 
+            request.media_id, 
+            lambda: _select_audio_script(request.media_id),
+        )
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Audio script not found"
+            )
 
-            return  {"script": script}
+        return build_cached_response(http_request, payload)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error in translate audio script controller: {str(e)}"
-        )
\ No newline at end of file
+        )
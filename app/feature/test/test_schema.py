@@ -1,5 +1,5 @@
 from typing import Dict
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Optional
 
 
@@ -23,15 +23,24 @@ class MediaQuestionDetailResponse(BaseModel):
     media_question_id: int
     media_question_name: str
     media_question_main_paragraph: str
+    media_question_image_url: Optional[str] = None
     media_question_audio_script: Optional[str] = None
     question_list: List[QuestionDetailResponse]
 
 
+class AudioMetadataResponse(BaseModel):
+    duration: float
+    bitrate: int
+    size: int
+    etag: str
+
+
 class PartDetailResponse(BaseModel):
     part_id: int
     part_order: str
     part_title: str
     part_audio_url: Optional[str] = None
+    part_audio_metadata: Optional[AudioMetadataResponse] = None
     media_question_list: List[MediaQuestionDetailResponse]
 
 
@@ -39,6 +48,29 @@ class TestDetailResponse(BaseModel):
     part_list: List[PartDetailResponse]
 
 
+class QuestionSkeletonResponse(BaseModel):
+    question_id: int
+    question_number: int
+
+
+class MediaQuestionSkeletonResponse(BaseModel):
+    media_question_id: int
+    media_question_name: str
+    question_list: List[QuestionSkeletonResponse]
+
+
+class PartSkeletonResponse(BaseModel):
+    part_id: int
+    part_order: str
+    part_title: str
+    part_audio_url: Optional[str] = None
+    media_question_list: List[MediaQuestionSkeletonResponse]
+
+
+class TestSkeletonResponse(BaseModel):
+    part_list: List[PartSkeletonResponse]
+
+
 class PartSummaryResponse(BaseModel):
     part_id: int
     part_order: str
@@ -51,6 +83,8 @@ class TestSummaryResponse(BaseModel):
     test_title: str
     test_duration: int
     test_description: str
+    test_type: Optional[str] = None
+    test_bank_id: Optional[int] = None
     part_list: List[PartSummaryResponse]
 
 
@@ -116,6 +150,25 @@ class GeminiExplainQuestionRequest(BaseModel):
         return v
 
 
+class GeminiIncorrectAnswerReason(BaseModel):
+    answer_label: str
+    reason: str
+
+
+# Structured output requested from Gemini for an explanation. Gemini schemas can't
+# describe a dict with free keys, so the reasons come as a list and are turned into
+# GeminiExplainQuestionResponse.incorrect_answer_reason (the docstring is sent to
+# Gemini as the schema description)
+class GeminiExplainQuestionOutput(BaseModel):
+    """Explanation of a TOEIC question"""
+    question_id: int
+    question_ask: str
+    question_need: str
+    correct_answer_reason: str
+    incorrect_answer_reason_list: List[GeminiIncorrectAnswerReason]
+    language_id: LanguageCode
+
+
 class GeminiExplainQuestionResponse(BaseModel):
     question_id: int
     question_ask: str
@@ -132,4 +185,27 @@ class GeminiExplainQuestionResponse(BaseModel):
         return v
 
 
+# Upper bound of question_id_list, a full test has 200 questions
+MAX_BATCH_QUESTION_COUNT = 200
+
+
+class GeminiQuestionBatchRequest(BaseModel):
+    """Questions of a media group, of a part, or a list of question ids (exactly one of them)"""
+    media_group_id: Optional[int] = None
+    part_id: Optional[int] = None
+    question_id_list: Optional[List[int]] = Field(default=None, max_length=MAX_BATCH_QUESTION_COUNT)
+    language_id: LanguageCode
+
+    @field_validator('language_id')
+    @classmethod
+    def validate_language_id(cls, v):
+        if v not in LANGUAGE_MAP:
+            raise ValueError(f'Invalid language code. Must be one of: {list(LANGUAGE_MAP.keys())}')
+        return v
 
+    @model_validator(mode='after')
+    def validate_question_source(self):
+        source_count = sum(value is not None for value in (self.media_group_id, self.part_id, self.question_id_list))
+        if source_count != 1:
+            raise ValueError('Exactly one of media_group_id, part_id or question_id_list is required')
+        return self
@@ -0,0 +1,288 @@
+"""
+Materialized test snapshots served from memory-mapped files.
+
+Export (run after each content import, also invalidates the test caches of
+every worker):
+    python -m app.feature.test.test_snapshot export
+
+Each snapshot records the content version (see test_cache) it was exported
+at, and is only served while that version is current: after
+"test_cache invalidate [--test-id N]" the invalidated tests are served from
+MySQL until the next export.
+
+Layout of SNAPSHOT_DIRECTORY:
+    current                      -> name of the active snapshot version
+    <version>/manifest.json      -> files and ETags of the version
+    <version>/summary.json       -> output of SELECT_ALL_TEST_PROC
+    <version>/test_<id>.json     -> output of SELECT_TEST_DETAIL_PROC
+    <version>/*.json.gz          -> gzip variants, sent to clients accepting gzip
+
+Every uvicorn worker maps the same files, so the content lives once in the OS
+page cache instead of once per worker.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.core.app_config import app_config
+from app.util.http_cache_util import GZIP_MINIMUM_SIZE, CachedPayload, build_etag, compress_body
+
+
+logger = logging.getLogger(__name__)
+
+
+CURRENT_VERSION_FILE = "current"
+MANIFEST_FILE = "manifest.json"
+SUMMARY_SNAPSHOT_KEY = "summary"
+
+
+class SnapshotStore:
+    """Read side of the snapshots: maps snapshot files of the current version."""
+
+    def __init__(self, snapshot_directory: str, check_interval_seconds: float):
+        self.snapshot_directory = Path(snapshot_directory) if snapshot_directory else None
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._manifest: dict = {}
+        self._payloads: dict[str, CachedPayload] = {}
+        self._current_file_mtime: Optional[float] = None
+        self._last_check = 0.0
+
+    def _refresh_if_changed(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval_seconds:
+            return
+        self._last_check = now
+
+        current_file = self.snapshot_directory / CURRENT_VERSION_FILE
+        try:
+            current_file_mtime = current_file.stat().st_mtime
+        except FileNotFoundError:
+            self._reset(None, {})
+            return
+
+        if current_file_mtime == self._current_file_mtime:
+            return
+
+        version = current_file.read_text(encoding="utf-8").strip()
+        try:
+            with open(self.snapshot_directory / version / MANIFEST_FILE, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.warning(f"Snapshot version {version} is not readable: {e}")
+            self._reset(None, {})
+            return
+
+        self._reset(version, manifest)
+        self._current_file_mtime = current_file_mtime
+        logger.info(f"Serving test snapshots from version {version}")
+
+    def _reset(self, version: Optional[str], manifest: dict) -> None:
+        # Mappings still referenced by in-flight responses stay valid until released
+        self._version = version
+        self._manifest = manifest
+        self._payloads = {}
+        self._current_file_mtime = None
+
+    def _map_file(self, file_name: str) -> memoryview:
+        with open(self.snapshot_directory / self._version / file_name, "rb") as f:
+            mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped_file)
+
+    def _map_payload(self, entry: dict) -> CachedPayload:
+        gzip_file = entry.get("gzip_file")
+        return CachedPayload(
+            body=self._map_file(entry["file"]),
+            etag=entry["etag"],
+            gzip_body=self._map_file(gzip_file) if gzip_file else None,
+        )
+
+    def get_payload(self, snapshot_key: str, content_version: str) -> Optional[CachedPayload]:
+        """
+        Get a snapshot as a zero-copy payload.
+
+        Args:
+            snapshot_key: "summary" or a test ID as string
+            content_version: Current content version of the snapshot content
+
+        Returns:
+            CachedPayload backed by a memory-mapped file, or None if there is no
+            snapshot or it was exported at another content version
+        """
+        if self.snapshot_directory is None:
+            return None
+
+        with self._lock:
+            self._refresh_if_changed()
+            if self._version is None:
+                return None
+
+            if snapshot_key == SUMMARY_SNAPSHOT_KEY:
+                entry = self._manifest.get("summary")
+            else:
+                entry = self._manifest.get("tests", {}).get(snapshot_key)
+            if not entry or entry.get("content_version") != content_version:
+                return None
+
+            payload = self._payloads.get(snapshot_key)
+            if payload is not None:
+                return payload
+
+            try:
+                payload = self._map_payload(entry)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Snapshot {snapshot_key} of version {self._version} is not readable: {e}")
+                return None
+
+            self._payloads[snapshot_key] = payload
+            return payload
+
+
+snapshot_store = SnapshotStore(
+    app_config.SNAPSHOT_DIRECTORY,
+    app_config.SNAPSHOT_CHECK_INTERVAL_SECONDS,
+)
+
+
+def get_test_summary_snapshot(content_version: str) -> Optional[CachedPayload]:
+    """Summary snapshot, if exported at content_version (the version of every test)."""
+    return snapshot_store.get_payload(SUMMARY_SNAPSHOT_KEY, content_version)
+
+
+def get_test_detail_snapshot(test_id: int, content_version: str) -> Optional[CachedPayload]:
+    """Detail snapshot of a test, if exported at content_version (the version of the test)."""
+    return snapshot_store.get_payload(str(test_id), content_version)
+
+
+def _write_snapshot_file(version_directory: Path, file_name: str, body: bytes, content_version: str) -> dict:
+    with open(version_directory / file_name, "wb") as f:
+        f.write(body)
+    entry = {"file": file_name, "etag": build_etag(body), "size": len(body), "content_version": content_version}
+
+    # Store the compressed variant next to the plain one
+    if len(body) >= GZIP_MINIMUM_SIZE:
+        gzip_file_name = file_name + ".gz"
+        with open(version_directory / gzip_file_name, "wb") as f:
+            f.write(compress_body(body))
+        entry["gzip_file"] = gzip_file_name
+
+    return entry
+
+
+def _create_version_directory(snapshot_root: Path) -> Tuple[str, Path]:
+    """
+    Create the directory of a new version. Names sort in export order; two
+    exports started in the same microsecond get a counter suffix.
+
+    Returns:
+        (version, version directory)
+    """
+    snapshot_root.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    for sequence in itertools.count():
+        version = timestamp if sequence == 0 else f"{timestamp}-{sequence}"
+        version_directory = snapshot_root / version
+        try:
+            version_directory.mkdir(exist_ok=False)
+        except FileExistsError:
+            continue
+        return version, version_directory
+
+
+def export_snapshots(snapshot_directory: str, keep_version_count: int) -> str:
+    """
+    Export the summary list and the detail of every visible test into a new
+    snapshot version, then make it the current one.
+
+    Returns:
+        Name of the exported version
+    """
+    # Imported here: the read side must not depend on the database layer
+    from app.feature.test.test_cache import (
+        get_global_content_version,
+        get_test_content_version,
+        invalidate_test_content,
+    )
+    from app.feature.test.test_content_service import select_all_test_json, select_test_detail_json
+
+    # Content served from MySQL (skeletons, parts, answer keys) is reloaded as
+    # well, and the snapshots of the previous export stop being served
+    invalidate_test_content()
+
+    snapshot_root = Path(snapshot_directory)
+    version, version_directory = _create_version_directory(snapshot_root)
+
+    manifest = {"version": version, "created_at": datetime.now().isoformat(), "tests": {}}
+
+    test_list_json = select_all_test_json()
+    if test_list_json:
+        manifest["summary"] = _write_snapshot_file(
+            version_directory, "summary.json", test_list_json, get_global_content_version()
+        )
+
+        for test in json.loads(test_list_json):
+            test_id = test["test_id"]
+            test_detail_json = select_test_detail_json(test_id)
+            if not test_detail_json:
+                logger.warning(f"Test {test_id} has no content, skipped")
+                continue
+            # Versions as of the start of the export, older than the content read
+            # since: a test invalidated during the export is not served from it
+            manifest["tests"][str(test_id)] = _write_snapshot_file(
+                version_directory, f"test_{test_id}.json", test_detail_json, get_test_content_version(test_id)
+            )
+            logger.info(f"Exported test {test_id} ({len(test_detail_json)} bytes)")
+
+    with open(version_directory / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Switch atomically so workers never see a half-written version
+    current_file_tmp = snapshot_root / f"{CURRENT_VERSION_FILE}.{version}.tmp"
+    current_file_tmp.write_text(version, encoding="utf-8")
+    os.replace(current_file_tmp, snapshot_root / CURRENT_VERSION_FILE)
+
+    _remove_old_versions(snapshot_root, keep_version_count)
+    return version
+
+
+def _remove_old_versions(snapshot_root: Path, keep_version_count: int) -> None:
+    version_directories = sorted(
+        (path for path in snapshot_root.iterdir() if path.is_dir()),
+        key=lambda path: path.name,
+    )
+    for version_directory in version_directories[:-keep_version_count]:
+        # Files still mapped by a running worker cannot be removed on Windows
+        shutil.rmtree(version_directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage materialized test snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export all visible tests into a new snapshot version")
+    export_parser.add_argument("--directory", default=app_config.SNAPSHOT_DIRECTORY, help="Snapshot directory (default: SNAPSHOT_DIRECTORY)")
+    export_parser.add_argument("--keep", type=int, default=3, help="Number of snapshot versions to keep")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "export":
+        if not args.directory:
+            parser.error("SNAPSHOT_DIRECTORY is not configured; pass --directory")
+        version = export_snapshots(args.directory, max(args.keep, 1))
+        print(f"Snapshot version {version} exported to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
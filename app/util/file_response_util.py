@@ -0,0 +1,290 @@
+"""File responses with explicit Range / conditional GET handling, sent with zero-copy when available"""
+
+import re
+from email.utils import parsedate_to_datetime
+from secrets import token_hex
+from typing import BinaryIO, List, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.util.http_cache_util import is_etag_matched
+
+
+# ASGI extension of servers able to sendfile() a file descriptor
+ZERO_COPY_SEND_EXTENSION = "http.response.zerocopysend"
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Requests asking for more ranges than this get the whole file
+MAX_RANGE_COUNT = 16
+
+_RANGE_BOUND_PATTERN = re.compile(r"^\d*$")
+
+# Half-open byte range [start, end)
+ByteRange = Tuple[int, int]
+
+
+class RangeNotSatisfiableError(Exception):
+    pass
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[ByteRange]]:
+    """
+    Parse a Range header into sorted, coalesced byte ranges.
+
+    Args:
+        range_header: Raw header value, e.g. "bytes=0-1023", "bytes=-500" or "bytes=0-99, 200-"
+        file_size: Size of the file in bytes
+
+    Returns:
+        List of (start, end) ranges, or None when the header must be ignored
+        (malformed, other unit, too many ranges) and the whole file sent
+
+    Raises:
+        RangeNotSatisfiableError: No range overlaps the file
+    """
+    unit, separator, range_set = range_header.partition("=")
+    if not separator or unit.strip().lower() != "bytes":
+        return None
+
+    byte_ranges: List[ByteRange] = []
+    for range_spec in range_set.split(","):
+        range_spec = range_spec.strip()
+        if not range_spec:
+            continue
+
+        first, dash, last = range_spec.partition("-")
+        first, last = first.strip(), last.strip()
+        if not dash or not _RANGE_BOUND_PATTERN.match(first) or not _RANGE_BOUND_PATTERN.match(last):
+            return None
+
+        if first:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            if start >= file_size:
+                continue
+            end = min(int(last) + 1, file_size) if last else file_size
+        else:
+            # Suffix range: the last N bytes
+            if not last:
+                return None
+            suffix_length = int(last)
+            if suffix_length == 0:
+                continue
+            start, end = max(file_size - suffix_length, 0), file_size
+
+        byte_ranges.append((start, end))
+
+    if not byte_ranges:
+        raise RangeNotSatisfiableError()
+    if len(byte_ranges) > MAX_RANGE_COUNT:
+        return None
+
+    byte_ranges.sort()
+    coalesced_ranges = [byte_ranges[0]]
+    for start, end in byte_ranges[1:]:
+        last_start, last_end = coalesced_ranges[-1]
+        if start <= last_end:
+            coalesced_ranges[-1] = (last_start, max(last_end, end))
+        else:
+            coalesced_ranges.append((start, end))
+    return coalesced_ranges
+
+
+def is_if_range_matched(if_range: str, etag: str, last_modified: str) -> bool:
+    """
+    Check If-Range: the range is only served when the client's copy is current.
+
+    ETags use strong comparison (a weak ETag never matches), dates must be
+    the exact Last-Modified value.
+    """
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return if_range == last_modified
+
+
+def is_not_modified(request_headers: Headers, etag: str, mtime: float) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since when there is no If-None-Match.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return is_etag_matched(if_none_match, etag)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def _read_file_chunk(file: BinaryIO, position: int, size: int) -> bytes:
+    file.seek(position)
+    return file.read(size)
+
+
+class RangeFileResponse(Response):
+    """
+    Response for a static file with validators known in advance (e.g. from an index).
+
+    Answers 304 to If-None-Match / If-Modified-Since, 206 to single and multiple
+    Range requests (honouring If-Range) and 416 to unsatisfiable ones. The body
+    goes through the zero-copy send extension when the server offers it,
+    otherwise through chunked reads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        mtime: float,
+        etag: str,
+        last_modified: str,
+        media_type: str,
+        headers: Optional[Mapping[str, str]] = None,
+        filename: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.etag = etag
+        self.last_modified = last_modified
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["etag"] = etag
+        self.headers["last-modified"] = last_modified
+        if filename is not None:
+            self.headers.setdefault("content-disposition", f"attachment; filename*=utf-8''{quote(filename)}")
+
+    def _validator_headers(self) -> List[Tuple[bytes, bytes]]:
+        # Headers of a 304 / 416: everything but the body description
+        skipped_header_names = (b"content-type", b"content-length", b"content-disposition")
+        return [(name, value) for name, value in self.raw_headers if name not in skipped_header_names]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        send_header_only = scope["method"].upper() == "HEAD"
+
+        if is_not_modified(request_headers, self.etag, self.mtime):
+            await send({"type": "http.response.start", "status": 304, "headers": self._validator_headers()})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        byte_ranges = None
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header is not None and (if_range is None or is_if_range_matched(if_range, self.etag, self.last_modified)):
+            try:
+                byte_ranges = parse_range_header(range_header, self.size)
+            except RangeNotSatisfiableError:
+                headers = self._validator_headers() + [
+                    (b"content-range", f"bytes */{self.size}".encode("latin-1")),
+                    (b"content-length", b"0"),
+                ]
+                await send({"type": "http.response.start", "status": 416, "headers": headers})
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+
+        if not byte_ranges:
+            self.headers["content-length"] = str(self.size)
+            await self._send_body(scope, send, 200, [], send_header_only)
+        elif len(byte_ranges) == 1:
+            start, end = byte_ranges[0]
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{self.size}"
+            self.headers["content-length"] = str(end - start)
+            await self._send_body(scope, send, 206, [(b"", start, end)], send_header_only)
+        else:
+            await self._send_multipart_body(scope, send, byte_ranges, send_header_only)
+
+    async def _send_multipart_body(
+        self, scope: Scope, send: Send, byte_ranges: List[ByteRange], send_header_only: bool
+    ) -> None:
+        boundary = token_hex(13)
+        content_type = self.headers["content-type"]
+
+        part_list = []
+        content_length = 0
+        for index, (start, end) in enumerate(byte_ranges):
+            part_header = (
+                ("\r\n" if index else "")
+                + f"--{boundary}\r\n"
+                + f"Content-Type: {content_type}\r\n"
+                + f"Content-Range: bytes {start}-{end - 1}/{self.size}\r\n\r\n"
+            ).encode("latin-1")
+            part_list.append((part_header, start, end))
+            content_length += len(part_header) + end - start
+        closing_delimiter = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        content_length += len(closing_delimiter)
+
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(content_length)
+        await self._send_body(scope, send, 206, part_list, send_header_only, closing_delimiter)
+
+    async def _send_body(
+        self,
+        scope: Scope,
+        send: Send,
+        status_code: int,
+        part_list: List[Tuple[bytes, int, int]],
+        send_header_only: bool,
+        closing_delimiter: bytes = b"",
+    ) -> None:
+        """
+        Send the response start and the given parts, each as (prefix, start, end).
+        An empty part_list sends the whole file.
+        """
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        if send_header_only or self.size == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if not part_list:
+            part_list = [(b"", 0, self.size)]
+
+        is_zero_copy = ZERO_COPY_SEND_EXTENSION in scope.get("extensions", {})
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            for index, (prefix, start, end) in enumerate(part_list):
+                more_body = bool(closing_delimiter) or index < len(part_list) - 1
+                if prefix:
+                    await send({"type": "http.response.body", "body": prefix, "more_body": True})
+
+                if is_zero_copy:
+                    await send({
+                        "type": ZERO_COPY_SEND_EXTENSION,
+                        "file": file,
+                        "offset": start,
+                        "count": end - start,
+                        "more_body": more_body,
+                    })
+                    continue
+
+                position = start
+                while position < end:
+                    chunk = await anyio.to_thread.run_sync(
+                        _read_file_chunk, file, position, min(FILE_CHUNK_SIZE, end - position)
+                    )
+                    if not chunk:
+                        raise OSError(f"File at path {self.path} was truncated while sending it")
+                    position += len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": more_body or position < end,
+                    })
+
+            if closing_delimiter:
+                await send({"type": "http.response.body", "body": closing_delimiter, "more_body": False})
+        finally:
+            await anyio.to_thread.run_sync(file.close)
@@ -0,0 +1,192 @@
+"""HTTP caching helpers (ETag / conditional GET / compression) for cacheable payloads"""
+
+import gzip
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from cachetools import TTLCache
+from fastapi import Request, Response, status
+
+from app.core.app_config import app_config
+from app.util.response_encoding_util import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, encode_msgpack, is_msgpack_accepted
+
+
+# Smaller bodies are not worth a Content-Encoding
+GZIP_MINIMUM_SIZE = 1000
+GZIP_COMPRESS_LEVEL = 6
+
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "application/javascript", "application/msgpack", "image/svg+xml")
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    """Serialized response body together with its strong validator."""
+    # memoryview for bodies backed by a memory-mapped snapshot file
+    body: Union[bytes, memoryview]
+    etag: str
+    media_type: str = JSON_MEDIA_TYPE
+    # Pre-compressed variant of body, compressed once per content version
+    gzip_body: Optional[Union[bytes, memoryview]] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + (len(self.gzip_body) if self.gzip_body is not None else 0)
+
+
+def build_etag(body: bytes) -> str:
+    """Build a strong ETag from the exact bytes sent to the client."""
+    return f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+def build_gzip_etag(etag: str) -> str:
+    """Strong ETag of the gzip representation: it must differ from the identity one."""
+    return etag[:-1] + '-gzip"'
+
+
+def is_compressible_media_type(media_type: Optional[str]) -> bool:
+    if not media_type:
+        return False
+    media_type = media_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_MEDIA_TYPES
+
+
+def compress_body(body: Union[bytes, memoryview]) -> bytes:
+    return gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL)
+
+
+def build_cached_payload(body: bytes, media_type: str = JSON_MEDIA_TYPE) -> CachedPayload:
+    gzip_body = None
+    if is_compressible_media_type(media_type) and len(body) >= GZIP_MINIMUM_SIZE:
+        gzip_body = compress_body(body)
+
+    return CachedPayload(body=body, etag=build_etag(body), media_type=media_type, gzip_body=gzip_body)
+
+
+# MessagePack variants of cached JSON payloads, keyed by the JSON ETag and built
+# on the first request that asks for them
+_msgpack_variant_cache = TTLCache(
+    maxsize=app_config.MSGPACK_CACHE_MAX_BYTES,
+    ttl=app_config.TEST_CACHE_TTL_SECONDS,
+    getsizeof=lambda payload: payload.size,
+)
+_msgpack_variant_lock = threading.Lock()
+
+
+def get_msgpack_variant(payload: CachedPayload) -> CachedPayload:
+    """Get the MessagePack variant of a JSON payload, encoding it once per content version."""
+    with _msgpack_variant_lock:
+        msgpack_payload = _msgpack_variant_cache.get(payload.etag)
+    if msgpack_payload is not None:
+        return msgpack_payload
+
+    msgpack_body = encode_msgpack(json.loads(bytes(payload.body)))
+    msgpack_payload = build_cached_payload(msgpack_body, media_type=MSGPACK_MEDIA_TYPE)
+
+    with _msgpack_variant_lock:
+        try:
+            _msgpack_variant_cache[payload.etag] = msgpack_payload
+        except ValueError:
+            pass
+
+    return msgpack_payload
+
+
+def is_gzip_accepted(accept_encoding: Optional[str]) -> bool:
+    """
+    Check whether an Accept-Encoding header allows a gzip response.
+
+    Args:
+        accept_encoding: Raw header value, e.g. "gzip, deflate, br" or "gzip;q=0, *"
+    """
+    if not accept_encoding:
+        return False
+
+    wildcard_accepted = False
+    for coding in accept_encoding.split(","):
+        name, _, parameters = coding.partition(";")
+        name = name.strip().lower()
+
+        quality = 1.0
+        parameters = parameters.strip().lower()
+        if parameters.startswith("q="):
+            try:
+                quality = float(parameters[2:])
+            except ValueError:
+                quality = 0.0
+
+        if name == "gzip":
+            return quality > 0
+        if name == "*":
+            wildcard_accepted = quality > 0
+
+    return wildcard_accepted
+
+
+def is_etag_matched(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header value against an ETag.
+
+    Args:
+        if_none_match: Raw header value, e.g. '"abc", W/"def"' or '*'
+        etag: Strong ETag of the current representation (quoted)
+
+    Returns:
+        True if the client already holds the current representation
+    """
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match uses weak comparison
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
+
+
+def build_cached_response(
+    request: Request,
+    payload: CachedPayload,
+    cache_control: str = "public, no-cache",
+) -> Response:
+    """
+    Build the response for a cached payload, answering 304 when the client's
+    If-None-Match already matches the payload ETag.
+
+    JSON payloads are sent as MessagePack to clients that opt in through Accept,
+    and pre-compressed variants are sent to clients accepting gzip.
+    """
+    vary_list = []
+    if payload.media_type == JSON_MEDIA_TYPE:
+        vary_list.append("Accept")
+        if is_msgpack_accepted(request.headers.get("accept")):
+            payload = get_msgpack_variant(payload)
+
+    use_gzip = payload.gzip_body is not None and is_gzip_accepted(request.headers.get("accept-encoding"))
+    etag = build_gzip_etag(payload.etag) if use_gzip else payload.etag
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+    }
+    if payload.gzip_body is not None:
+        vary_list.append("Accept-Encoding")
+    if vary_list:
+        headers["Vary"] = ", ".join(vary_list)
+
+    if is_etag_matched(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=payload.gzip_body, media_type=payload.media_type, headers=headers)
+
+    return Response(content=payload.body, media_type=payload.media_type, headers=headers)
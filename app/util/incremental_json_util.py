@@ -0,0 +1,101 @@
+"""Parsing of a JSON object while its text is still arriving (e.g. an LLM stream)"""
+
+import json
+from typing import Any, List, Tuple
+
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalJsonObjectParser:
+    """
+    Extract the top-level fields of a JSON object as soon as each one is complete.
+
+    Text before the opening brace (e.g. a markdown code fence) is skipped.
+    Malformed input stops the extraction; the caller still gets the full text
+    to parse (or fail on) at the end.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._is_started = False
+        self._is_stopped = False
+        self._decoder = json.JSONDecoder()
+
+    def _skip_whitespace(self) -> None:
+        while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+            self._position += 1
+
+    def _parse_field(self):
+        """
+        Parse the field at the current position.
+
+        Returns:
+            (name, value), or None if the field is not complete yet
+        """
+        position = self._position
+        buffer = self._buffer
+        try:
+            name, position = self._decoder.raw_decode(buffer, position)
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position >= len(buffer):
+                return None
+            if buffer[position] != ":" or not isinstance(name, str):
+                self._is_stopped = True
+                return None
+            position += 1
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            value, position = self._decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Incomplete string / object so far
+            return None
+
+        # A number or literal is only complete once the next delimiter arrived ("12" may become "123")
+        while position < len(buffer) and buffer[position] in _WHITESPACE:
+            position += 1
+        if position >= len(buffer):
+            return None
+
+        self._position = position
+        return name, value
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Add text and return the fields completed by it, in order.
+        """
+        self._buffer += text
+        field_list = []
+
+        if not self._is_started:
+            brace_position = self._buffer.find("{", self._position)
+            if brace_position < 0:
+                self._position = len(self._buffer)
+                return field_list
+            self._position = brace_position + 1
+            self._is_started = True
+
+        while not self._is_stopped:
+            self._skip_whitespace()
+            if self._position >= len(self._buffer):
+                break
+
+            character = self._buffer[self._position]
+            if character == "}":
+                self._is_stopped = True
+                break
+            if character == ",":
+                self._position += 1
+                continue
+            if character != '"':
+                self._is_stopped = True
+                break
+
+            field = self._parse_field()
+            if field is None:
+                break
+            field_list.append(field)
+
+        return field_list
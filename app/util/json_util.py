@@ -0,0 +1,20 @@
+"""Helpers for JSON values read from MySQL and JSON schemas of responses"""
+
+import json
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+
+
+def parse_json_column(value: Any) -> Any:
+    """Parse a JSON column, returned as text or bytes by some drivers and as a value by others."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return json.loads(value)
+    return value
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(response_type: Any) -> TypeAdapter:
+    """Shared TypeAdapter of a response schema, built once per type."""
+    return TypeAdapter(response_type)
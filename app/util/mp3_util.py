@@ -0,0 +1,181 @@
+"""MPEG audio (MP3) frame header parsing"""
+
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple, Union
+
+
+MPEG_VERSION_2_5 = 0
+MPEG_VERSION_2 = 2
+MPEG_VERSION_1 = 3
+
+ID3V2_HEADER_SIZE = 10
+FRAME_HEADER_SIZE = 4
+
+# Bitrates in kbps by (is MPEG 1, layer); index 0 is "free", index 15 is invalid
+_BITRATE_TABLE = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+_SAMPLE_RATE_TABLE = {
+    MPEG_VERSION_1: (44100, 48000, 32000),
+    MPEG_VERSION_2: (22050, 24000, 16000),
+    MPEG_VERSION_2_5: (11025, 12000, 8000),
+}
+
+
+@dataclass(frozen=True)
+class Mp3FrameHeader:
+    version: int
+    layer: int
+    bitrate: int  # bits per second
+    sample_rate: int
+    samples_per_frame: int
+    frame_length: int  # bytes, header included
+    is_mono: bool
+
+
+def parse_frame_header(header: Union[bytes, memoryview]) -> Optional[Mp3FrameHeader]:
+    """
+    Parse the 4 bytes of an MPEG audio frame header.
+
+    Returns:
+        Mp3FrameHeader, or None if the bytes are not a valid (non free-format) header
+    """
+    if len(header) < FRAME_HEADER_SIZE or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = (header[2] >> 4) & 0x0F
+    sample_rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    channel_mode = (header[3] >> 6) & 0x03
+
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    is_mpeg_1 = version == MPEG_VERSION_1
+    bitrate = _BITRATE_TABLE[(is_mpeg_1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATE_TABLE[version][sample_rate_index]
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or is_mpeg_1:
+        samples_per_frame = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        samples_per_frame = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+
+    return Mp3FrameHeader(
+        version=version,
+        layer=layer,
+        bitrate=bitrate,
+        sample_rate=sample_rate,
+        samples_per_frame=samples_per_frame,
+        frame_length=frame_length,
+        is_mono=channel_mode == 3,
+    )
+
+
+def _find_vbr_tag(frame: Union[bytes, memoryview], frame_header: Mp3FrameHeader) -> Tuple[Optional[bytes], int]:
+    """
+    Locate the Xing / Info or VBRI tag of a frame.
+
+    Returns:
+        (tag, offset of the tag in the frame), or (None, 0) if the frame has none
+    """
+    # The Xing / Info tag follows the side information of the frame
+    if frame_header.version == MPEG_VERSION_1:
+        side_info_size = 17 if frame_header.is_mono else 32
+    else:
+        side_info_size = 9 if frame_header.is_mono else 17
+
+    xing_offset = FRAME_HEADER_SIZE + side_info_size
+    xing_tag = bytes(frame[xing_offset:xing_offset + 4])
+    if xing_tag in (b"Xing", b"Info"):
+        return xing_tag, xing_offset
+
+    vbri_offset = FRAME_HEADER_SIZE + 32
+    if bytes(frame[vbri_offset:vbri_offset + 4]) == b"VBRI":
+        return b"VBRI", vbri_offset
+
+    return None, 0
+
+
+def is_vbr_header_frame(frame: Union[bytes, memoryview], frame_header: Mp3FrameHeader) -> bool:
+    """Whether a frame is a Xing / Info / VBRI header: it describes the file and carries no audio."""
+    return _find_vbr_tag(frame, frame_header)[0] is not None
+
+
+def read_vbr_frame_count(frame: Union[bytes, memoryview], frame_header: Mp3FrameHeader) -> Optional[int]:
+    """
+    Read the frame count of a Xing / Info or VBRI header stored in the first frame.
+
+    Args:
+        frame: Bytes of the first frame, header included
+        frame_header: Parsed header of that frame
+
+    Returns:
+        Number of audio frames (the header frame excluded), or None if the frame
+        carries no frame count
+    """
+    tag, tag_offset = _find_vbr_tag(frame, frame_header)
+
+    if tag in (b"Xing", b"Info") and len(frame) >= tag_offset + 12:
+        flags = int.from_bytes(frame[tag_offset + 4:tag_offset + 8], "big")
+        if flags & 0x01:
+            return int.from_bytes(frame[tag_offset + 8:tag_offset + 12], "big")
+        return None
+
+    if tag == b"VBRI" and len(frame) >= tag_offset + 18:
+        return int.from_bytes(frame[tag_offset + 14:tag_offset + 18], "big")
+
+    return None
+
+
+def get_id3v2_size(data: Union[bytes, memoryview]) -> int:
+    """Size of the ID3v2 tag at the start of the data (0 if there is none)."""
+    if len(data) < ID3V2_HEADER_SIZE or bytes(data[:3]) != b"ID3":
+        return 0
+
+    # Syncsafe integer: 7 bits per byte
+    tag_size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer_size = ID3V2_HEADER_SIZE if data[5] & 0x10 else 0
+    return ID3V2_HEADER_SIZE + tag_size + footer_size
+
+
+def iterate_frames(data: Union[bytes, memoryview]) -> Iterator[Tuple[int, Mp3FrameHeader]]:
+    """
+    Iterate over the MPEG audio frames of a file content.
+
+    Garbage between frames (e.g. trailing tags) is skipped; after losing sync,
+    a frame is only accepted when the next frame header is valid too.
+
+    Yields:
+        (byte offset, frame header)
+    """
+    data_size = len(data)
+    offset = get_id3v2_size(data)
+    is_synced = False
+
+    while offset + FRAME_HEADER_SIZE <= data_size:
+        frame_header = parse_frame_header(data[offset:offset + FRAME_HEADER_SIZE])
+        if frame_header is not None and offset + frame_header.frame_length <= data_size:
+            next_offset = offset + frame_header.frame_length
+            if is_synced or next_offset + FRAME_HEADER_SIZE > data_size or parse_frame_header(
+                data[next_offset:next_offset + FRAME_HEADER_SIZE]
+            ) is not None:
+                is_synced = True
+                yield offset, frame_header
+                offset = next_offset
+                continue
+
+        is_synced = False
+        offset += 1
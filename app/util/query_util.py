@@ -0,0 +1,8 @@
+"""Helpers to build SQL queries"""
+
+from typing import Sequence
+
+
+def format_id_list_query(query: str, id_list: Sequence[int]) -> str:
+    """Fill the {placeholders} IN list of a query with one %s per id."""
+    return query.format(placeholders=", ".join(["%s"] * len(id_list)))
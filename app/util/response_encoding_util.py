@@ -0,0 +1,74 @@
+"""Compact binary (MessagePack) response encoding negotiated from the Accept header"""
+
+from typing import Any, Optional
+
+import msgpack
+from fastapi import Request, Response
+
+from app.util.json_util import get_type_adapter
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_ACCEPT_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _parse_accept(accept: str) -> dict:
+    media_type_quality = {}
+    for media_range in accept.split(","):
+        media_type, _, parameters = media_range.partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type_quality[media_type.strip().lower()] = quality
+    return media_type_quality
+
+
+def is_msgpack_accepted(accept: Optional[str]) -> bool:
+    """
+    Check whether the client opted in to MessagePack.
+
+    MessagePack is only chosen when a MessagePack media type is listed explicitly
+    and is not ranked below application/json.
+    """
+    if not accept:
+        return False
+
+    media_type_quality = _parse_accept(accept)
+    msgpack_quality = max((media_type_quality.get(media_type, 0.0) for media_type in MSGPACK_ACCEPT_MEDIA_TYPES))
+    if msgpack_quality <= 0:
+        return False
+
+    return msgpack_quality >= media_type_quality.get("application/json", 0.0)
+
+
+def encode_msgpack(data: Any) -> bytes:
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def build_negotiated_response(request: Request, response_type: Any, content: Any) -> Response:
+    """
+    Encode route content as MessagePack when the client asks for it, else as JSON.
+
+    The content goes through the same schema in both encodings (response_type),
+    so they carry identical fields. None is sent as null / nil. Every response
+    varies on Accept, so shared caches keep the two encodings apart.
+
+    Returns:
+        A MessagePack or JSON Response
+    """
+    headers = {"Vary": "Accept"}
+    type_adapter = get_type_adapter(response_type)
+    validated_content = type_adapter.validate_python(content) if content is not None else None
+
+    if is_msgpack_accepted(request.headers.get("accept")):
+        data = type_adapter.dump_python(validated_content, mode="json") if content is not None else None
+        return Response(content=encode_msgpack(data), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+
+    body = type_adapter.dump_json(validated_content) if content is not None else b"null"
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,35 @@
+"""Sampled schema validation for JSON payloads sent without a Pydantic round trip"""
+
+import logging
+import random
+from typing import Any
+
+from pydantic import ValidationError
+
+from app.core.app_config import app_config
+from app.util.json_util import get_type_adapter
+
+
+logger = logging.getLogger(__name__)
+
+
+def validate_response_sample(response_type: Any, body: bytes, label: str) -> None:
+    """
+    Validate a raw JSON body against its response schema for a sample of calls.
+
+    The sample size is controlled by RESPONSE_VALIDATION_SAMPLE_RATE. Failures are
+    logged, never raised: the body is still sent to the client unchanged.
+
+    Args:
+        response_type: Response schema, e.g. TestDetailResponse or List[TestSummaryResponse]
+        body: Raw JSON bytes
+        label: Name used in the log message, e.g. "test detail 28"
+    """
+    sample_rate = app_config.RESPONSE_VALIDATION_SAMPLE_RATE
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return
+
+    try:
+        get_type_adapter(response_type).validate_json(body)
+    except ValidationError as e:
+        logger.warning(f"Response schema mismatch for {label}: {e}")
@@ -0,0 +1,162 @@
+"""Coalescing of concurrent identical work: in-process single-flight and cross-process file locks"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+FILE_LOCK_POLL_SECONDS = 0.2
+# Touches per timeout while the lock is held, so a live holder never looks abandoned
+FILE_LOCK_HEARTBEAT_PER_TIMEOUT = 3
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers with the same key
+    await the result of the call in flight.
+    """
+
+    def __init__(self):
+        self._task_map: Dict[Hashable, asyncio.Future] = {}
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._task_map.get(key) is task:
+            del self._task_map[key]
+        # Retrieve the outcome so a failure nobody awaits anymore is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def is_running(self, key: Hashable) -> bool:
+        return key in self._task_map
+
+    def start(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> asyncio.Future:
+        """
+        Like run, but registers the call without waiting for it.
+
+        function may also return a future the caller completes itself, so that
+        work which is not a single coroutine (e.g. a stream) can be joined.
+
+        Returns:
+            The call shared by every caller of the key (shield it before awaiting)
+        """
+        task = self._task_map.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._task_map[key] = task
+            task.add_done_callback(lambda done_task: self._forget(key, done_task))
+        return task
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        # A cancelled caller (e.g. client disconnected) must not cancel the call shared with others
+        return await asyncio.shield(self.start(key, function))
+
+    def run_many(
+        self,
+        key_list: List[Hashable],
+        function: Callable[[List[Hashable]], Awaitable[Dict[Hashable, T]]],
+    ) -> Dict[Hashable, Awaitable[T]]:
+        """
+        Batch variant of run: one call of function for the keys not in flight yet.
+
+        function gets these keys and returns {key: result}; concurrent run /
+        run_many callers of any of them await its result. Keys already in flight
+        join their call.
+
+        Returns:
+            {key: awaitable of its result}
+        """
+        new_key_list = [key for key in key_list if key not in self._task_map]
+        if new_key_list:
+            batch_task = asyncio.ensure_future(function(new_key_list))
+
+            async def pick(key: Hashable) -> T:
+                result_map = await batch_task
+                if key not in result_map:
+                    raise Exception(f"No result for {key}")
+                return result_map[key]
+
+            for key in new_key_list:
+                task = asyncio.ensure_future(pick(key))
+                self._task_map[key] = task
+                task.add_done_callback(lambda done_task, key=key: self._forget(key, done_task))
+
+        return {key: asyncio.shield(self._task_map[key]) for key in key_list}
+
+
+async def _touch_file_lock(lock_path: str, interval_seconds: float) -> None:
+    """Refresh the mtime of a held lock forever, every interval_seconds (background task)."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            os.utime(lock_path)
+        except OSError as e:
+            logger.warning(f"Failed to refresh lock {lock_path}: {e}")
+
+
+@asynccontextmanager
+async def acquire_file_lock(lock_path: Optional[str], timeout_seconds: float) -> AsyncIterator[bool]:
+    """
+    Exclusive lock shared by every process using the same lock file.
+
+    The lock file is created with O_EXCL, which works on every platform and
+    network share. The holder touches the lock file while it runs, so a lock
+    not touched for timeout_seconds is considered abandoned (crashed holder)
+    and taken over, however long the work under the lock takes.
+
+    Args:
+        lock_path: Lock file path, None to skip locking
+        timeout_seconds: Maximum wait, after which the caller proceeds without the lock
+
+    Yields:
+        True if the lock is held
+    """
+    if lock_path is None:
+        yield False
+        return
+
+    deadline = time.monotonic() + timeout_seconds
+    is_locked = False
+    while True:
+        try:
+            lock_file = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(lock_file, str(os.getpid()).encode())
+            os.close(lock_file)
+            is_locked = True
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > timeout_seconds:
+                    logger.warning(f"Taking over abandoned lock {lock_path}")
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+
+        if time.monotonic() >= deadline:
+            logger.warning(f"Lock {lock_path} still held after {timeout_seconds}s, proceeding without it")
+            break
+        await asyncio.sleep(FILE_LOCK_POLL_SECONDS)
+
+    heartbeat_task = None
+    if is_locked:
+        heartbeat_task = asyncio.create_task(
+            _touch_file_lock(lock_path, timeout_seconds / FILE_LOCK_HEARTBEAT_PER_TIMEOUT)
+        )
+
+    try:
+        yield is_locked
+    finally:
+        if heartbeat_task is not None:
+            heartbeat_task.cancel()
+        if is_locked:
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
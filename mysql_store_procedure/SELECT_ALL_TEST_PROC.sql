@@ -16,8 +16,10 @@ BEGIN
             JSON_OBJECT(
                 'test_id', t.id, 
                 'test_title', t.title, 
-                'test_description', t.description, 
+                'test_description', COALESCE(t.description, ''), 
                 'test_duration', t.duration, 
+                'test_type', t.test_type, 
+                'test_bank_id', t.test_bank_id, 
                 'part_list', JSON_ARRAYAGG(
                     JSON_OBJECT(
                         'part_id', p.id,
@@ -33,7 +35,7 @@ BEGIN
         LEFT JOIN question_count qc 
             ON qc.test_id = t.id AND qc.part_id = p.id
         WHERE t.visible = 1
-        GROUP BY t.id, t.title, t.description, t.duration
+        GROUP BY t.id, t.title, t.description, t.duration, t.test_type, t.test_bank_id
     )
     SELECT JSON_ARRAYAGG(test_json)
     INTO JSON_LIST_RESULT
@@ -27,7 +27,8 @@ BEGIN
                 JSON_OBJECT(
                     'media_question_id', m_id,
                     'media_question_name', m_media_name,
-                    'media_question_main_paragraph', m_main_paragraph,
+                    'media_question_main_paragraph', IF(m_is_image, '', m_main_paragraph),
+                    'media_question_image_url', IF(m_is_image, CONCAT('media/', m_id, '/image'), NULL),
                     'media_question_audio_script', m_audio_script,
                     'question_list', question_list
                 )
@@ -41,6 +42,13 @@ BEGIN
                 m.id AS m_id,
                 m.media_name AS m_media_name,
                 m.paragrap_main AS m_main_paragraph,
+                -- Images are served by GET /media/{id}/image instead of inline base64
+                -- (same prefixes as media_image_util.is_base64_image)
+                (m.paragrap_main LIKE 'data:image/%'
+                    OR m.paragrap_main LIKE 'iVBORw0KGgo%'
+                    OR m.paragrap_main LIKE '/9j/%'
+                    OR m.paragrap_main LIKE 'R0lGOD%'
+                    OR m.paragrap_main LIKE 'UklGR%') AS m_is_image,
                 m.audio_script AS m_audio_script,
                 JSON_ARRAYAGG(
                     JSON_OBJECT(
@@ -51,7 +59,7 @@ BEGIN
                             SELECT JSON_ARRAYAGG(
                                 JSON_OBJECT(
                                     'answer_id', a.id,
-                                    'is_correct', a.is_correct,
+                                    'is_correct', IF(a.is_correct = 1, CAST('true' AS JSON), CAST('false' AS JSON)),
                                     'content', a.content
                                 )
                             )
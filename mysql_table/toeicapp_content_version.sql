@@ -0,0 +1,11 @@
+-- Content versions read by every API worker to key its test content caches.
+-- test_id 0 is the version of every test, other rows the version of one test.
+CREATE TABLE IF NOT EXISTS toeicapp_content_version (
+    test_id   BIGINT       NOT NULL,
+    version   INT UNSIGNED NOT NULL DEFAULT 0,
+    update_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (test_id)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+
+
+INSERT IGNORE INTO toeicapp_content_version (test_id, version) VALUES (0, 0);
@@ -0,0 +1,12 @@
+-- Gemini quota buckets shared by every API worker and the pre-generation command.
+-- level is refilled lazily from refill_at (epoch seconds) by the process taking a slot.
+CREATE TABLE IF NOT EXISTS toeicapp_gemini_quota (
+    bucket    VARCHAR(16) NOT NULL,
+    level     DOUBLE      NOT NULL DEFAULT 0,
+    refill_at DOUBLE      NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+
+
+-- refill_at 0: the first call finds both buckets full
+INSERT IGNORE INTO toeicapp_gemini_quota (bucket, level, refill_at) VALUES ('request', 0, 0), ('token', 0, 0);
@@ -0,0 +1,25 @@
+-- AI artifacts (translations, explanations) of questions, one row per
+-- (question, language, kind) so every language stays cached at once
+CREATE TABLE IF NOT EXISTS toeicapp_question_artifact (
+    question_id   BIGINT      NOT NULL,
+    language_id   VARCHAR(8)  NOT NULL,
+    artifact_kind VARCHAR(20) NOT NULL,
+    artifact_json JSON        NOT NULL,
+    create_at     DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    update_at     DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (question_id, language_id, artifact_kind),
+    CONSTRAINT fk_question_artifact_question
+        FOREIGN KEY (question_id) REFERENCES toeicapp_question (id) ON DELETE CASCADE
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+
+
+-- One-time backfill from the single-language columns of toeicapp_question
+INSERT IGNORE INTO toeicapp_question_artifact (question_id, language_id, artifact_kind, artifact_json)
+SELECT q.id, JSON_UNQUOTE(JSON_EXTRACT(q.question_translate_json, '$.language_id')), 'translate', q.question_translate_json
+FROM toeicapp_question q
+WHERE JSON_EXTRACT(q.question_translate_json, '$.language_id') IS NOT NULL;
+
+INSERT IGNORE INTO toeicapp_question_artifact (question_id, language_id, artifact_kind, artifact_json)
+SELECT q.id, JSON_UNQUOTE(JSON_EXTRACT(q.question_explain_json, '$.language_id')), 'explain', q.question_explain_json
+FROM toeicapp_question q
+WHERE JSON_EXTRACT(q.question_explain_json, '$.language_id') IS NOT NULL;